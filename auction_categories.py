@@ -0,0 +1,234 @@
+"""
+NaturalSMP Economy Overhaul - Auction Category Check
+Compiles auction/categories.yml into one material -> categories map (cached
+next to it, rebuilt only when the file changes) and checks it against every
+material sold in the virtual shops and listed in the auction
+(excellentshop_auction_items.item).
+
+    python auction_categories.py
+    python auction_categories.py --materials bukkit_materials.txt
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import time
+
+from material_index import MaterialIndex
+from shop_db import DB_PATH
+from shop_manifest import file_sha256
+from shop_materials import material_id
+
+SHOP_DIR = os.path.dirname(os.path.abspath(__file__))
+CATEGORIES_PATH = os.path.join(SHOP_DIR, "auction", "categories.yml")
+CACHE_PATH = os.path.join(SHOP_DIR, "auction", "categories.compiled.json")
+CACHE_VERSION = 1
+AUCTION_TABLE = "excellentshop_auction_items"
+
+WILDCARD = '*'
+MATERIAL_NAME = re.compile(r'[A-Z][A-Z0-9_]*$')
+ITEM_ID = re.compile(r'"?id"?\s*:\s*"(?:minecraft:)?([a-z0-9_]+)"')
+
+
+# ============================================================================
+# COMPILER
+# ============================================================================
+def parse_categories(content):
+    """[(category id, [material, ...])] in file order; quotes are stripped."""
+    categories = []
+    in_materials = False
+    for line in content.split('\n'):
+        stripped = line.strip()
+        if not stripped or stripped.startswith('#'):
+            continue
+        if not line.startswith(' '):
+            categories.append((stripped.rstrip(':'), []))
+            in_materials = False
+        elif categories and stripped.startswith('- '):
+            if in_materials:
+                categories[-1][1].append(stripped[2:].strip().strip('\'"'))
+        elif line.startswith('  ') and not line.startswith('   '):
+            in_materials = stripped == 'Materials:'
+    return categories
+
+
+def compile_categories(content):
+    """{'materials': {MATERIAL: [category, ...]}, 'wildcard': [category, ...]} for one
+    categories.yml text. A material listed twice in one category has it twice."""
+    materials = {}
+    wildcard = []
+    for category, names in parse_categories(content):
+        for name in names:
+            if name == WILDCARD:
+                wildcard.append(category)
+            else:
+                materials.setdefault(name, []).append(category)
+    return {'materials': materials, 'wildcard': wildcard}
+
+
+def load_compiled(path=CATEGORIES_PATH, cache_path=CACHE_PATH):
+    """Compiled map for path, from the cache when the file is unchanged.
+    Returns (compiled, from_cache)."""
+    st = os.stat(path)
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    if cache.get('version') == CACHE_VERSION and cache.get('size') == st.st_size:
+        if cache['mtime_ns'] == st.st_mtime_ns:
+            return cache['compiled'], True
+        if cache['sha256'] == file_sha256(path):
+            cache['mtime_ns'] = st.st_mtime_ns
+            _save(cache_path, cache)
+            return cache['compiled'], True
+
+    with open(path, 'r', encoding='utf-8') as f:
+        compiled = compile_categories(f.read())
+    _save(cache_path, {
+        'version': CACHE_VERSION,
+        'mtime_ns': st.st_mtime_ns,
+        'size': st.st_size,
+        'sha256': file_sha256(path),
+        'compiled': compiled,
+    })
+    return compiled, False
+
+
+def _save(cache_path, cache):
+    tmp = cache_path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, separators=(',', ':'))
+    os.replace(tmp, cache_path)
+
+
+# ============================================================================
+# MATERIAL SOURCES
+# Both return {MATERIAL: [where, ...]} in Bukkit naming (DIAMOND_SWORD).
+# ============================================================================
+def _bukkit(material):
+    # Items from other namespaces (plugin items) have no Bukkit material
+    return None if material is None or ':' in material else material.upper()
+
+
+def shop_materials():
+    index = MaterialIndex.load()
+    index.refresh()
+    index.save()
+    found = {}
+    for product in index.products():
+        material = _bukkit(product.material)
+        if material is not None:
+            found.setdefault(material, []).append(f"{product.shop}/{product.key}")
+    return found
+
+
+def auction_item_material(item):
+    """Material of one serialized auction item: SNBT, or a JSON wrapper around it.
+    None if the format is not readable (e.g. legacy Base64 NBT)."""
+    text = item.strip()
+    if text.startswith('{') and text[1:2] == '"':
+        try:
+            data = json.loads(text)
+        except ValueError:
+            data = None
+        if isinstance(data, dict):
+            text = next((v for v in data.values() if isinstance(v, str) and 'id' in v), json.dumps(data))
+    material = material_id(text) if text.startswith('{') else None
+    if material is None:
+        match = ITEM_ID.search(text)
+        material = match.group(1) if match else None
+    return _bukkit(material)
+
+
+def auction_materials(db_path=DB_PATH):
+    """(materials, unreadable rows) for every listed auction item."""
+    found = {}
+    unreadable = 0
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        for aucId, item in conn.execute(f"SELECT aucId, item FROM {AUCTION_TABLE}"):
+            material = auction_item_material(item)
+            if material is None:
+                unreadable += 1
+            else:
+                found.setdefault(material, []).append(f"auction {aucId}")
+    finally:
+        conn.close()
+    return found, unreadable
+
+
+def load_material_list(path):
+    """Known Bukkit material names, one per line (e.g. dumped from Material.values())."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return {line.strip().upper() for line in f if line.strip() and not line.startswith('#')}
+
+
+# ============================================================================
+# CHECKS
+# ============================================================================
+def check_coverage(compiled, used, known=None):
+    """(uncategorized {MATERIAL: [where]}, duplicates {MATERIAL: [category]},
+    unknown [(category, name, reason)])."""
+    materials = compiled['materials']
+    uncategorized = {m: where for m, where in used.items() if m not in materials}
+    duplicates = {m: cats for m, cats in materials.items() if len(cats) > 1}
+    unknown = []
+    for name, categories in materials.items():
+        if not MATERIAL_NAME.match(name):
+            reason = "not a Bukkit material name"
+        elif known is not None and name not in known:
+            reason = "not in the material list"
+        else:
+            continue
+        unknown.extend((category, name, reason) for category in categories)
+    return uncategorized, duplicates, unknown
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check auction/categories.yml against shop and auction materials")
+    parser.add_argument("--categories", default=CATEGORIES_PATH, metavar="PATH",
+                        help="categories file to check (default: auction/categories.yml)")
+    parser.add_argument("--db", default=DB_PATH, metavar="PATH",
+                        help="plugin database with the auction listings (default: data.db)")
+    parser.add_argument("--materials", metavar="FILE",
+                        help="known Bukkit material names, one per line; flags category entries not in it")
+    parser.add_argument("--quiet", action="store_true", help="only print counts")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    cache_path = CACHE_PATH if args.categories == CATEGORIES_PATH else args.categories + '.compiled.json'
+    compiled, cached = load_compiled(args.categories, cache_path)
+    used = shop_materials()
+    try:
+        listed, unreadable = auction_materials(args.db)
+    except sqlite3.Error as e:
+        print(f"⚠️  Auction listings not read: {e}")
+        listed, unreadable = {}, 0
+    for material, where in listed.items():
+        used.setdefault(material, []).extend(where)
+    known = load_material_list(args.materials) if args.materials else None
+    uncategorized, duplicates, unknown = check_coverage(compiled, used, known)
+    seconds = time.perf_counter() - started
+
+    print(f"🗂️  {len(compiled['materials'])} materials in {os.path.basename(args.categories)} "
+          f"({'cached' if cached else 'compiled'}), {len(used)} used by shops and "
+          f"{sum(len(w) for w in listed.values())} auction listings, in {seconds * 1000:.0f} ms")
+    if compiled['wildcard']:
+        print(f"  ℹ️  Catch-all '{WILDCARD}' in: {', '.join(compiled['wildcard'])}")
+    if unreadable:
+        print(f"  ⚠️  {unreadable} auction item(s) in an unreadable format were skipped")
+    if not args.quiet:
+        for material, where in sorted(uncategorized.items()):
+            print(f"  📭 {material}: no category (in {', '.join(where[:3])}{', ...' if len(where) > 3 else ''})")
+        for material, categories in sorted(duplicates.items()):
+            print(f"  👯 {material}: in {', '.join(categories)}")
+        for category, name, reason in unknown:
+            print(f"  ❓ {category}: {name} ({reason})")
+    print(f"{'❌' if uncategorized or unknown else '✅'} {len(uncategorized)} uncategorized, "
+          f"{len(duplicates)} in several categories, {len(unknown)} unknown")
+    return 1 if uncategorized or unknown else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,287 @@
+"""
+NaturalSMP Economy Overhaul - Engine Benchmarks
+Generates synthetic virtual-shop YAML in the real Items/Price/Stock/Shop_View layout
+and times (optionally memory-profiles) each engine path, writing JSON results so
+runs from different versions can be compared.
+
+    python bench_prices.py --sizes 1000,10000,100000 --memory -o bench.json
+    python bench_prices.py --compare bench.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+import update_prices
+import update_prices_v2
+from product_table import ProductTable
+from shop_index import EditBuffer, index_shop_items
+from shop_yaml import YamlDocument
+
+MATERIALS = (
+    'stone', 'cobblestone', 'oak_planks', 'glass', 'white_wool', 'iron_ingot',
+    'diamond', 'wheat', 'bone', 'redstone', 'quartz_block', 'terracotta',
+)
+# FLAT prices drawn from here so the default tier handlers have work to do
+FLAT_PRICES = ((20.0, 100.0), (50.0, 1000.0), (100.0, 1000.0), (200.0, 2000.0), (-1.0, 150.0), (-1.0, 300.0))
+
+
+# ============================================================================
+# SYNTHETIC SHOP GENERATOR
+# ============================================================================
+SHOP_HEADER = """Settings:
+  Aliases: []
+  Name: Benchmark
+  Description: []
+  Permission_Required: false
+  Buying: true
+  Selling: true
+  Pages: {pages}
+Items:
+"""
+
+ITEM_TEMPLATE = """  {key}:
+    Type: ITEM
+    Item:
+      Provider: vanilla
+      Data:
+        Value: '{{count:1,id:"minecraft:{material}"}}'
+        DataVersion: 4556
+      CompareNBT: false
+    Rotating: false
+    Allowed_Ranks: []
+    Required_Permissions: []
+    Forbidden_Permissions: []
+    Currency: vault
+    Price:
+{price}
+    Stock:
+      GLOBAL:
+        BuyAmount: -1
+        SellAmount: -1
+        RestockTime: 0
+      PLAYER:
+        BuyAmount: -1
+        SellAmount: -1
+        RestockTime: 0
+    Shop_View:
+      Slot: {slot}
+      Page: {page}
+"""
+
+
+def item_key(i):
+    return f"{MATERIALS[i % len(MATERIALS)]}_{i}"
+
+
+def generate_shop(n_items, dynamic_ratio=0.3, seed=0):
+    """Return the text of a shop file with n_items products, dynamic_ratio of them DYNAMIC."""
+    rng = random.Random(seed)
+    parts = [SHOP_HEADER.format(pages=max(1, n_items // 45))]
+    for i in range(n_items):
+        if rng.random() < dynamic_ratio:
+            buy = float(rng.randrange(100, 5000, 50))
+            price = update_prices_v2.dynamic_block(buy, buy / 5)
+        else:
+            sell, buy = rng.choice(FLAT_PRICES)
+            price = f"      Type: FLAT\n      SELL: {sell}\n      BUY: {buy}"
+        parts.append(ITEM_TEMPLATE.format(
+            key=item_key(i), material=MATERIALS[i % len(MATERIALS)],
+            price=price, slot=i % 45, page=i // 45 + 1,
+        ))
+    return ''.join(parts)
+
+
+def generate_prices(n_items, share=0.1, dynamic_ratio=0.3, seed=1):
+    """Price dict covering `share` of the generated items (plus one missing key)."""
+    rng = random.Random(seed)
+    prices = {}
+    for i in rng.sample(range(n_items), max(1, int(n_items * share))):
+        buy = float(rng.randrange(100, 5000, 50))
+        kind = 'DYNAMIC' if rng.random() < dynamic_ratio else 'FLAT'
+        prices[item_key(i)] = (kind, buy, buy / 5)
+    prices['not_in_shop'] = ('FLAT', 1.0, 1.0)
+    return prices
+
+
+# ============================================================================
+# ENGINE PATHS
+# Each takes (shop_path, content, prices) and does one complete unit of work.
+# ============================================================================
+def _quiet(func, *args):
+    with redirect_stdout(io.StringIO()):
+        return func(*args)
+
+
+def path_find_price_block(shop_path, content, prices):
+    index = index_shop_items(content)
+    for item_name in prices:
+        update_prices.find_price_block(content, item_name, index)
+
+
+def path_update_file_prices(shop_path, content, prices):
+    _changes, staged = _quiet(update_prices.update_file_prices, shop_path, prices)
+    if staged is not None:
+        staged.discard()
+
+
+def path_stream_file_prices(shop_path, content, prices):
+    _changes, staged = _quiet(update_prices.stream_file_prices, shop_path, prices)
+    if staged is not None:
+        staged.discard()
+
+
+def path_find_and_replace_price(shop_path, content, prices):
+    # One item through the single-item wrapper (split, replace, join)
+    item_name = next(iter(prices))
+    price_type, buy, sell = prices[item_name][:3]
+    update_prices_v2.find_and_replace_price(content, item_name, price_type, buy, sell)
+
+
+def path_update_file(shop_path, content, prices):
+    _changes, staged = _quiet(update_prices_v2.update_file, shop_path, prices)
+    if staged is not None:
+        staged.discard()
+
+
+def path_yaml_set_prices(shop_path, content, prices):
+    # Round-trip YAML layer: one scan, then only the priced items' Price nodes
+    doc = YamlDocument(content)
+    items = doc['Items']
+    for item_name, (_type, buy, _sell) in prices.items():
+        if item_name not in items:
+            continue
+        side = items[item_name]['Price']['BUY']
+        doc.set_value(side['StartValue'] if 'StartValue' in side else side, f"{buy}")
+    doc.serialize()
+
+
+def path_load_product_table(shop_path, content, prices):
+    table = ProductTable()
+    table.load_shop(content, 'synthetic')
+    table.save(shop_path + '.table')
+    ProductTable.load(shop_path + '.table')
+
+
+def _default_handler_path(handler):
+    def run(shop_path, content, prices):
+        edits = EditBuffer(content)
+        handler(edits, index_shop_items(content), {})
+        edits.apply()
+    run.__name__ = f"path_{handler.__name__}"
+    return run
+
+
+PATHS = {
+    'find_price_block': path_find_price_block,
+    'update_file_prices': path_update_file_prices,
+    'stream_file_prices': path_stream_file_prices,
+    'find_and_replace_price': path_find_and_replace_price,
+    'update_file': path_update_file,
+    'yaml_set_prices': path_yaml_set_prices,
+    'load_product_table': path_load_product_table,
+    'apply_default_building_prices': _default_handler_path(update_prices.apply_default_building_prices),
+    'apply_default_decoration_prices': _default_handler_path(update_prices.apply_default_decoration_prices),
+    'apply_default_potions_prices': _default_handler_path(update_prices.apply_default_potions_prices),
+}
+
+
+# ============================================================================
+# HARNESS
+# ============================================================================
+def measure(func, args, repeat, memory):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    peak_kb = None
+    if memory:
+        tracemalloc.start()
+        func(*args)
+        peak_kb = tracemalloc.get_traced_memory()[1] // 1024
+        tracemalloc.stop()
+    return best, peak_kb
+
+
+def run_benchmarks(sizes, dynamic_ratio, repeat, memory, paths):
+    results = []
+    workdir = tempfile.mkdtemp(prefix="bench_prices_")
+    try:
+        for size in sizes:
+            content = generate_shop(size, dynamic_ratio)
+            prices = generate_prices(size, dynamic_ratio=dynamic_ratio)
+            shop_path = os.path.join(workdir, f"synthetic_{size}.yml")
+            with open(shop_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            print(f"\n📦 {size} items, {len(content) / 1e6:.1f} MB, {len(prices)} priced")
+            for name in paths:
+                seconds, peak_kb = measure(PATHS[name], (shop_path, content, prices), repeat, memory)
+                peak = f"{peak_kb:>9} KB peak" if peak_kb is not None else ""
+                print(f"  {name:<32} {seconds * 1000:>10.2f} ms  {peak}")
+                results.append({
+                    'path': name, 'items': size, 'bytes': len(content),
+                    'priced': len(prices), 'seconds': seconds, 'peak_kb': peak_kb,
+                })
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def compare(baseline_path, results):
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(r['path'], r['items']): r for r in json.load(f)['results']}
+    print(f"\n📊 Compared with {baseline_path} (ratio > 1.0 means slower now)")
+    for r in results:
+        old = baseline.get((r['path'], r['items']))
+        if old and old['seconds']:
+            print(f"  {r['path']:<32} {r['items']:>7}  x{r['seconds'] / old['seconds']:.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the price update engines on synthetic shops")
+    parser.add_argument("--sizes", default="1000,10000",
+                        help="comma separated item counts (default: 1000,10000; try 100000)")
+    parser.add_argument("--dynamic-ratio", type=float, default=0.3,
+                        help="share of DYNAMIC products in generated shops (default: 0.3)")
+    parser.add_argument("--repeat", type=int, default=3, help="timing runs per path, best is kept")
+    parser.add_argument("--memory", action="store_true", help="also record tracemalloc peak per path")
+    parser.add_argument("--paths", default=",".join(PATHS),
+                        help=f"comma separated subset of: {', '.join(PATHS)}")
+    parser.add_argument("-o", "--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", metavar="JSON", help="print speed ratios against an earlier results file")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    paths = [p for p in args.paths.split(",") if p]
+    unknown = set(paths) - set(PATHS)
+    if unknown:
+        parser.error(f"unknown paths: {', '.join(sorted(unknown))}")
+
+    results = run_benchmarks(sizes, args.dynamic_ratio, args.repeat, args.memory, paths)
+    report = {
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'dynamic_ratio': args.dynamic_ratio,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1)
+        print(f"\n💾 Results written to {args.output}")
+    if args.compare:
+        compare(args.compare, results)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
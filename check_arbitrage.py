@@ -0,0 +1,296 @@
+"""
+NaturalSMP Economy Overhaul - Crafting Arbitrage Check
+Joins a recipe graph against every shop's current BUY/SELL (SELL scaled by the
+best Sell_Multipliers rank from virtual_shop/settings.yml) and reports every
+buy -> craft -> sell chain that ends with more money than it started with.
+Exits 1 when any is found, so it can run as a pre-commit gate.
+
+    python check_arbitrage.py                     # bundled recipes, best rank
+    python check_arbitrage.py --recipes extra.toml --rank vip
+"""
+import argparse
+import glob
+import os
+import time
+
+from shop_materials import SHOPS_DIR, load_shop_products, sell_multiplier
+
+# Longest craft chain followed when working out the cheapest way to get a material
+MAX_CHAIN = 8
+
+
+# ============================================================================
+# BUNDLED RECIPES
+# (output, output count, {input: count}); vanilla crafting table recipes.
+# ============================================================================
+# 9 x first <-> 1 x second, both directions
+NINE_TO_ONE = (
+    ('iron_ingot', 'iron_block'), ('gold_ingot', 'gold_block'), ('copper_ingot', 'copper_block'),
+    ('diamond', 'diamond_block'), ('emerald', 'emerald_block'), ('lapis_lazuli', 'lapis_block'),
+    ('redstone', 'redstone_block'), ('coal', 'coal_block'), ('netherite_ingot', 'netherite_block'),
+    ('raw_iron', 'raw_iron_block'), ('raw_gold', 'raw_gold_block'), ('raw_copper', 'raw_copper_block'),
+    ('iron_nugget', 'iron_ingot'), ('gold_nugget', 'gold_ingot'), ('wheat', 'hay_block'),
+    ('dried_kelp', 'dried_kelp_block'), ('slime_ball', 'slime_block'), ('bone_meal', 'bone_block'),
+)
+
+ONE_WAY = (
+    ('melon', 1, {'melon_slice': 9}),
+    ('nether_wart_block', 1, {'nether_wart': 9}),
+    ('glowstone', 1, {'glowstone_dust': 4}),
+    ('quartz_block', 1, {'quartz': 4}),
+    ('amethyst_block', 1, {'amethyst_shard': 4}),
+    ('snow_block', 1, {'snowball': 4}),
+    ('clay', 1, {'clay_ball': 4}),
+    ('honeycomb_block', 1, {'honeycomb': 4}),
+    ('bricks', 1, {'brick': 4}),
+    ('sandstone', 1, {'sand': 4}),
+    ('red_sandstone', 1, {'red_sand': 4}),
+    ('stone_bricks', 4, {'stone': 4}),
+    ('white_wool', 1, {'string': 4}),
+    ('bone_meal', 3, {'bone': 1}),
+    ('blaze_powder', 2, {'blaze_rod': 1}),
+    ('sugar', 1, {'sugar_cane': 1}),
+    ('paper', 3, {'sugar_cane': 3}),
+    ('book', 1, {'paper': 3, 'leather': 1}),
+    ('bookshelf', 1, {'oak_planks': 6, 'book': 3}),
+    ('bread', 1, {'wheat': 3}),
+    ('cookie', 8, {'wheat': 2, 'cocoa_beans': 1}),
+    ('golden_apple', 1, {'apple': 1, 'gold_ingot': 8}),
+    ('golden_carrot', 1, {'carrot': 1, 'gold_nugget': 8}),
+    ('glistering_melon_slice', 1, {'melon_slice': 1, 'gold_nugget': 8}),
+    ('netherite_ingot', 1, {'netherite_scrap': 4, 'gold_ingot': 4}),
+    ('ender_eye', 1, {'ender_pearl': 1, 'blaze_powder': 1}),
+    ('magma_cream', 1, {'slime_ball': 1, 'blaze_powder': 1}),
+    ('fermented_spider_eye', 1, {'spider_eye': 1, 'brown_mushroom': 1, 'sugar': 1}),
+    ('glass_pane', 16, {'glass': 6}),
+    ('iron_bars', 16, {'iron_ingot': 6}),
+    ('iron_chain', 1, {'iron_ingot': 1, 'iron_nugget': 2}),
+    ('bucket', 1, {'iron_ingot': 3}),
+    ('cauldron', 1, {'iron_ingot': 7}),
+    ('anvil', 1, {'iron_block': 3, 'iron_ingot': 4}),
+    ('hopper', 1, {'iron_ingot': 5, 'chest': 1}),
+    ('chest', 1, {'oak_planks': 8}),
+    ('barrel', 1, {'oak_planks': 6, 'oak_slab': 2}),
+    ('crafting_table', 1, {'oak_planks': 4}),
+    ('stick', 4, {'oak_planks': 2}),
+    ('torch', 4, {'stick': 1, 'coal': 1}),
+    ('lantern', 1, {'torch': 1, 'iron_nugget': 8}),
+    ('arrow', 4, {'flint': 1, 'stick': 1, 'feather': 1}),
+    ('shield', 1, {'oak_planks': 6, 'iron_ingot': 1}),
+    ('compass', 1, {'iron_ingot': 4, 'redstone': 1}),
+    ('clock', 1, {'gold_ingot': 4, 'redstone': 1}),
+    ('tnt', 1, {'gunpowder': 5, 'sand': 4}),
+    ('repeater', 1, {'redstone_torch': 2, 'redstone': 1, 'stone': 3}),
+    ('redstone_torch', 1, {'redstone': 1, 'stick': 1}),
+    ('lever', 1, {'stick': 1, 'cobblestone': 1}),
+    ('piston', 1, {'oak_planks': 3, 'cobblestone': 4, 'iron_ingot': 1, 'redstone': 1}),
+    ('sticky_piston', 1, {'piston': 1, 'slime_ball': 1}),
+    ('observer', 1, {'cobblestone': 6, 'redstone': 2, 'quartz': 1}),
+    ('dispenser', 1, {'cobblestone': 7, 'bow': 1, 'redstone': 1}),
+    ('dropper', 1, {'cobblestone': 7, 'redstone': 1}),
+    ('furnace', 1, {'cobblestone': 8}),
+    ('lead', 2, {'string': 4, 'slime_ball': 1}),
+    ('item_frame', 1, {'stick': 8, 'leather': 1}),
+    ('painting', 1, {'stick': 8, 'white_wool': 1}),
+)
+
+TOOLS = {'sword': 2, 'pickaxe': 3, 'axe': 3, 'shovel': 1, 'hoe': 2}
+TOOL_STICKS = {'sword': 1, 'pickaxe': 2, 'axe': 2, 'shovel': 2, 'hoe': 2}
+ARMOR = {'helmet': 5, 'chestplate': 8, 'leggings': 7, 'boots': 4}
+TOOL_MATERIALS = {'iron': 'iron_ingot', 'golden': 'gold_ingot', 'diamond': 'diamond'}
+
+WOODS = ('oak', 'spruce', 'birch', 'jungle', 'acacia', 'dark_oak', 'mangrove', 'cherry', 'pale_oak')
+STEMS = ('crimson', 'warped')
+COLORS = (
+    'white', 'orange', 'magenta', 'light_blue', 'yellow', 'lime', 'pink', 'gray',
+    'light_gray', 'cyan', 'purple', 'blue', 'brown', 'green', 'red', 'black',
+)
+# Block -> prefix of its _slab/_stairs/_wall variants
+STONE_FAMILIES = (
+    ('cobblestone', 'cobblestone'), ('stone_bricks', 'stone_brick'), ('andesite', 'andesite'),
+    ('diorite', 'diorite'), ('granite', 'granite'), ('blackstone', 'blackstone'),
+    ('cobbled_deepslate', 'cobbled_deepslate'), ('deepslate_bricks', 'deepslate_brick'),
+    ('deepslate_tiles', 'deepslate_tile'), ('bricks', 'brick'), ('sandstone', 'sandstone'),
+    ('prismarine', 'prismarine'), ('dark_prismarine', 'dark_prismarine'),
+)
+
+
+def bundled_recipes():
+    recipes = []
+    for small, block in NINE_TO_ONE:
+        recipes.append((block, 1, {small: 9}))
+        recipes.append((small, 9, {block: 1}))
+    recipes.extend(ONE_WAY)
+    for prefix, ingot in TOOL_MATERIALS.items():
+        for tool, count in TOOLS.items():
+            recipes.append((f"{prefix}_{tool}", 1, {ingot: count, 'stick': TOOL_STICKS[tool]}))
+        for piece, count in ARMOR.items():
+            recipes.append((f"{prefix}_{piece}", 1, {ingot: count}))
+    for wood in WOODS + STEMS:
+        log, wood_block = (f"{wood}_stem", f"{wood}_hyphae") if wood in STEMS else (f"{wood}_log", f"{wood}_wood")
+        planks = f"{wood}_planks"
+        recipes += [
+            (planks, 4, {log: 1}),
+            (wood_block, 3, {log: 4}),
+            (f"{wood}_slab", 6, {planks: 3}),
+            (f"{wood}_stairs", 4, {planks: 6}),
+            (f"{wood}_fence", 3, {planks: 4, 'stick': 2}),
+            (f"{wood}_fence_gate", 1, {planks: 2, 'stick': 4}),
+            (f"{wood}_door", 3, {planks: 6}),
+            (f"{wood}_trapdoor", 2, {planks: 6}),
+        ]
+    for color in COLORS:
+        recipes += [
+            (f"{color}_carpet", 3, {f"{color}_wool": 2}),
+            (f"{color}_stained_glass_pane", 16, {f"{color}_stained_glass": 6}),
+            (f"{color}_bed", 1, {f"{color}_wool": 3, 'oak_planks': 3}),
+            (f"{color}_banner", 1, {f"{color}_wool": 6, 'stick': 1}),
+        ]
+    for block, prefix in STONE_FAMILIES:
+        recipes += [
+            (f"{prefix}_slab", 6, {block: 3}),
+            (f"{prefix}_stairs", 4, {block: 6}),
+            (f"{prefix}_wall", 6, {block: 6}),
+        ]
+    return recipes
+
+
+def load_recipe_file(path):
+    """[[recipe]] tables with output, count (default 1) and an inputs table."""
+    try:
+        import tomllib
+    except ImportError:     # Python < 3.11
+        import tomli as tomllib
+    with open(path, 'rb') as f:
+        data = tomllib.load(f)
+    recipes = []
+    for i, recipe in enumerate(data.get('recipe', [])):
+        inputs = recipe.get('inputs')
+        if not recipe.get('output') or not isinstance(inputs, dict) or not inputs:
+            raise ValueError(f"{path}: recipe #{i + 1} needs an output and an inputs table")
+        recipes.append((recipe['output'], int(recipe.get('count', 1)),
+                        {name: int(count) for name, count in inputs.items()}))
+    return recipes
+
+
+# ============================================================================
+# PRICES
+# ============================================================================
+def price_index(products, multiplier):
+    """Cheapest BUY and best effective SELL per unit of each material:
+    {material: (price, product)}. Only plain items priced in the server currency count."""
+    cheapest, best = {}, {}
+    for product in products:
+        if not product.plain:
+            continue
+        material = product.material
+        buy = product.unit(product.buy)
+        if buy is not None and (material not in cheapest or buy < cheapest[material][0]):
+            cheapest[material] = (buy, product)
+        if product.sell is not None:
+            sell = product.unit(product.sell) * multiplier
+            if material not in best or sell > best[material][0]:
+                best[material] = (sell, product)
+    return cheapest, best
+
+
+# ============================================================================
+# ARBITRAGE
+# ============================================================================
+def acquisition_costs(cheapest, recipes):
+    """Cheapest way to obtain one unit of each material: {material: (cost, how)}
+    where how is the product bought or the recipe crafted. Each pass is linear in
+    the recipe edges; chains converge in at most MAX_CHAIN passes."""
+    costs = {material: (price, product) for material, (price, product) in cheapest.items()}
+    for _ in range(MAX_CHAIN):
+        changed = False
+        for recipe in recipes:
+            output, count, inputs = recipe
+            total = 0.0
+            for material, n in inputs.items():
+                known = costs.get(material)
+                if known is None:
+                    break
+                total += n * known[0]
+            else:
+                unit = total / count
+                if unit < costs.get(output, (float('inf'),))[0] - 1e-9:
+                    costs[output] = (unit, recipe)
+                    changed = True
+        if not changed:
+            break
+    return costs
+
+
+def find_cycles(costs, best, recipes, min_profit=0.0):
+    """Every recipe whose inputs cost less than its output sells for.
+    Returns [(profit, cost, revenue, recipe)], most profitable first."""
+    cycles = []
+    for recipe in recipes:
+        output, count, inputs = recipe
+        sell = best.get(output)
+        if sell is None or any(material not in costs for material in inputs):
+            continue
+        cost = sum(n * costs[material][0] for material, n in inputs.items())
+        revenue = count * sell[0]
+        if revenue - cost > min_profit + 1e-9:
+            cycles.append((revenue - cost, cost, revenue, recipe))
+    cycles.sort(key=lambda c: -c[0])
+    return cycles
+
+
+def _source(costs, material):
+    cost, how = costs[material]
+    if isinstance(how, tuple):
+        return f"crafted from {', '.join(f'{n} {m}' for m, n in how[2].items())} @ {cost:g}"
+    return f"{how.shop}/{how.key} @ {cost:g}"
+
+
+def print_cycles(cycles, costs, best, multiplier):
+    for profit, cost, revenue, (output, count, inputs) in cycles:
+        seller = best[output][1]
+        print(f"  💸 {count} {output}: +{profit:g} ({profit / cost * 100:.0f}% on {cost:g})")
+        for material, n in inputs.items():
+            print(f"       buy {n} × {material:<22} {_source(costs, material)}")
+        print(f"       sell to {seller.shop}/{seller.key} @ {seller.sell:g} × {multiplier:g} = {revenue:g}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find buy-craft-sell loops that make money")
+    parser.add_argument("--recipes", metavar="TOML", action="append", default=[],
+                        help="extra [[recipe]] file (output, count, inputs = {material = n}); repeatable")
+    parser.add_argument("--no-bundled", action="store_true", help="only use recipes from --recipes files")
+    parser.add_argument("--rank", help="use this Sell_Multipliers rank (default: the highest one)")
+    parser.add_argument("--min-profit", type=float, default=0.0,
+                        help="ignore loops that make this much or less per craft (default: 0)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    recipes = [] if args.no_bundled else bundled_recipes()
+    for path in args.recipes:
+        recipes.extend(load_recipe_file(path))
+
+    try:
+        rank, multiplier = sell_multiplier(args.rank)
+    except KeyError:
+        parser.error(f"unknown rank {args.rank!r} in Sell_Multipliers")
+
+    products = []
+    for path in sorted(glob.glob(os.path.join(SHOPS_DIR, "*.yml"))):
+        products.extend(load_shop_products(path))
+    cheapest, best = price_index(products, multiplier)
+    costs = acquisition_costs(cheapest, recipes)
+    cycles = find_cycles(costs, best, recipes, args.min_profit)
+    seconds = time.perf_counter() - started
+
+    print(f"🔎 {len(recipes)} recipes against {len(products)} products, "
+          f"SELL × {multiplier:g} ({rank}) in {seconds * 1000:.0f} ms")
+    if not cycles:
+        print("✅ No buy-craft-sell loop makes money")
+        return 0
+    print_cycles(cycles, costs, best, multiplier)
+    print(f"❌ {len(cycles)} profitable loop(s)")
+    return 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,171 @@
+"""
+NaturalSMP Economy Overhaul - Global Material Index
+One material -> [(shop, item key, price type, buy, sell)] index over every
+virtual_shop/shops/*.yml, cached on disk per shop file so only files that
+changed since the last run are parsed again. Flags materials whose prices
+disagree between shops, above all ones a player can buy in one place for less
+than another place buys them back.
+
+    python material_index.py                  # refresh the cache, list conflicts
+    python material_index.py --material arrow
+"""
+import argparse
+import time
+from collections import defaultdict
+
+from product_table import CACHE_PATH, ProductTable, load_catalogue
+from shop_materials import SHOPS_DIR, sell_multiplier
+
+# Conflict kinds, most serious first
+ARBITRAGE, TYPE_MISMATCH, PRICE_MISMATCH = 'arbitrage', 'type', 'price'
+KINDS = (ARBITRAGE, TYPE_MISMATCH, PRICE_MISMATCH)
+
+
+# ============================================================================
+# INDEX
+# Backed by the columnar product table and its on-disk cache (product_table.py).
+# ============================================================================
+class MaterialIndex:
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self.cached = None
+        self.table = ProductTable()
+
+    @classmethod
+    def load(cls, path=CACHE_PATH):
+        index = cls(path)
+        index.cached = ProductTable.load(path)
+        return index
+
+    def refresh(self, shops_dir=SHOPS_DIR):
+        """Re-parse every shop file that changed and drop deleted ones.
+        Returns (files parsed, files reused)."""
+        self.table, parsed, reused = load_catalogue(self.cached, shops_dir)
+        return parsed, reused
+
+    def products(self):
+        return self.table.products()
+
+    def by_material(self):
+        """{material: [(shop, item key, price type, buy, sell)]}"""
+        materials = defaultdict(list)
+        for product in self.products():
+            if product.material is not None:
+                materials[product.material].append(
+                    (product.shop, product.key, product.price_type, product.buy, product.sell)
+                )
+        return dict(materials)
+
+    def save(self):
+        if self.cached is None or self.table.files != self.cached.files:
+            self.table.save(self.path)
+            self.cached = self.table
+
+
+# ============================================================================
+# CONFLICTS
+# Only products with the same product key (potion:healing, not just potion) and
+# currency are compared, on per-item prices.
+# ============================================================================
+def find_conflicts(products, multiplier=1.0):
+    """[(kind, product key, currency, message)] sorted by kind, then product key."""
+    groups = defaultdict(list)
+    for product in products:
+        if product.product_key is not None:
+            groups[(product.product_key, product.currency)].append(product)
+
+    conflicts = []
+    for (product_key, currency), group in groups.items():
+        if len(group) < 2 and not any(_buy_below_sell(p, p, multiplier) for p in group):
+            continue
+        buyers = [p for p in group if p.buy is not None]
+        sellers = [p for p in group if p.sell is not None]
+        if buyers and sellers:
+            cheapest = min(buyers, key=lambda p: p.unit(p.buy))
+            best = max(sellers, key=lambda p: p.unit(p.sell))
+            if _buy_below_sell(cheapest, best, multiplier):
+                conflicts.append((ARBITRAGE, product_key, currency,
+                                  f"buy at {_where(cheapest)} for {cheapest.unit(cheapest.buy):g}, "
+                                  f"sell at {_where(best)} for {best.unit(best.sell) * multiplier:g}"))
+        types = {p.price_type for p in group if p.price_type}
+        if len(types) > 1:
+            conflicts.append((TYPE_MISMATCH, product_key, currency, ', '.join(
+                f"{p.price_type} in {_where(p)}" for p in group if p.price_type)))
+        for side in ('buy', 'sell'):
+            prices = {p.unit(getattr(p, side)) for p in group if getattr(p, side) is not None}
+            if len(prices) > 1:
+                conflicts.append((PRICE_MISMATCH, product_key, currency, f"{side.upper()} " + ', '.join(
+                    f"{p.unit(getattr(p, side)):g} in {_where(p)}" for p in group if getattr(p, side) is not None)))
+    conflicts.sort(key=lambda c: (KINDS.index(c[0]), c[1]))
+    return conflicts
+
+
+def _buy_below_sell(buyer, seller, multiplier):
+    if buyer.buy is None or seller.sell is None:
+        return False
+    return buyer.unit(buyer.buy) < seller.unit(seller.sell) * multiplier - 1e-9
+
+
+def _where(product):
+    return f"{product.shop}/{product.key}"
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+KIND_ICONS = {ARBITRAGE: "💸", TYPE_MISMATCH: "🔀", PRICE_MISMATCH: "⚖️ "}
+
+
+def print_material(materials, material):
+    entries = materials.get(material)
+    if not entries:
+        print(f"  ⚠️  {material} is not sold in any shop")
+        return
+    print(f"  {material}:")
+    for shop, key, price_type, buy, sell in entries:
+        print(f"    {shop + '/' + key:<40} {price_type or '-':<8} "
+              f"BUY {'-' if buy is None else f'{buy:g}':>8}  SELL {'-' if sell is None else f'{sell:g}':>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index shop products by material and flag price conflicts")
+    parser.add_argument("--material", action="append", default=[], metavar="ID",
+                        help="print every shop entry for this material (e.g. arrow); repeatable")
+    parser.add_argument("--rank", help="scale SELL by this Sell_Multipliers rank (default: none)")
+    parser.add_argument("--full", action="store_true", help="ignore the cache and parse every shop file")
+    args = parser.parse_args(argv)
+
+    multiplier = 1.0
+    if args.rank:
+        try:
+            multiplier = sell_multiplier(args.rank)[1]
+        except KeyError:
+            parser.error(f"unknown rank {args.rank!r} in Sell_Multipliers")
+
+    started = time.perf_counter()
+    index = MaterialIndex() if args.full else MaterialIndex.load()
+    parsed, reused = index.refresh()
+    index.save()
+    materials = index.by_material()
+    conflicts = find_conflicts(index.products(), multiplier)
+    seconds = time.perf_counter() - started
+
+    print(f"📇 {len(materials)} materials in {parsed + reused} shops "
+          f"({parsed} parsed, {reused} from cache) in {seconds * 1000:.0f} ms")
+    for material in args.material:
+        print_material(materials, material)
+    if args.material:
+        return 0
+
+    for kind, product_key, currency, message in conflicts:
+        suffix = "" if currency == "vault" else f" [{currency}]"
+        print(f"  {KIND_ICONS[kind]} {product_key}{suffix}: {message}")
+    arbitrage = sum(1 for c in conflicts if c[0] == ARBITRAGE)
+    if not conflicts:
+        print("✅ No conflicting prices between shops")
+        return 0
+    print(f"{'❌' if arbitrage else '⚠️ '} {len(conflicts)} conflict(s), {arbitrage} buy-below-sell")
+    return 1 if arbitrage else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,184 @@
+"""
+NaturalSMP Economy Overhaul - Price Catalogue Loader
+Reads price_catalog.toml (shop -> item -> [TYPE, BUY, SELL, {offsets}]) and keeps
+a marshal cache in __pycache__ keyed by the catalogue's sha256, so later runs
+skip TOML parsing and unpack only the shop tables a phase asks for.
+"""
+import hashlib
+import marshal
+import os
+import struct
+
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "price_catalog.toml")
+
+CACHE_MAGIC = b"ESPRICE1"
+PRICE_TYPES = ('FLAT', 'DYNAMIC')
+# Keyword arguments accepted by dynamic_block() in both engines
+DYNAMIC_OPTIONS = ('buy_off', 'sell_off', 'min_off', 'max_off', 'stab_interval', 'stab_amount')
+
+
+class CatalogError(ValueError):
+    pass
+
+
+# ============================================================================
+# PARSING
+# Entries become (type, buy, sell) or (type, buy, sell, {offsets}) tuples,
+# the same shape the engines have always used.
+# ============================================================================
+def _entry(shop, item, value):
+    where = f"{shop}.{item}"
+    if not isinstance(value, list) or len(value) not in (3, 4):
+        raise CatalogError(f"{where}: expected [TYPE, BUY, SELL] or [TYPE, BUY, SELL, {{...}}]")
+    price_type, buy, sell = value[0], value[1], value[2]
+    if price_type not in PRICE_TYPES:
+        raise CatalogError(f"{where}: type must be one of {', '.join(PRICE_TYPES)}, got {price_type!r}")
+    for label, number in (('BUY', buy), ('SELL', sell)):
+        if isinstance(number, bool) or not isinstance(number, (int, float)):
+            raise CatalogError(f"{where}: {label} must be a number, got {number!r}")
+    if len(value) == 3:
+        return (price_type, float(buy), float(sell))
+
+    options = value[3]
+    if not isinstance(options, dict):
+        raise CatalogError(f"{where}: fourth element must be a table of dynamic options")
+    unknown = set(options) - set(DYNAMIC_OPTIONS)
+    if unknown:
+        raise CatalogError(f"{where}: unknown dynamic options {', '.join(sorted(unknown))}")
+    return (price_type, float(buy), float(sell), dict(options))
+
+
+def parse_catalog(data):
+    """Parse catalogue bytes into {shop: {item: entry}}."""
+    try:
+        import tomllib
+    except ImportError:     # Python < 3.11
+        import tomli as tomllib
+
+    try:
+        raw = tomllib.loads(data.decode('utf-8'))
+    except tomllib.TOMLDecodeError as e:
+        raise CatalogError(f"price catalogue is not valid TOML: {e}") from None
+
+    shops = {}
+    for shop, table in raw.items():
+        if not isinstance(table, dict):
+            raise CatalogError(f"{shop}: expected a [{shop}] table")
+        shops[shop] = {item: _entry(shop, item, value) for item, value in table.items()}
+    return shops
+
+
+# ============================================================================
+# CACHE
+# Layout: magic | sha256 of the catalogue (32 bytes) | u32 header length |
+#         marshal {shop: (offset, length)} | one marshal blob per shop
+# ============================================================================
+def cache_path_for(path):
+    directory, name = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, "__pycache__", name + ".cache")
+
+
+def _write_cache(cache_path, digest, shops):
+    blobs = []
+    offsets = {}
+    pos = 0
+    for shop, table in shops.items():
+        blob = marshal.dumps(table)
+        offsets[shop] = (pos, len(blob))
+        blobs.append(blob)
+        pos += len(blob)
+    header = marshal.dumps(offsets)
+
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(CACHE_MAGIC + digest + struct.pack('<I', len(header)) + header)
+        f.writelines(blobs)
+    os.replace(tmp, cache_path)
+
+
+def _read_cache(cache_path, digest):
+    """Return (offset table, data bytes) or None when the cache is missing, stale
+    or truncated."""
+    try:
+        with open(cache_path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    start = len(CACHE_MAGIC)
+    if data[:start] != CACHE_MAGIC or data[start:start + 32] != digest or len(data) < start + 36:
+        return None
+    (header_len,) = struct.unpack_from('<I', data, start + 32)
+    body = start + 36 + header_len
+    if len(data) < body:
+        return None
+    try:
+        offsets = marshal.loads(data[start + 36:body])
+        # Every shop blob must lie inside the file, or prices() would unmarshal a cut one
+        if any(offset + length > len(data) - body for offset, length in offsets.values()):
+            return None
+    except (EOFError, ValueError, TypeError, AttributeError):
+        return None
+    return offsets, memoryview(data)[body:]
+
+
+# ============================================================================
+# CATALOGUE
+# ============================================================================
+class PriceCatalog:
+    """Shop price tables from the catalogue, unpacked one shop at a time."""
+
+    def __init__(self, path=CATALOG_PATH, use_cache=True):
+        self.path = path
+        self.use_cache = use_cache
+        self._offsets = None
+        self._data = None
+        self._tables = {}
+        self._loaded = False
+
+    def _load(self):
+        if self._loaded:
+            return
+        with open(self.path, 'rb') as f:
+            source = f.read()
+        digest = hashlib.sha256(source).digest()
+        cache_path = cache_path_for(self.path)
+
+        cached = _read_cache(cache_path, digest) if self.use_cache else None
+        if cached is not None:
+            self._offsets, self._data = cached
+        else:
+            self._tables = parse_catalog(source)
+            self._offsets = {shop: None for shop in self._tables}
+            if self.use_cache:
+                try:
+                    _write_cache(cache_path, digest, self._tables)
+                except OSError:
+                    pass        # read-only install: just parse every run
+        self._loaded = True
+
+    def shops(self):
+        self._load()
+        return list(self._offsets)
+
+    def prices(self, shop):
+        """Price table for one shop ({} if the catalogue has none)."""
+        self._load()
+        if shop not in self._tables:
+            span = self._offsets.get(shop)
+            if span is None:
+                return {}
+            offset, length = span
+            self._tables[shop] = marshal.loads(self._data[offset:offset + length])
+        return self._tables[shop]
+
+
+_default = None
+
+
+def load_prices(shop):
+    """Price table for `shop` from the default catalogue next to the scripts."""
+    global _default
+    if _default is None:
+        _default = PriceCatalog()
+    return _default.prices(shop)
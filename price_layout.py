@@ -0,0 +1,109 @@
+"""
+NaturalSMP Economy Overhaul - Price Block Layouts
+Parses a Price block written by either engine (v1: Buy:/Sell: + Start:, FLAT as
+SELL then BUY; v2: BUY:/SELL: + StartValue:) and renders it back in the layout
+the in-game editor writes. Values are kept as the exact strings from the file.
+"""
+
+# ============================================================================
+# EDITOR LAYOUT
+# Key order inside each section, as the in-game editor saves it.
+# ============================================================================
+SIDES = ('BUY', 'SELL')
+SIDE_KEYS = ('StartValue', 'BuyOffset', 'SellOffset', 'MinOffset', 'MaxOffset')
+STABILIZATION_KEYS = ('Interval', 'Amount')
+
+# Old spellings -> editor spelling
+KEY_ALIASES = {
+    'Buy': 'BUY',
+    'Sell': 'SELL',
+    'Start': 'StartValue',
+}
+
+
+class PriceLayoutError(ValueError):
+    pass
+
+
+def _split(line):
+    key, sep, value = line.strip().partition(':')
+    if not sep:
+        raise PriceLayoutError(f"not a key: {line.strip()!r}")
+    key = key.strip()
+    return KEY_ALIASES.get(key, key), value.strip()
+
+
+def parse_price_block(text):
+    """Parse a Price block ('    Price:' line optional) into
+    {'Type': str, 'BUY': str | {key: str}, 'SELL': ..., 'Stabilization': {key: str}}.
+    Raises PriceLayoutError for anything the editor layout has no place for
+    (unknown keys, comments, unexpected nesting), so such blocks are left alone."""
+    price = {}
+    section = None
+    for line in text.split('\n'):
+        if not line.strip():
+            continue
+        indent = len(line) - len(line.lstrip(' '))
+        if line.strip().startswith('#'):
+            raise PriceLayoutError("comment inside Price block")
+        key, value = _split(line)
+        if indent == 4 and key == 'Price' and not value and not price:
+            continue
+        if indent == 6:
+            if key in price:
+                raise PriceLayoutError(f"duplicate key {key}")
+            if value:
+                if key not in ('Type',) + SIDES:
+                    raise PriceLayoutError(f"unknown key {key}")
+                price[key] = value
+                section = None
+            else:
+                if key not in SIDES + ('Stabilization',):
+                    raise PriceLayoutError(f"unknown section {key}")
+                section = price[key] = {}
+        elif indent == 8 and section is not None and value:
+            allowed = STABILIZATION_KEYS if section is price.get('Stabilization') else SIDE_KEYS
+            if key not in allowed or key in section:
+                raise PriceLayoutError(f"unexpected key {key}")
+            section[key] = value
+        else:
+            raise PriceLayoutError(f"unexpected line {line.strip()!r}")
+    if 'Type' not in price:
+        raise PriceLayoutError("no Type")
+    return price
+
+
+def render_price_block(price):
+    """Price block text in the editor layout, '    Price:' line included, no trailing newline."""
+    lines = ["    Price:", f"      Type: {price['Type']}"]
+    for name in SIDES + ('Stabilization',):
+        value = price.get(name)
+        if value is None:
+            continue
+        if isinstance(value, str):
+            lines.append(f"      {name}: {value}")
+            continue
+        lines.append(f"      {name}:")
+        for key in (STABILIZATION_KEYS if name == 'Stabilization' else SIDE_KEYS):
+            if key in value:
+                lines.append(f"        {key}: {value[key]}")
+    return '\n'.join(lines)
+
+
+def set_start_values(price, buy=None, sell=None):
+    """Set BUY/SELL of a parsed block, the StartValue for DYNAMIC sides; None leaves a side."""
+    for side, value in (('BUY', buy), ('SELL', sell)):
+        if value is None:
+            continue
+        if isinstance(price.get(side), dict):
+            price[side]['StartValue'] = f"{float(value)}"
+        else:
+            price[side] = f"{float(value)}"
+
+
+def normalize_price_block(text):
+    """Return (editor layout text, migrated) for a Price block, where migrated is
+    True if the block was not already in that layout (trailing blank lines aside).
+    Raises PriceLayoutError for blocks that cannot be parsed."""
+    rendered = render_price_block(parse_price_block(text))
+    return rendered, rendered != text.rstrip()
@@ -0,0 +1,412 @@
+"""
+NaturalSMP Economy Overhaul - Pricing Rules
+Default prices declared in price_rules.toml instead of per-shop handler code.
+Every [[rule]] selects products (shop, item key, material, product key globs),
+optionally matches their current price, and does one thing to it:
+
+    set     fixed BUY/SELL                   base stage
+    copy    another item's price             base stage
+    recipe  summed price of its ingredients  base stage
+    scale   multiply BUY/SELL                scale stage
+    clamp   keep BUY/SELL within [min, max]  clamp stage
+
+A product goes through the three stages in that order. In each stage the
+matching rule with the highest priority wins, ties going to the rule written
+first; a copy or recipe rule with nothing to copy falls through to the next.
+Rules are defaults: they skip products with a price_catalog.toml entry unless
+they say override = true. match tests the price before any rule, i.e. the
+catalogue entry where there is one, else the price in the shop file.
+
+Rules always start from that base price, never from their own output: the
+manifest keeps each ruled item's base and the price the rules gave it, and while
+the file still holds that price the recorded base is used instead. Re-running on
+a touched or plugin-saved file therefore gives the same prices; an item whose
+price was edited by hand takes the edited price as its new base.
+"""
+import hashlib
+import os
+import re
+
+from shop_index import read_price
+from shop_materials import item_snbt, match_product_keys, parse_item, split_product_prices
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "price_rules.toml")
+
+STAGES = ('base', 'scale', 'clamp')
+ACTIONS = {'set': 'base', 'copy': 'base', 'recipe': 'base', 'scale': 'scale', 'clamp': 'clamp'}
+SELECTORS = ('shop', 'item', 'material', 'product')
+MATCH_KEYS = ('type', 'buy', 'sell', 'buy_range', 'sell_range')
+RULE_KEYS = {'name', 'priority', 'override', 'match'} | set(SELECTORS) | set(ACTIONS)
+
+
+class RuleError(ValueError):
+    pass
+
+
+# ============================================================================
+# PATTERNS
+# A selector is a name or glob, or a list of them. '*' captures, so a copy rule
+# on item "deepslate_*_ore" can read from "{1}_ore".
+# ============================================================================
+def _glob_regex(pattern):
+    parts = []
+    for ch in pattern:
+        parts.append('(.*)' if ch == '*' else '(.)' if ch == '?' else re.escape(ch))
+    return re.compile(''.join(parts) + r'\Z')
+
+
+class Selector:
+    __slots__ = ('literals', 'globs')
+
+    def __init__(self, where, value):
+        names = [value] if isinstance(value, str) else value
+        if not isinstance(names, list) or not names or not all(isinstance(n, str) for n in names):
+            raise RuleError(f"{where}: expected a name, a glob or a list of them")
+        self.literals = frozenset(n for n in names if '*' not in n and '?' not in n)
+        self.globs = [_glob_regex(n) for n in names if '*' in n or '?' in n]
+
+    def match(self, name):
+        """() for a literal hit, the glob's captures, or None."""
+        if name is None:
+            return None
+        if name in self.literals:
+            return ()
+        for regex in self.globs:
+            found = regex.match(name)
+            if found:
+                return found.groups()
+        return None
+
+
+# ============================================================================
+# RULES
+# ============================================================================
+def _number(where, value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise RuleError(f"{where}: expected a number, got {value!r}")
+    return float(value)
+
+
+def _sides(where, value, each):
+    """{'buy': x, 'sell': y} from a table with buy and/or sell, or one value for both."""
+    if isinstance(value, dict):
+        unknown = set(value) - {'buy', 'sell'}
+        if unknown or not value:
+            raise RuleError(f"{where}: expected a table with buy and/or sell")
+        return {side: each(f"{where}.{side}", v) for side, v in value.items()}
+    return {'buy': each(where, value), 'sell': each(where, value)}
+
+
+def _range(where, value):
+    if not isinstance(value, list) or len(value) != 2:
+        raise RuleError(f"{where}: expected [min, max]")
+    low, high = _number(where, value[0]), _number(where, value[1])
+    if low > high:
+        raise RuleError(f"{where}: min is above max")
+    return low, high
+
+
+class Rule:
+    __slots__ = ('name', 'order', 'priority', 'override', 'action', 'stage', 'value',
+                 'shop', 'item', 'material', 'product', 'match', 'source')
+
+    def __init__(self, order, raw):
+        self.order = order
+        self.name = raw.get('name') or f"rule #{order + 1}"
+        where = self.name
+        unknown = set(raw) - RULE_KEYS
+        if unknown:
+            raise RuleError(f"{where}: unknown keys {', '.join(sorted(unknown))}")
+        actions = [a for a in ACTIONS if a in raw]
+        if len(actions) != 1:
+            raise RuleError(f"{where}: needs exactly one of {', '.join(ACTIONS)}")
+        self.action = actions[0]
+        self.stage = ACTIONS[self.action]
+        self.priority = int(raw.get('priority', 0))
+        self.override = bool(raw.get('override', False))
+        for selector in SELECTORS:
+            setattr(self, selector, Selector(f"{where}.{selector}", raw[selector]) if selector in raw else None)
+        self.match = self._match(where, raw.get('match', {}))
+        self.value = self._value(where, raw[self.action])
+        self.source = raw
+
+    def _match(self, where, match):
+        if not isinstance(match, dict) or set(match) - set(MATCH_KEYS):
+            raise RuleError(f"{where}.match: keys must be among {', '.join(MATCH_KEYS)}")
+        compiled = {}
+        for key, value in match.items():
+            if key == 'type':
+                compiled[key] = value
+            elif key.endswith('_range'):
+                compiled[key] = _range(f"{where}.match.{key}", value)
+            else:
+                values = value if isinstance(value, list) else [value]
+                compiled[key] = frozenset(_number(f"{where}.match.{key}", v) for v in values)
+        return compiled
+
+    def _value(self, where, value):
+        where = f"{where}.{self.action}"
+        if self.action == 'set':
+            if not isinstance(value, dict):
+                raise RuleError(f"{where}: expected a table with buy and/or sell")
+            return _sides(where, value, _number)
+        if self.action == 'scale':
+            return _sides(where, value, _number)
+        if self.action == 'clamp':
+            return _sides(where, value, _range)
+        if self.action == 'copy':
+            if not isinstance(value, str) or not value:
+                raise RuleError(f"{where}: expected an item key or shop/item")
+            return value
+        if value is not True:
+            raise RuleError(f"{where}: expected true")
+        return value
+
+    def matches(self, product):
+        """Captures of the item glob (or ()) if this rule applies to product, else None."""
+        key, material, product_key, price_type, buy, sell, _listed = product
+        captures = ()
+        if self.item is not None:
+            captures = self.item.match(key)
+            if captures is None:
+                return None
+        if self.material is not None and self.material.match(material) is None:
+            return None
+        if self.product is not None and self.product.match(product_key) is None:
+            return None
+        match = self.match
+        if match:
+            if 'type' in match and price_type != match['type']:
+                return None
+            for side, current in (('buy', buy), ('sell', sell)):
+                if side in match and current not in match[side]:
+                    return None
+                limits = match.get(side + '_range')
+                if limits and (current is None or not limits[0] <= current <= limits[1]):
+                    return None
+        return captures
+
+
+def load_rules(path=RULES_PATH):
+    """[Rule] from a rules file, in file order; [] if there is no file."""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return []
+    try:
+        import tomllib
+    except ImportError:     # Python < 3.11
+        import tomli as tomllib
+    try:
+        raw = tomllib.loads(data.decode('utf-8'))
+    except tomllib.TOMLDecodeError as e:
+        raise RuleError(f"{os.path.basename(path)} is not valid TOML: {e}") from None
+    rules = raw.get('rule', [])
+    if not isinstance(rules, list) or set(raw) - {'rule'}:
+        raise RuleError(f"{os.path.basename(path)}: expected only [[rule]] tables")
+    return [Rule(order, rule) for order, rule in enumerate(rules)]
+
+
+# ============================================================================
+# SHOP PLANS
+# ============================================================================
+def _scale(value, factor):
+    # -1 (or anything not above 0) is a disabled side and stays that way
+    return value if value is None or value <= 0 else round(value * factor, 2)
+
+
+def _clamp(value, limits):
+    return value if value is None or value <= 0 else min(max(value, limits[0]), limits[1])
+
+
+class ShopRules:
+    """Every rule that can touch one shop, grouped by stage and indexed by literal
+    item key and material, so one pass over the shop's products evaluates them all.
+    Also the shop's manifest handler: fingerprint() changes with its rules.
+    bases is the manifest's {item: (base buy, base sell, ruled buy, ruled sell)}."""
+
+    def __init__(self, shop, rules, prices, context, priced_only=False, bases=None):
+        self.shop = shop
+        self.rules = rules
+        self.prices = prices
+        self.context = context
+        self.priced_only = priced_only
+        self.bases = bases or {}
+        self.listed, self.by_product = split_product_prices(prices)
+        self.plan = {stage: ({}, {}, []) for stage in STAGES}
+        for rule in sorted(rules, key=lambda r: (-r.priority, r.order)):
+            by_item, by_material, generic = self.plan[rule.stage]
+            if rule.item is not None and not rule.item.globs:
+                for name in rule.item.literals:
+                    by_item.setdefault(name, []).append(rule)
+            elif rule.material is not None and not rule.material.globs:
+                for name in rule.material.literals:
+                    by_material.setdefault(name, []).append(rule)
+            else:
+                generic.append(rule)
+
+    def fingerprint(self):
+        return hashlib.sha1(repr([r.source for r in self.rules]).encode('utf-8')).hexdigest()[:16]
+
+    def priced(self):
+        """The same plan, limited to items the caller prices from the catalogue."""
+        return ShopRules(self.shop, self.rules, self.prices, self.context, priced_only=True,
+                         bases=self.bases)
+
+    def _candidates(self, stage, key, material):
+        by_item, by_material, generic = self.plan[stage]
+        found = by_item.get(key, []) + by_material.get(material, []) + generic
+        if len(found) > 1:
+            found.sort(key=lambda r: (-r.priority, r.order))
+        return found
+
+    def evaluate(self, content, index, only=None):
+        """{item: (buy, sell, catalogue entry or None, [rule names], base)} for every
+        indexed item a rule applies to. Catalogue-priced items start from their entry
+        (base is None); the rest from the price in the file, or from the recorded base
+        while the file still holds the recorded rule output (base is that start
+        price). With only, just those items are looked at."""
+        listed = self.listed
+        matches = match_product_keys(content, index, self.by_product)
+        if matches:
+            listed = dict(listed)
+            for item, product_key in matches.items():
+                listed.setdefault(item, self.by_product[product_key])
+
+        results = {}
+        for key, spans in index.items():
+            if spans.price is None or (only is not None and key not in only):
+                continue
+            entry = listed.get(key)
+            if self.priced_only and entry is None:
+                continue
+            snbt = item_snbt(content, spans)
+            material, product_key, _count = parse_item(snbt) if snbt else (None, None, 1)
+            if entry is not None:
+                price_type, buy, sell = entry[0], entry[1], entry[2]
+            else:
+                price_type, buy, sell = read_price(content[spans.price[0]:spans.price[1]])
+                recorded = self.bases.get(key)
+                if recorded is not None and (buy, sell) == tuple(recorded[2:]):
+                    buy, sell = recorded[0], recorded[1]
+            product = (key, material, product_key, price_type, buy, sell, entry)
+            prices = (buy, sell)
+            applied = []
+            for stage in STAGES:
+                for rule in self._candidates(stage, key, material):
+                    if entry is not None and not rule.override:
+                        continue
+                    captures = rule.matches(product)
+                    if captures is None:
+                        continue
+                    new = self._apply(rule, prices, captures, material)
+                    if new is not None:
+                        prices = new
+                        applied.append(rule.name)
+                        break
+            if applied:
+                results[key] = (prices[0], prices[1], entry, applied, None if entry is not None else (buy, sell))
+        return results
+
+    def _apply(self, rule, prices, captures, material):
+        buy, sell = prices
+        value = rule.value
+        if rule.action == 'set':
+            return value.get('buy', buy), value.get('sell', sell)
+        if rule.action == 'scale':
+            return _scale(buy, value.get('buy', 1.0)), _scale(sell, value.get('sell', 1.0))
+        if rule.action == 'clamp':
+            return (_clamp(buy, value['buy']) if 'buy' in value else buy,
+                    _clamp(sell, value['sell']) if 'sell' in value else sell)
+        if rule.action == 'copy':
+            try:
+                source = value.format(None, *captures)
+            except (IndexError, KeyError):
+                raise RuleError(f"{rule.name}: copy {value!r} uses a capture its item glob does not have")
+            shop, _sep, item = source.rpartition('/')
+            return self.context.price_of(shop or self.shop, item)
+        return self.context.recipe_price(material)
+
+
+# ============================================================================
+# CONTEXT
+# Prices other shops' rules may read: catalogue entries first, then the prices
+# currently in the shop files (from the material index cache).
+# ============================================================================
+class RuleContext:
+    def __init__(self, prices_for):
+        self.prices_for = prices_for
+        self._products = None
+        self._cheapest = None
+        self._best = None
+        self._recipes = None
+
+    def _index(self):
+        if self._products is None:
+            from material_index import MaterialIndex
+
+            index = MaterialIndex.load()
+            index.refresh()
+            index.save()
+            self._products = {(p.shop, p.key): p for p in index.products()}
+        return self._products
+
+    def price_of(self, shop, item):
+        """(buy, sell) of shop/item, or None if there is no such item."""
+        entry = self.prices_for(shop).get(item)
+        if entry is not None:
+            return entry[1], entry[2]
+        product = self._index().get((shop, item))
+        if product is None:
+            return None
+        return (product.buy if product.buy is not None else -1.0,
+                product.sell if product.sell is not None else -1.0)
+
+    def recipe_price(self, material):
+        """Ingredient BUY/SELL sums of the cheapest bundled recipe for material, per
+        item made; SELL is -1 if an ingredient cannot be sold. None without a recipe."""
+        if self._recipes is None:
+            from check_arbitrage import bundled_recipes, price_index
+
+            self._cheapest, self._best = price_index(self._index().values(), 1.0)
+            self._recipes = {}
+            for output, count, inputs in bundled_recipes():
+                self._recipes.setdefault(output, []).append((count, inputs))
+        derived = None
+        for count, inputs in self._recipes.get(material, ()):
+            if not all(m in self._cheapest for m in inputs):
+                continue
+            buy = round(sum(n * self._cheapest[m][0] for m, n in inputs.items()) / count, 2)
+            sellable = all(m in self._best for m in inputs)
+            sell = round(sum(n * self._best[m][0] for m, n in inputs.items()) / count, 2) if sellable else -1.0
+            if derived is None or buy < derived[0]:
+                derived = (buy, sell)
+        return derived
+
+
+def rule_bases(results):
+    """Manifest form of evaluate() results for the items priced from the shop file:
+    {item: [base buy, base sell, ruled buy, ruled sell]}."""
+    return {key: [base[0], base[1], buy, sell]
+            for key, (buy, sell, _entry, _applied, base) in results.items() if base is not None}
+
+
+_rules = None
+
+
+def reload_rules():
+    """Read the default rules file again; shop_rules() uses the new rules from now on.
+    A broken file raises RuleError and the rules loaded before stay in use."""
+    global _rules
+    _rules = load_rules(RULES_PATH)
+    return _rules
+
+
+def shop_rules(shop, prices, context, bases=None):
+    """ShopRules for shop from the default rules file, or None if no rule selects it."""
+    global _rules
+    if _rules is None:
+        _rules = load_rules()
+    selected = [r for r in _rules if r.shop is None or r.shop.match(shop) is not None]
+    return ShopRules(shop, selected, prices, context, bases=bases) if selected else None
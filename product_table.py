@@ -0,0 +1,319 @@
+"""
+NaturalSMP Economy Overhaul - Columnar Product Table
+Every product of every shop file in one table: numbers live in typed arrays
+(one per column), shop / currency / material / product key / price type are
+small integer codes into interned string pools, and item keys are one packed
+string. Filled straight from the index_shop_items() spans and cached on disk
+as raw array bytes per shop file, so a warm load is a stat per file plus a
+few frombytes() calls.
+
+    python product_table.py           # refresh the cache, print size and timing
+"""
+import argparse
+import array
+import glob
+import json
+import math
+import os
+import struct
+import sys
+import time
+
+from shop_index import index_shop_items, read_price, read_shop_view, read_stock
+from shop_manifest import file_sha256
+from shop_materials import (
+    CURRENCY_PREFIX, DEFAULT_CURRENCY, SHOPS_DIR, Product, available_price, item_field, item_snbt,
+    parse_item, shop_flags,
+)
+
+SHOP_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_PATH = os.path.join(SHOP_DIR, "virtual_shop", "product_table.bin")
+CACHE_VERSION = 1
+CACHE_MAGIC = b'PTBL'
+HEADER_LENGTH = struct.Struct('<I')
+
+NAN = float('nan')
+UNSET = -1      # stock limits (unlimited), slot and page when the block is missing
+
+# (column, array typecode). Prices are NaN where that side is unavailable, as
+# read_shop_products() returns None; start/end are the item's character offsets.
+NUMERIC = (
+    ('buy', 'd'), ('sell', 'd'), ('count', 'H'),
+    ('global_buy', 'i'), ('global_sell', 'i'), ('global_restock', 'i'),
+    ('player_buy', 'i'), ('player_sell', 'i'), ('player_restock', 'i'),
+    ('slot', 'h'), ('page', 'h'),
+    ('start', 'I'), ('end', 'I'),
+)
+# (column, array typecode) of codes into the pool of the same name; 0 is None
+CODED = (('shop', 'H'), ('currency', 'H'), ('price_type', 'H'), ('material', 'I'), ('product_key', 'I'))
+COLUMNS = NUMERIC + CODED
+STOCK_COLUMNS = (
+    ('GLOBAL', 'BuyAmount', 'global_buy'), ('GLOBAL', 'SellAmount', 'global_sell'),
+    ('GLOBAL', 'RestockTime', 'global_restock'), ('PLAYER', 'BuyAmount', 'player_buy'),
+    ('PLAYER', 'SellAmount', 'player_sell'), ('PLAYER', 'RestockTime', 'player_restock'),
+)
+
+
+class StringPool:
+    """Append-only list of interned strings; code 0 is None."""
+    __slots__ = ('strings', 'codes')
+
+    def __init__(self, strings=(None,)):
+        self.strings = [s if s is None else sys.intern(s) for s in strings]
+        self.codes = {s: code for code, s in enumerate(self.strings)}
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.strings)
+            self.strings.append(sys.intern(value))
+        return code
+
+    def __getitem__(self, code):
+        return self.strings[code]
+
+
+# ============================================================================
+# TABLE
+# ============================================================================
+class ProductTable:
+    __slots__ = ('columns', 'pools', 'key_text', 'key_ends', 'pending_keys', 'files')
+
+    def __init__(self, pools=None):
+        self.columns = {name: array.array(code) for name, code in COLUMNS}
+        self.pools = {name: StringPool(pools[name] if pools else (None,)) for name, _code in CODED}
+        self.key_text = ''
+        self.key_ends = array.array('I')
+        self.pending_keys = []
+        self.files = {}         # shop file name -> {mtime_ns, size, sha256, rows: [first, end]}
+
+    def __len__(self):
+        return len(self.columns['buy'])
+
+    def _pack_keys(self):
+        if self.pending_keys:
+            end = len(self.key_text)
+            for key in self.pending_keys:
+                end += len(key)
+                self.key_ends.append(end)
+            self.key_text += ''.join(self.pending_keys)
+            self.pending_keys = []
+
+    def key(self, row):
+        self._pack_keys()
+        return self.key_text[self.key_ends[row - 1] if row else 0:self.key_ends[row]]
+
+    def value(self, name, row):
+        """One cell decoded: pool strings for coded columns, None for NaN prices and
+        UNSET slot/page; stock limits stay as stored (-1 is unlimited)."""
+        raw = self.columns[name][row]
+        if name in self.pools:
+            return self.pools[name][raw]
+        if name in ('buy', 'sell'):
+            return None if math.isnan(raw) else raw
+        if name in ('slot', 'page'):
+            return None if raw == UNSET else raw
+        return raw
+
+    def product(self, row):
+        v = self.value
+        return Product(v('shop', row), self.key(row), v('material', row), v('product_key', row),
+                       v('count', row), v('currency', row), v('price_type', row), v('buy', row), v('sell', row))
+
+    def products(self):
+        for row in range(len(self)):
+            yield self.product(row)
+
+    def rows(self, shop):
+        """range of the rows loaded from one shop, or an empty range."""
+        record = self.files.get(shop + '.yml')
+        return range(*record['rows']) if record else range(0)
+
+    def nbytes(self):
+        """Bytes held by the columns and packed keys (pools excluded)."""
+        self._pack_keys()
+        total = sum(col.itemsize * len(col) for col in self.columns.values())
+        return total + self.key_ends.itemsize * len(self.key_ends) + len(self.key_text)
+
+    # ------------------------------------------------------------------------
+    # Filling
+    # ------------------------------------------------------------------------
+    def load_shop(self, content, shop, index=None):
+        """Append every product of one shop file; returns the number of rows added."""
+        index = index if index is not None else index_shop_items(content)
+        buying, selling = shop_flags(content)
+        cols = self.columns
+        shop_code = self.pools['shop'].code(shop)
+        currencies, types = self.pools['currency'], self.pools['price_type']
+        materials, product_keys = self.pools['material'], self.pools['product_key']
+        for key, spans in index.items():
+            snbt = item_snbt(content, spans)
+            material, key_of_product, count = parse_item(snbt) if snbt else (None, None, 1)
+            price_type = buy = sell = None
+            if spans.price is not None:
+                price_type, buy, sell = read_price(content[spans.price[0]:spans.price[1]])
+            buy = available_price(buy) if buying else None
+            sell = available_price(sell) if selling else None
+            stock = read_stock(content[spans.stock[0]:spans.stock[1]]) if spans.stock is not None else {}
+            slot, page = (read_shop_view(content[spans.shop_view[0]:spans.shop_view[1]])
+                          if spans.shop_view is not None else (None, None))
+
+            cols['buy'].append(NAN if buy is None else buy)
+            cols['sell'].append(NAN if sell is None else sell)
+            cols['count'].append(count)
+            for scope, field, name in STOCK_COLUMNS:
+                amount = stock.get(scope, {}).get(field)
+                cols[name].append(UNSET if amount is None else amount)
+            cols['slot'].append(UNSET if slot is None else slot)
+            cols['page'].append(UNSET if page is None else page)
+            cols['start'].append(spans.header[0])
+            cols['end'].append(spans.end)
+            cols['shop'].append(shop_code)
+            cols['currency'].append(currencies.code(item_field(content, spans, CURRENCY_PREFIX) or DEFAULT_CURRENCY))
+            cols['price_type'].append(types.code(price_type))
+            cols['material'].append(materials.code(material))
+            cols['product_key'].append(product_keys.code(key_of_product))
+            self.pending_keys.append(key)
+        return len(index)
+
+    def copy_rows(self, other, first, end):
+        """Append rows [first, end) of a table whose pools this table started from."""
+        for name, _code in COLUMNS:
+            self.columns[name].extend(other.columns[name][first:end])
+        other._pack_keys()
+        self._pack_keys()
+        key_start = other.key_ends[first - 1] if first else 0
+        shift = len(self.key_text) - key_start
+        self.key_ends.extend(array.array('I', (e + shift for e in other.key_ends[first:end])))
+        self.key_text += other.key_text[key_start:other.key_ends[end - 1] if end else 0]
+
+    # ------------------------------------------------------------------------
+    # Cache file: magic, header length, JSON header, then every column's raw
+    # bytes in COLUMNS order, key_ends, and the keys as UTF-8.
+    # ------------------------------------------------------------------------
+    def save(self, path=CACHE_PATH):
+        self._pack_keys()
+        keys = self.key_text.encode('utf-8')
+        header = json.dumps({
+            'version': CACHE_VERSION,
+            'byteorder': sys.byteorder,
+            'itemsizes': {code: array.array(code).itemsize for _name, code in COLUMNS + (('', 'I'),)},
+            'rows': len(self),
+            'key_bytes': len(keys),
+            'files': self.files,
+            'pools': {name: pool.strings for name, pool in self.pools.items()},
+        }, separators=(',', ':')).encode('utf-8')
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(CACHE_MAGIC + HEADER_LENGTH.pack(len(header)) + header)
+            for name, _code in COLUMNS:
+                f.write(self.columns[name].tobytes())
+            f.write(self.key_ends.tobytes())
+            f.write(keys)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=CACHE_PATH):
+        """The cached table, or None if there is no usable cache."""
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        if data[:4] != CACHE_MAGIC:
+            return None
+        try:
+            return cls._parse(data)
+        except (struct.error, KeyError, TypeError, ValueError):
+            # Truncated or damaged: rebuild from the shop files
+            return None
+
+    @classmethod
+    def _parse(cls, data):
+        """Table from cache bytes; None if they were written by another version or
+        are not exactly as long as the header says."""
+        view = memoryview(data)
+        (length,) = HEADER_LENGTH.unpack_from(data, 4)
+        pos = 4 + HEADER_LENGTH.size
+        header = json.loads(bytes(view[pos:pos + length]))
+        itemsizes = {code: array.array(code).itemsize for _name, code in COLUMNS + (('', 'I'),)}
+        if (not isinstance(header, dict) or header.get('version') != CACHE_VERSION
+                or header['byteorder'] != sys.byteorder or header['itemsizes'] != itemsizes):
+            return None
+        pos += length
+        rows = header['rows']
+        row_size = sum(itemsizes[code] for _name, code in COLUMNS + (('', 'I'),))
+        if pos + rows * row_size + header['key_bytes'] != len(data):
+            return None
+        table = cls(header['pools'])
+        for name, code in COLUMNS + (('', 'I'),):
+            size = rows * itemsizes[code]
+            col = table.columns[name] if name else table.key_ends
+            col.frombytes(view[pos:pos + size])
+            pos += size
+        table.key_text = bytes(view[pos:pos + header['key_bytes']]).decode('utf-8')
+        table.files = header['files']
+        return table
+
+
+# ============================================================================
+# CATALOGUE
+# ============================================================================
+def _fresh(filepath, record):
+    """Same stat-then-hash check as the run manifest. Returns the record to keep
+    (with a moved mtime updated) or None if the file changed."""
+    st = os.stat(filepath)
+    if st.st_mtime_ns == record['mtime_ns'] and st.st_size == record['size']:
+        return record
+    if st.st_size != record['size'] or file_sha256(filepath) != record['sha256']:
+        return None
+    return dict(record, mtime_ns=st.st_mtime_ns)
+
+
+def load_catalogue(cached=None, shops_dir=SHOPS_DIR):
+    """Table of every shops_dir/*.yml. Rows of files unchanged since `cached` was
+    built are copied from it; the rest are parsed. Returns (table, parsed, reused)."""
+    table = ProductTable({name: pool.strings for name, pool in cached.pools.items()} if cached else None)
+    parsed = reused = 0
+    for filepath in sorted(glob.glob(os.path.join(shops_dir, "*.yml"))):
+        name = os.path.basename(filepath)
+        first = len(table)
+        record = cached.files.get(name) if cached is not None else None
+        record = _fresh(filepath, record) if record is not None else None
+        if record is not None:
+            table.copy_rows(cached, *record['rows'])
+            reused += 1
+        else:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                st = os.fstat(f.fileno())
+                content = f.read()
+            table.load_shop(content, name[:-4])
+            record = {'mtime_ns': st.st_mtime_ns, 'size': st.st_size, 'sha256': file_sha256(filepath)}
+            parsed += 1
+        table.files[name] = dict(record, rows=[first, len(table)])
+    return table, parsed, reused
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load every shop product into the columnar product table")
+    parser.add_argument("--full", action="store_true", help="ignore the cache and parse every shop file")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    cached = None if args.full else ProductTable.load()
+    table, parsed, reused = load_catalogue(cached)
+    seconds = time.perf_counter() - started
+    if cached is None or table.files != cached.files:
+        table.save()
+
+    pools = ", ".join(f"{name} {len(pool.strings) - 1}" for name, pool in table.pools.items())
+    print(f"📦 {len(table)} products from {len(table.files)} shops ({parsed} parsed, {reused} from cache) "
+          f"in {seconds * 1000:.1f} ms")
+    print(f"   {table.nbytes() / 1024:.0f} KiB of columns; {pools}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,224 @@
+"""
+NaturalSMP Economy Overhaul - Plugin Database Sync
+After a reprice, the accumulated dynamic price state in data.db
+(excellentshop_price_data) still describes the old StartValue. This resets or
+rescales those rows for exactly the products whose start prices were changed,
+in one transaction, with WAL enabled so it can run next to the plugin.
+Stock limit changes (update_stock.py) are synced the same way against
+excellentshop_stocks: the remaining stock rows are cleared or clamped.
+"""
+import os
+import sqlite3
+import time
+
+from shop_index import read_price
+
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data.db")
+PRICE_TABLE = "excellentshop_price_data"
+INDEX_NAME = "excellentshop_price_data_product"
+SYNC_MODES = ('reset', 'rescale')
+STOCK_TABLE = "excellentshop_stocks"
+STOCK_INDEX_NAME = "excellentshop_stocks_product"
+STOCK_SYNC_MODES = ('clear', 'clamp')
+# Per-player rows are keyed by the player's UUID, anything else is a GLOBAL row
+PLAYER_HOLDER = "(length(holderId) = 36 AND substr(holderId, 9, 1) = '-')"
+
+
+# ============================================================================
+# CHANGE TRACKING
+# Engines record {item: (old_buy, old_sell, new_buy, new_sell)} on the staged
+# write, for Price blocks whose start values moved.
+# ============================================================================
+def start_changes(blocks):
+    """Build the change map from (item, old Price text, new Price text) triples."""
+    changes = {}
+    for item, old, new in blocks:
+        if item is None:
+            continue
+        _old_type, old_buy, old_sell = read_price(old)
+        _new_type, new_buy, new_sell = read_price(new)
+        if (old_buy, old_sell) != (new_buy, new_sell):
+            changes[item] = (old_buy, old_sell, new_buy, new_sell)
+    return changes
+
+
+def _ratio(old, new):
+    # Offsets are in currency; keep them proportional to the new start value.
+    # -1 disables a side, so a side turned on or off has nothing to scale: reset it
+    if old is None or new is None or old <= 0 or new <= 0:
+        return 0.0
+    return new / old
+
+
+# ============================================================================
+# SYNC
+# ============================================================================
+def connect(db_path):
+    conn = sqlite3.connect(db_path, timeout=10, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA busy_timeout=10000")
+    return conn
+
+
+def ensure_product_index(conn, table=PRICE_TABLE, index_name=INDEX_NAME):
+    """Create a (shopId, productId) index unless one already leads with those columns.
+    Returns True if it had to be created."""
+    for _seq, name, *_rest in conn.execute(f"PRAGMA index_list({table})"):
+        columns = [row[2] for row in conn.execute(f"PRAGMA index_info({name})")]
+        if columns[:2] == ['shopId', 'productId']:
+            return False
+    conn.execute(f"CREATE INDEX {index_name} ON {table}(shopId, productId)")
+    return True
+
+
+def sync_price_data(db_path, shop_changes, mode='reset'):
+    """Reset or rescale the price_data rows of every changed product.
+    shop_changes is {shop id: {item: (old_buy, old_sell, new_buy, new_sell)}}.
+    Returns (rows touched, products, seconds)."""
+    if mode not in SYNC_MODES:
+        raise ValueError(f"unknown sync mode {mode!r}")
+    started = time.perf_counter()
+    conn = connect(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            ensure_product_index(conn)
+            if mode == 'reset':
+                params = [(shop, item) for shop, items in shop_changes.items() for item in items]
+                cursor = conn.executemany(
+                    f"UPDATE {PRICE_TABLE} SET buyOffset = 0, sellOffset = 0, purchases = 0, sales = 0 "
+                    f"WHERE shopId = ? AND productId = ?",
+                    params,
+                )
+            else:
+                params = [
+                    (_ratio(old_buy, new_buy), _ratio(old_sell, new_sell), shop, item)
+                    for shop, items in shop_changes.items()
+                    for item, (old_buy, old_sell, new_buy, new_sell) in items.items()
+                ]
+                cursor = conn.executemany(
+                    f"UPDATE {PRICE_TABLE} SET buyOffset = buyOffset * ?, sellOffset = sellOffset * ? "
+                    f"WHERE shopId = ? AND productId = ?",
+                    params,
+                )
+            rows = cursor.rowcount
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+    return rows, len(params), time.perf_counter() - started
+
+
+def sync_committed(results, db_path, mode):
+    """Sync the products of every committed staged write and print the outcome."""
+    shop_changes = {}
+    for staged, error in results:
+        if error is None and staged.price_changes:
+            shop = os.path.splitext(os.path.basename(staged.target))[0]
+            shop_changes[shop] = staged.price_changes
+    if not shop_changes:
+        print(f"\n🗄️  {os.path.basename(db_path)}: no start prices changed, nothing to sync")
+        return
+    try:
+        rows, products, seconds = sync_price_data(db_path, shop_changes, mode)
+    except sqlite3.Error as e:
+        print(f"\n⚠️  {os.path.basename(db_path)} not synced: {e}")
+        return
+    print(f"\n🗄️  {os.path.basename(db_path)}: {mode} {rows} price rows for {products} products "
+          f"in {seconds * 1000:.1f} ms")
+
+
+# ============================================================================
+# STOCK SYNC
+# Stock changes are {item: (old stock or None, new stock)}, complete
+# {scope: {field: int}} maps as built by stock_policy.
+# ============================================================================
+def _stock_targets(shop_changes):
+    """(shop, item, scope, new limits) for every scope whose limits changed."""
+    for shop, items in shop_changes.items():
+        for item, (old, new) in items.items():
+            for scope, limits in new.items():
+                if old is None or old.get(scope) != limits:
+                    yield shop, item, scope, limits
+
+
+def sync_stock_data(db_path, shop_changes, mode='clear', now_ms=None):
+    """Clear or clamp the stock rows of every product scope whose limits changed.
+    clear deletes the rows, so the plugin starts them over at the new limits;
+    clamp caps the remaining buy/sell stock at the new amount and pulls the next
+    restock in to at most one new window from now. Returns (rows touched,
+    product scopes, seconds)."""
+    if mode not in STOCK_SYNC_MODES:
+        raise ValueError(f"unknown stock sync mode {mode!r}")
+    started = time.perf_counter()
+    if now_ms is None:
+        now_ms = int(time.time() * 1000)
+    by_scope = {'GLOBAL': [], 'PLAYER': []}
+    for shop, item, scope, limits in _stock_targets(shop_changes):
+        if mode == 'clear':
+            by_scope[scope].append((shop, item))
+        else:
+            restock = limits['RestockTime']
+            by_scope[scope].append((
+                limits['BuyAmount'], limits['SellAmount'],
+                now_ms + restock * 1000 if restock > 0 else None, shop, item,
+            ))
+
+    conn = connect(db_path)
+    rows = 0
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            ensure_product_index(conn, STOCK_TABLE, STOCK_INDEX_NAME)
+            for scope, params in by_scope.items():
+                if not params:
+                    continue
+                holder = PLAYER_HOLDER if scope == 'PLAYER' else f"NOT {PLAYER_HOLDER}"
+                if mode == 'clear':
+                    sql = f"DELETE FROM {STOCK_TABLE} WHERE shopId = ? AND productId = ? AND {holder}"
+                else:
+                    # -1 is unlimited and a restock time of 0 never restocks: leave those alone
+                    sql = (f"UPDATE {STOCK_TABLE} SET "
+                           f"buyStock = CASE WHEN ?1 >= 0 AND buyStock > ?1 THEN ?1 ELSE buyStock END, "
+                           f"sellStock = CASE WHEN ?2 >= 0 AND sellStock > ?2 THEN ?2 ELSE sellStock END, "
+                           f"restockDate = CASE WHEN ?3 IS NOT NULL AND restockDate > ?3 THEN ?3 ELSE restockDate END "
+                           f"WHERE shopId = ?4 AND productId = ?5 AND {holder}")
+                rows += conn.executemany(sql, params).rowcount
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+    return rows, sum(len(params) for params in by_scope.values()), time.perf_counter() - started
+
+
+def sync_stock_committed(results, db_path, mode):
+    """Sync the stock rows of every committed staged write and print the outcome."""
+    shop_changes = {}
+    for staged, error in results:
+        if error is None and staged.stock_changes:
+            shop = os.path.splitext(os.path.basename(staged.target))[0]
+            shop_changes[shop] = staged.stock_changes
+    if not shop_changes:
+        print(f"\n🗄️  {os.path.basename(db_path)}: no stock limits changed, nothing to sync")
+        return
+    try:
+        rows, scopes, seconds = sync_stock_data(db_path, shop_changes, mode)
+    except sqlite3.Error as e:
+        print(f"\n⚠️  {os.path.basename(db_path)} not synced: {e}")
+        return
+    print(f"\n🗄️  {os.path.basename(db_path)}: {mode} {rows} stock rows for {scopes} product scopes "
+          f"in {seconds * 1000:.1f} ms")
+
+
+def add_db_arguments(parser):
+    parser.add_argument(
+        "--sync-db", choices=SYNC_MODES,
+        help="after writing, reset or rescale the plugin's dynamic price state "
+             "for every product whose start price changed",
+    )
+    parser.add_argument("--db", default=DB_PATH, metavar="PATH",
+                        help="plugin database for --sync-db (default: data.db)")
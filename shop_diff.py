@@ -0,0 +1,144 @@
+"""
+NaturalSMP Economy Overhaul - Dry Run Reporting
+Unified diffs built straight from an edit list plus a per-item price change table.
+"""
+import os
+
+from shop_index import read_price
+
+DIFF_CONTEXT = 3
+
+
+# ============================================================================
+# UNIFIED DIFF FROM LINE EDITS
+# line_edits: sorted, non-overlapping (first_line, end_line, new_lines, labels)
+# against old_lines, as returned by EditBuffer/ShopDocument.line_edits().
+# Only the lines around each edit are visited.
+# ============================================================================
+def _format_range(start, length):
+    # Same convention as difflib: 1-based start, empty ranges point at the line before
+    if length == 1:
+        return f"{start + 1}"
+    if length == 0:
+        return f"{start},0"
+    return f"{start + 1},{length}"
+
+
+def _trim(old_lines, line_edits):
+    """Drop lines an edit leaves unchanged at either end, so hunks show only real changes."""
+    trimmed = []
+    for start, end, new_lines, labels in line_edits:
+        lo, hi = 0, len(new_lines)
+        while start < end and lo < hi and old_lines[start] == new_lines[lo]:
+            start += 1
+            lo += 1
+        while start < end and lo < hi and old_lines[end - 1] == new_lines[hi - 1]:
+            end -= 1
+            hi -= 1
+        trimmed.append((start, end, new_lines[lo:hi], labels))
+    return trimmed
+
+
+def unified_diff(old_lines, line_edits, fromfile, tofile, context=DIFF_CONTEXT):
+    """Yield unified diff lines (newline terminated) for the given edits."""
+    if not line_edits:
+        return
+    line_edits = _trim(old_lines, line_edits)
+    total = len(old_lines)
+    if total and old_lines[-1] == '':
+        total -= 1          # trailing newline, not a line of its own
+
+    yield f"--- {fromfile}\n"
+    yield f"+++ {tofile}\n"
+    shift = 0
+    i = 0
+    while i < len(line_edits):
+        # Edits closer than two context windows share one hunk
+        j = i
+        while j + 1 < len(line_edits) and line_edits[j + 1][0] - line_edits[j][1] <= 2 * context:
+            j += 1
+
+        hunk_start = max(0, line_edits[i][0] - context)
+        hunk_end = min(total, line_edits[j][1] + context)
+        hunk_shift = shift
+        body = []
+        pos = hunk_start
+        for start, end, new_lines, _labels in line_edits[i:j + 1]:
+            body.extend(' ' + old_lines[k] for k in range(pos, start))
+            body.extend('-' + old_lines[k] for k in range(start, end))
+            body.extend('+' + line for line in new_lines)
+            shift += len(new_lines) - (end - start)
+            pos = end
+        body.extend(' ' + old_lines[k] for k in range(pos, hunk_end))
+
+        old_len = hunk_end - hunk_start
+        new_len = old_len + shift - hunk_shift
+        yield (f"@@ -{_format_range(hunk_start, old_len)} "
+               f"+{_format_range(hunk_start + hunk_shift, new_len)} @@\n")
+        for line in body:
+            yield line + '\n'
+        i = j + 1
+
+
+def write_diff(filepath, old_lines, line_edits, diff_dir=None):
+    """Stream one shop file's diff to stdout, or to <diff_dir>/<shop>.diff."""
+    name = os.path.basename(filepath)
+    lines = unified_diff(old_lines, line_edits, f"a/{name}", f"b/{name}")
+    if diff_dir is None:
+        for line in lines:
+            print(line, end="")
+        return
+    os.makedirs(diff_dir, exist_ok=True)
+    with open(os.path.join(diff_dir, name + ".diff"), 'w', encoding='utf-8') as f:
+        f.writelines(lines)
+    print(f"  📝 Diff written to {os.path.join(diff_dir, name + '.diff')}")
+
+
+# ============================================================================
+# PRICE CHANGE TABLE
+# ============================================================================
+def price_change_rows(old_lines, line_edits):
+    """One row per edit: (item, old BUY, new BUY, old SELL, new SELL, type change)."""
+    rows = []
+    for start, end, new_lines, labels in line_edits:
+        old_type, old_buy, old_sell = read_price('\n'.join(old_lines[start:end]))
+        new_type, new_buy, new_sell = read_price('\n'.join(new_lines))
+        item = ', '.join(label for label in labels if label) or f"line {start + 1}"
+        if old_type == new_type:
+            type_change = new_type or ''
+        else:
+            type_change = f"{old_type} → {new_type}"
+        rows.append((item, old_buy, new_buy, old_sell, new_sell, type_change))
+    return rows
+
+
+def _fmt(value):
+    return '-' if value is None else f"{value:g}"
+
+
+def print_change_table(rows):
+    if not rows:
+        return
+    header = ('ITEM', 'OLD BUY', 'NEW BUY', 'OLD SELL', 'NEW SELL', 'TYPE')
+    table = [header] + [(r[0], _fmt(r[1]), _fmt(r[2]), _fmt(r[3]), _fmt(r[4]), r[5]) for r in rows]
+    widths = [max(len(row[c]) for row in table) for c in range(5)]
+    for row in table:
+        cells = [row[0].ljust(widths[0])] + [row[c].rjust(widths[c]) for c in range(1, 5)]
+        print("  " + "  ".join(cells) + "  " + row[5])
+
+
+def report_dry_run(filepath, old_lines, line_edits, diff_dir=None):
+    """Print the change table and stream the diff for one file; nothing is written."""
+    print_change_table(price_change_rows(old_lines, line_edits))
+    write_diff(filepath, old_lines, line_edits, diff_dir)
+
+
+def add_dry_run_arguments(parser):
+    parser.add_argument(
+        "--dry-run", action="store_true",
+        help="compute every edit and print a diff and change table without writing files",
+    )
+    parser.add_argument(
+        "--diff-dir", metavar="DIR",
+        help="with --dry-run, write each shop's diff to DIR/<shop>.diff instead of stdout",
+    )
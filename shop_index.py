@@ -0,0 +1,373 @@
+"""
+NaturalSMP Economy Overhaul - Shop File Index
+Single-pass scanner that maps every item under `Items:` to the offsets of its blocks.
+"""
+import math
+
+# ============================================================================
+# ITEM SPANS
+# Every span is (start, end): start is the first char of the block's key line,
+# end is the position of the newline that terminates the block (blank lines
+# before the next sibling key are part of the block).
+# Offsets are str (character) indices into the decoded content, not file byte
+# offsets: they differ as soon as a name, lore line or § code is non-ASCII.
+# Nothing seeks the file with them; every caller slices the decoded text.
+# ============================================================================
+SUB_BLOCKS = {
+    'Price:': 'price',
+    'Stock:': 'stock',
+    'Shop_View:': 'shop_view',
+}
+
+
+class ItemSpans:
+    __slots__ = ('key', 'header', 'price', 'stock', 'shop_view', 'end')
+
+    def __init__(self, key, header):
+        self.key = key
+        self.header = header
+        self.price = None
+        self.stock = None
+        self.shop_view = None
+        self.end = None
+
+    def __repr__(self):
+        return (f"ItemSpans({self.key!r}, header={self.header}, price={self.price}, "
+                f"stock={self.stock}, shop_view={self.shop_view}, end={self.end})")
+
+
+def _indent(line):
+    return len(line) - len(line.lstrip(' '))
+
+
+def index_shop_items(content):
+    """Scan a shop YAML once and return {item_key: ItemSpans}, with character
+    offsets into content.
+    Only keys at 2-space indent directly under the top-level `Items:` are indexed;
+    if a key or one of its sub-blocks appears twice the first occurrence wins
+    (same as a regex search)."""
+    index = {}
+    in_items = False
+    item = None
+    block = None            # (attr, start) of the open 4-space sub-block
+
+    def close(boundary, item_too):
+        if item is None:
+            return
+        if block is not None and getattr(item, block[0]) is None:
+            setattr(item, block[0], (block[1], boundary))
+        if item_too:
+            item.end = boundary
+
+    pos = 0
+    length = len(content)
+    while pos < length:
+        nl = content.find('\n', pos)
+        line_end = nl if nl != -1 else length
+        line = content[pos:line_end]
+        stripped = line.strip()
+
+        if stripped and not stripped.startswith('#'):
+            indent = _indent(line)
+            if indent == 0:
+                close(pos - 1, True)
+                item, block = None, None
+                in_items = stripped == 'Items:'
+            elif in_items and indent == 2:
+                close(pos - 1, True)
+                item, block = None, None
+                if stripped.endswith(':') and line.rstrip() == line[:indent] + stripped:
+                    key = stripped[:-1]
+                    item = ItemSpans(key, (pos, line_end))
+                    index.setdefault(key, item)
+            elif item is not None and indent == 4:
+                close(pos - 1, False)
+                attr = SUB_BLOCKS.get(stripped)
+                block = (attr, pos) if attr else None
+
+        if nl == -1:
+            break
+        pos = nl + 1
+
+    close(length - 1 if content.endswith('\n') else length, True)
+    return index
+
+
+# ============================================================================
+# EDIT BUFFER
+# Collects (start, end, replacement) splices against the original content and
+# builds the output once, so offsets from the index never go stale.
+# ============================================================================
+class EditOverlapError(ValueError):
+    pass
+
+
+class EditBuffer:
+    __slots__ = ('content', 'edits')
+
+    def __init__(self, content):
+        self.content = content
+        self.edits = []
+
+    def __len__(self):
+        return len(self.edits)
+
+    def replace(self, start, end, text, label=None):
+        """Queue content[start:end] -> text. Offsets refer to the original content."""
+        if not 0 <= start <= end <= len(self.content):
+            raise ValueError(f"edit {label or ''} out of range: ({start}, {end})")
+        self.edits.append((start, end, text, label))
+
+    def _sorted(self):
+        edits = sorted(self.edits, key=lambda e: (e[0], e[1]))
+        prev = None
+        for edit in edits:
+            if prev is not None and edit[0] < prev[1]:
+                raise EditOverlapError(
+                    f"edit {edit[3]!r} ({edit[0]}, {edit[1]}) overlaps "
+                    f"{prev[3]!r} ({prev[0]}, {prev[1]})"
+                )
+            prev = edit
+        return edits
+
+    def changes(self):
+        """Yield (label, old text, new text) for every queued edit."""
+        for start, end, text, label in self.edits:
+            yield label, self.content[start:end], text
+
+    def deltas(self):
+        """Return {label: byte delta} for every queued edit (UTF-8 size change)."""
+        result = {}
+        for start, end, text, label in self.edits:
+            old = self.content[start:end]
+            result[label] = result.get(label, 0) + len(text.encode('utf-8')) - len(old.encode('utf-8'))
+        return result
+
+    def line_edits(self):
+        """Return the edits as whole-line replacements against the original lines:
+        [(first_line, end_line, new_lines, labels)], sorted. Edits sharing a line are
+        merged and edits that change nothing are dropped. Costs one pass of
+        newline counting, never a copy of the file."""
+        content = self.content
+        result = []
+        group = None        # [line_start, line_end, first_line, [edits]]
+        line_no = 0
+        counted_to = 0
+
+        def flush():
+            ls, le, first, members = group
+            parts = []
+            pos = ls
+            for start, end, text, _label in members:
+                parts.append(content[pos:start])
+                parts.append(text)
+                pos = end
+            parts.append(content[pos:le])
+            old = content[ls:le]
+            new = ''.join(parts)
+            if new != old:
+                result.append((first, first + old.count('\n') + 1, new.split('\n'),
+                               [e[3] for e in members]))
+
+        for edit in self._sorted():
+            start, end = edit[0], edit[1]
+            ls = content.rfind('\n', 0, start) + 1
+            le = content.find('\n', end)
+            if le == -1:
+                le = len(content)
+            if group is not None and ls <= group[1]:
+                group[1] = max(group[1], le)
+                group[3].append(edit)
+                continue
+            if group is not None:
+                flush()
+            line_no += content.count('\n', counted_to, ls)
+            counted_to = ls
+            group = [ls, le, line_no, [edit]]
+        if group is not None:
+            flush()
+        return result
+
+    def apply(self):
+        """Build the edited content in one pass: one slice per edit plus one join."""
+        parts = []
+        pos = 0
+        for start, end, text, _label in self._sorted():
+            parts.append(self.content[pos:start])
+            parts.append(text)
+            pos = end
+        parts.append(self.content[pos:])
+        return ''.join(parts)
+
+
+# ============================================================================
+# LINE DOCUMENT
+# Shop file split into lines once, with a header index that follows edits.
+# A Price block is looked for within its item's extent (up to the next line at
+# 2-space indent or less), so a whole file and a single streamed item chunk
+# find the same block.
+# ============================================================================
+class ShopDocument:
+    __slots__ = ('lines', 'headers', 'original', 'origin', 'edits')
+
+    def __init__(self, content):
+        self.lines = content.split('\n')
+        # Shallow copy and line-number map so edits can be reported against the
+        # original file (dry runs) without keeping a second copy of the text
+        self.original = self.lines[:]
+        self.origin = list(range(len(self.lines)))
+        self.edits = []
+        self.headers = {}
+        for i, line in enumerate(self.lines):
+            stripped = line.rstrip()
+            if stripped.startswith('  ') and stripped.endswith(':') and len(stripped) > 3 \
+                    and not stripped[2].isspace():
+                self.headers.setdefault(stripped[2:-1], i)
+
+    def _block_end(self, start, indent):
+        """First non-blank line after start at indent or less. Without one, the end of
+        the text; a final newline's empty line is not part of any block."""
+        lines = self.lines
+        for i in range(start + 1, len(lines)):
+            line = lines[i]
+            if line.strip() and len(line) - len(line.lstrip()) <= indent:
+                return i
+        return len(lines) - 1 if lines[-1] == '' else len(lines)
+
+    def price_range(self, item_name):
+        """Return (price_line, price_end) line numbers for an item, or None.
+        price_end is the first non-blank line at 4-space indent or less after 'Price:',
+        or the end of the item when Price is its last block."""
+        item_start = self.headers.get(item_name)
+        if item_start is None:
+            return None
+
+        lines = self.lines
+        item_end = self._block_end(item_start, 2)
+        for i in range(item_start + 1, item_end):
+            if lines[i].strip() == 'Price:':
+                return i, min(self._block_end(i, 4), item_end)
+        return None
+
+    def replace_lines(self, start, end, new_lines, label=None):
+        """Replace lines[start:end] in place and shift every header below the edit."""
+        if self.edits is not None:
+            orig_end = self.origin[end] if end < len(self.origin) else len(self.original)
+            orig_start = None if orig_end is None else orig_end - (end - start)
+            if orig_start is None or self.origin[start:end] != list(range(orig_start, orig_end)):
+                self.edits = None     # rewrote an earlier edit; only a full diff can describe it
+            else:
+                self.edits.append((orig_start, orig_end, list(new_lines), [label]))
+        self.lines[start:end] = new_lines
+        self.origin[start:end] = [None] * len(new_lines)
+        delta = len(new_lines) - (end - start)
+        if delta:
+            for key, line in self.headers.items():
+                if line >= end:
+                    self.headers[key] = line + delta
+
+    def replace_price(self, item_name, price_text):
+        """Swap an item's Price block for price_text ('    Price:' line included).
+        Returns False when the item or its Price block cannot be found."""
+        found = self.price_range(item_name)
+        if found is None:
+            return False
+        self.replace_lines(found[0], found[1], price_text.split('\n'), item_name)
+        return True
+
+    def line_edits(self):
+        """Edits in original line numbers, same shape as EditBuffer.line_edits(),
+        or None if an edit landed on lines an earlier edit had written."""
+        if self.edits is None:
+            return None
+        return [e for e in sorted(self.edits) if self.original[e[0]:e[1]] != e[2]]
+
+    def serialize(self):
+        return '\n'.join(self.lines)
+
+
+# ============================================================================
+# PRICE BLOCK READER
+# Understands both layouts: v1 (Buy:/Sell: + Start:) and v2 (BUY:/SELL: +
+# StartValue:), DYNAMIC or FLAT, in any key order.
+# ============================================================================
+def _number(value):
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def read_price(text):
+    """Parse a Price block (its '    Price:' line optional).
+    Returns (type, buy, sell); values that are missing come back as None."""
+    price_type = buy = sell = None
+    section = None
+    for line in text.split('\n'):
+        key, sep, value = line.strip().partition(':')
+        if not sep:
+            continue
+        value = value.strip()
+        side = key.upper()
+        if key == 'Type':
+            price_type = value
+        elif side in ('BUY', 'SELL'):
+            section = None if value else side
+            if value:
+                if side == 'BUY':
+                    buy = _number(value)
+                else:
+                    sell = _number(value)
+        elif key in ('StartValue', 'Start') and section:
+            if section == 'BUY':
+                buy = _number(value)
+            else:
+                sell = _number(value)
+        elif not value:
+            section = None      # Stabilization: or any other nested block
+    return price_type, buy, sell
+
+
+# ============================================================================
+# STOCK / SHOP VIEW READERS
+# Stock: holds GLOBAL: and PLAYER: limits (BuyAmount, SellAmount, RestockTime);
+# -1 means unlimited. Shop_View: holds Slot: and Page:.
+# ============================================================================
+STOCK_SCOPES = ('GLOBAL', 'PLAYER')
+STOCK_FIELDS = ('BuyAmount', 'SellAmount', 'RestockTime')
+
+
+def _integer(value):
+    try:
+        return int(value)
+    except ValueError:
+        number = _number(value)
+        # inf and nan parse as floats but have no integer value
+        return int(number) if number is not None and math.isfinite(number) else None
+
+
+def read_stock(text):
+    """Parse a Stock block (its '    Stock:' line optional).
+    Returns {scope: {field: int}} for the scopes and fields present."""
+    stock = {}
+    scope = None
+    for line in text.split('\n'):
+        key, sep, value = line.strip().partition(':')
+        if not sep:
+            continue
+        value = value.strip()
+        if key in STOCK_SCOPES and not value:
+            scope = stock.setdefault(key, {})
+        elif scope is not None and key in STOCK_FIELDS:
+            scope[key] = _integer(value)
+    return stock
+
+
+def read_shop_view(text):
+    """(slot, page) from a Shop_View block; missing values come back as None."""
+    view = {'Slot': None, 'Page': None}
+    for line in text.split('\n'):
+        key, sep, value = line.strip().partition(':')
+        if sep and key in view:
+            view[key] = _integer(value.strip().strip("'\""))
+    return view['Slot'], view['Page']
@@ -0,0 +1,139 @@
+"""
+NaturalSMP Economy Overhaul - Crash-Safe Shop File Writes
+The plugin rewrites shop files on its own (Save_Interval in virtual_shop/settings.yml),
+so updates are staged to fsynced temp files and only renamed into place in one
+short commit window, and only if the file is still exactly what we read.
+"""
+import os
+import stat
+import tempfile
+
+from shop_stats import active
+
+try:
+    import fcntl
+except ImportError:     # Windows: no advisory locks, the stat precondition still applies
+    fcntl = None
+
+
+# ============================================================================
+# READ / STAGE
+# A stamp is (st_mtime_ns, st_size) of the file as it was read.
+# ============================================================================
+def read_shop(filepath):
+    """Read a shop file and return (content, stamp)."""
+    stats = active()
+    with stats.timer('read_s'), open(filepath, 'r', encoding='utf-8') as f:
+        st = os.fstat(f.fileno())
+        content = f.read()
+    stats.add('bytes_read', st.st_size)
+    return content, (st.st_mtime_ns, st.st_size)
+
+
+class StagedWrite:
+    __slots__ = ('target', 'temp', 'stamp', 'price_changes', 'stock_changes')
+
+    def __init__(self, target, temp, stamp):
+        self.target = target
+        self.temp = temp
+        self.stamp = stamp
+        self.price_changes = {}     # item -> start values before/after (see shop_db)
+        self.stock_changes = {}     # item -> Stock limits before/after (see shop_db)
+
+    def discard(self):
+        try:
+            os.unlink(self.temp)
+        except FileNotFoundError:
+            pass
+
+
+def stage_write(filepath, content, stamp):
+    """Write content to an fsynced temp file next to filepath; nothing is replaced yet."""
+    return stage_stream(filepath, (content,), stamp)
+
+
+def stage_stream(filepath, chunks, stamp):
+    """Like stage_write, but writes an iterable of text chunks as they are produced,
+    so the new content never has to exist as one string."""
+    stats = active()
+    directory, name = os.path.split(os.path.abspath(filepath))
+    fd, temp = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            for chunk in chunks:
+                with stats.timer('write_s'):
+                    f.write(chunk)
+            with stats.timer('write_s'):
+                f.flush()
+                os.fsync(f.fileno())
+            stats.add('bytes_written', os.fstat(f.fileno()).st_size)
+        try:
+            os.chmod(temp, stat.S_IMODE(os.stat(filepath).st_mode))
+        except OSError:
+            pass
+    except BaseException:
+        os.unlink(temp)
+        raise
+    return StagedWrite(filepath, temp, stamp)
+
+
+# ============================================================================
+# COMMIT
+# ============================================================================
+def _fsync_dir(directory):
+    if os.name != 'posix':
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _commit_one(staged):
+    """Lock the target, check it is untouched since it was read, rename the temp over it.
+    Returns None on success or the reason the file was left alone."""
+    with open(staged.target, 'rb') as target:
+        if fcntl is not None:
+            try:
+                fcntl.flock(target.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return "locked by another process"
+        st = os.stat(staged.target)
+        if (st.st_mtime_ns, st.st_size) != staged.stamp:
+            return "modified on disk since it was read"
+        os.replace(staged.temp, staged.target)
+        # Lock is released when the old inode's handle closes
+    return None
+
+
+def commit_writes(staged_writes):
+    """Rename every staged file into place. Returns [(staged, error)] where error
+    is None for committed files; aborted files keep their current content."""
+    results = []
+    directories = set()
+    for staged in staged_writes:
+        try:
+            error = _commit_one(staged)
+        except OSError as e:
+            error = str(e)
+        if error is None:
+            directories.add(os.path.dirname(os.path.abspath(staged.target)))
+        else:
+            staged.discard()
+        results.append((staged, error))
+    for directory in directories:
+        _fsync_dir(directory)
+    return results
+
+
+def print_commit_report(results, seconds=None):
+    if not results:
+        return
+    committed = sum(1 for _staged, error in results if error is None)
+    took = f" in {seconds * 1000:.1f} ms" if seconds is not None else ""
+    print(f"\n💾 Commit: {committed}/{len(results)} files written{took}")
+    for staged, error in results:
+        if error is not None:
+            print(f"  ⚠️  {os.path.basename(staged.target)} not written: {error} "
+                  f"(plugin save?) - rerun to retry")
@@ -0,0 +1,187 @@
+"""
+NaturalSMP Economy Overhaul - Incremental Run Manifest
+Remembers, per shop file, what the last successful run wrote and which price
+entries it applied, so the next run only opens files that actually changed.
+"""
+import hashlib
+import json
+import os
+import re
+import types
+
+MANIFEST_VERSION = 1
+
+
+# ============================================================================
+# FINGERPRINTS
+# ============================================================================
+def entry_hash(price_info):
+    """Stable short hash of one price-dict value, e.g. ('FLAT', 250.0, 50.0)."""
+    return hashlib.sha1(repr(price_info).encode('utf-8')).hexdigest()[:16]
+
+
+def _code_parts(code, parts, names):
+    """Bytecode and constants of code and every nested code object (lambdas,
+    comprehensions), collecting the global names they read into names."""
+    parts.append(code.co_code.hex())
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            _code_parts(const, parts, names)
+        else:
+            parts.append(repr(const))
+    names.extend(code.co_names)
+
+
+def handler_fingerprint(handler):
+    """Hash a default handler's code plus the module-level tables, patterns and
+    helper functions it reads (and, through the helpers, what they read), so
+    editing a tier table or a shared helper counts as a change even if the
+    handler itself does not.
+    Handler objects with a fingerprint() method (price_rules.ShopRules) hash themselves."""
+    if handler is None:
+        return None
+    if hasattr(handler, 'fingerprint'):
+        return handler.fingerprint()
+    parts = []
+    pending = [handler]
+    seen = {handler}
+    while pending:
+        func = pending.pop()
+        parts.append(func.__qualname__)
+        names = []
+        _code_parts(func.__code__, parts, names)
+        for name in names:
+            value = func.__globals__.get(name)
+            if isinstance(value, (dict, list, tuple, str, int, float)):
+                parts.append(f"{name}={value!r}")
+            elif isinstance(value, re.Pattern):
+                parts.append(f"{name}=re({value.pattern!r}, {value.flags})")
+            elif (isinstance(value, types.FunctionType) and value.__module__ == handler.__module__
+                    and value not in seen):
+                seen.add(value)
+                pending.append(value)
+    return hashlib.sha1('\n'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+def file_sha256(filepath):
+    h = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# ============================================================================
+# MANIFEST
+# Layout: {"version": 1, "engines": {engine: {shop file name: record}}}
+# record = {mtime_ns, size, sha256, handler, entries: {item: entry_hash}}
+#          plus rules: {item: [base buy, base sell, ruled buy, ruled sell]} for
+#          items priced by price_rules.toml (see price_rules.ShopRules.evaluate)
+# Each engine keeps its own section because v1 and v2 write different layouts.
+# ============================================================================
+class Manifest:
+    def __init__(self, path, engine):
+        self.path = path
+        self.engine = engine
+        self.data = {'version': MANIFEST_VERSION, 'engines': {}}
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path, engine):
+        manifest = cls(path, engine)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return manifest
+        if data.get('version') == MANIFEST_VERSION:
+            manifest.data = data
+        return manifest
+
+    @property
+    def files(self):
+        return self.data['engines'].setdefault(self.engine, {})
+
+    def _unchanged_on_disk(self, filepath, record):
+        """Cheap stat check first; only hash when mtime moved but size did not."""
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            return False
+        if st.st_mtime_ns == record['mtime_ns'] and st.st_size == record['size']:
+            return True
+        if st.st_size != record['size'] or file_sha256(filepath) != record['sha256']:
+            return False
+        # Touched but identical: refresh the stat so the next run skips hashing
+        record['mtime_ns'] = st.st_mtime_ns
+        self.dirty = True
+        return True
+
+    def plan(self, filepath, prices_dict, handler=None):
+        """Decide what a run needs to do for one shop file.
+        Returns None when nothing changed, else (prices_subset, handler_or_None, reason)."""
+        record = self.files.get(os.path.basename(filepath))
+        if record is None:
+            return prices_dict, handler, "not in manifest"
+        if not self._unchanged_on_disk(filepath, record):
+            return prices_dict, handler, "file changed since last run"
+
+        previous = record['entries']
+        changed = {
+            item: info for item, info in prices_dict.items()
+            if previous.get(item) != entry_hash(info)
+        }
+        run_handler = handler if handler_fingerprint(handler) != record['handler'] else None
+        if not changed and run_handler is None:
+            return None
+        return changed, run_handler, f"{len(changed)} changed entries"
+
+    def handler_changed(self, filepath, handler):
+        """True if handler's fingerprint is not the one the last run recorded."""
+        record = self.files.get(os.path.basename(filepath))
+        return record is None or handler_fingerprint(handler) != record['handler']
+
+    def rule_bases(self, filepath):
+        """{item: (base buy, base sell, ruled buy, ruled sell)} from the last run."""
+        record = self.files.get(os.path.basename(filepath), {})
+        return {item: tuple(values) for item, values in record.get('rules', {}).items()}
+
+    def record(self, filepath, prices_dict, handler=None, rule_bases=None):
+        """Store the state of a file right after a successful update. Without
+        rule_bases (the rules did not look at every item) the previous ones are kept."""
+        st = os.stat(filepath)
+        name = os.path.basename(filepath)
+        if rule_bases is None:
+            rule_bases = self.files.get(name, {}).get('rules')
+        record = {
+            'mtime_ns': st.st_mtime_ns,
+            'size': st.st_size,
+            'sha256': file_sha256(filepath),
+            'handler': handler_fingerprint(handler),
+            'entries': {item: entry_hash(info) for item, info in prices_dict.items()},
+        }
+        if rule_bases:
+            record['rules'] = rule_bases
+        self.files[name] = record
+        self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+
+def add_manifest_arguments(parser):
+    parser.add_argument(
+        "--full", action="store_true",
+        help="ignore the run manifest and reprocess every shop file",
+    )
+
+
+def report_unchanged(filepath):
+    print(f"  ⏭️  Unchanged since last run: {os.path.basename(filepath)}")
+    return 0, None
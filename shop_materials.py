@@ -0,0 +1,285 @@
+"""
+NaturalSMP Economy Overhaul - Shop Products by Material
+Reads each product's material from its Item.Data.Value SNBT and its current
+BUY/SELL from the Price block (either layout), so tools can compare prices of
+the same material across shops.
+"""
+import functools
+import os
+
+from shop_index import index_shop_items, read_price
+from shop_yaml import YamlDocument, unquote
+
+SHOP_DIR = os.path.dirname(os.path.abspath(__file__))
+SHOPS_DIR = os.path.join(SHOP_DIR, "virtual_shop", "shops")
+
+VALUE_PREFIX = "        Value: "     # Item: / Data: / Value: at 4/6/8 spaces
+CURRENCY_PREFIX = "    Currency: "
+DEFAULT_CURRENCY = "vault"
+SETTINGS_PATH = os.path.join(SHOP_DIR, "virtual_shop", "settings.yml")
+
+
+# ============================================================================
+# SNBT
+# ============================================================================
+def snbt_top_level(snbt):
+    """Yield (key, raw value) for the top-level compound of an SNBT string.
+    Nested compounds/lists and quoted strings are skipped over, not parsed."""
+    text = snbt.strip()
+    if not text.startswith('{'):
+        return
+    depth = 0
+    quote = None
+    escaped = False
+    start = 1
+    for pos, ch in enumerate(text):
+        if quote:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == quote:
+                quote = None
+        elif ch in '"\'':
+            quote = ch
+        elif ch in '{[':
+            depth += 1
+        elif ch in '}]':
+            depth -= 1
+            if depth == 0:
+                yield from _pair(text[start:pos])
+                return
+        elif ch == ',' and depth == 1:
+            yield from _pair(text[start:pos])
+            start = pos + 1
+
+
+def _pair(part):
+    part = part.strip()
+    if part[:1] in ('"', "'"):
+        # Quoted keys such as "minecraft:potion_contents" contain the separator
+        end = part.find(part[0], 1)
+        rest = part[end + 1:].lstrip() if end != -1 else ''
+        if rest[:1] == ':':
+            yield part[1:end], rest[1:].strip()
+        return
+    key, sep, value = part.partition(':')
+    if sep:
+        yield key.strip(), value.strip()
+
+
+def snbt_string(value):
+    """Value of an SNBT string literal, quotes removed."""
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in '"\'':
+        return value[1:-1].replace('\\' + value[0], value[0])
+    return value
+
+
+def _strip_namespace(name):
+    return name[len('minecraft:'):] if name.startswith('minecraft:') else name
+
+
+def material_id(snbt):
+    """Material of an item SNBT ('{count:1,id:"minecraft:diamond"}' -> 'diamond').
+    Namespaces other than minecraft are kept. None if there is no top-level id."""
+    return parse_item(snbt)[0]
+
+
+def _component_key(components):
+    """(potion, [other components]) of a components compound; names lose minecraft:."""
+    potion = None
+    others = []
+    for name, value in snbt_top_level(components):
+        name = _strip_namespace(name)
+        if name == 'potion_contents':
+            if not value.startswith('{'):
+                potion = _strip_namespace(snbt_string(value))
+                continue
+            fields = dict(snbt_top_level(value))
+            if list(fields) == ['potion']:
+                potion = _strip_namespace(snbt_string(fields['potion']))
+                continue
+        others.append(f"{name}={value}")
+    return potion, sorted(others)
+
+
+@functools.lru_cache(maxsize=None)
+def parse_item(snbt):
+    """(material, product key, count) of one Item.Data.Value, parsed once per
+    distinct string. The product key is the material, then :potion type, then any
+    other components: 'potion:long_regeneration', 'diamond_sword[enchantments=...]'.
+    Material and key are None if there is no top-level id."""
+    material = None
+    count = 1
+    components = None
+    for key, value in snbt_top_level(snbt):
+        if key == 'id':
+            material = _strip_namespace(snbt_string(value))
+        elif key == 'count':
+            try:
+                count = int(value.rstrip('bB'))
+            except ValueError:
+                pass
+        elif key == 'components':
+            components = value
+    if material is None:
+        return None, None, count
+    product_key = material
+    if components:
+        potion, others = _component_key(components)
+        if potion:
+            product_key += ':' + potion
+        if others:
+            product_key += '[' + ','.join(others) + ']'
+    return material, product_key, count
+
+
+def product_key(snbt):
+    return parse_item(snbt)[1]
+
+
+def is_product_key(name):
+    """Price table keys with a :potion or [components] part name products, not shop items."""
+    return ':' in name or '[' in name
+
+
+# ============================================================================
+# PRODUCTS
+# ============================================================================
+class Product:
+    __slots__ = ('shop', 'key', 'material', 'product_key', 'count', 'currency', 'price_type', 'buy', 'sell')
+
+    def __init__(self, shop, key, material, product_key, count, currency, price_type, buy, sell):
+        self.shop = shop
+        self.key = key
+        self.material = material
+        self.product_key = product_key
+        self.count = count
+        self.currency = currency
+        self.price_type = price_type
+        self.buy = buy
+        self.sell = sell
+
+    @property
+    def plain(self):
+        """A bare vanilla item (no components) bought and sold for the server currency."""
+        return self.material is not None and self.product_key == self.material and self.currency == DEFAULT_CURRENCY
+
+    def unit(self, price):
+        return None if price is None else price / self.count
+
+    def __repr__(self):
+        return (f"Product({self.shop}/{self.key}, {self.material}, {self.price_type}, "
+                f"buy={self.buy}, sell={self.sell})")
+
+
+def item_field(content, spans, prefix):
+    """Unquoted value of the first line of one indexed item starting with prefix, or None."""
+    start = content.find('\n' + prefix, spans.header[1], spans.end)
+    if start == -1:
+        return None
+    start += 1 + len(prefix)
+    end = content.find('\n', start, spans.end)
+    return unquote(content[start:end if end != -1 else spans.end])
+
+
+def item_snbt(content, spans):
+    """Raw Item.Data.Value of one indexed item, or None."""
+    return item_field(content, spans, VALUE_PREFIX)
+
+
+def shop_flags(content):
+    """(buying, selling) from the shop's Settings block; both default to True."""
+    flags = {'Buying': True, 'Selling': True}
+    for line in content[:content.find('\nItems:')].split('\n'):
+        key, sep, value = line.strip().partition(':')
+        if sep and line.startswith('  ') and not line.startswith('   ') and key in flags:
+            flags[key] = value.strip().lower() != 'false'
+    return flags['Buying'], flags['Selling']
+
+
+def available_price(value):
+    # -1 (or anything not above 0) disables that side of a product
+    return value if value is not None and value > 0 else None
+
+
+def read_shop_products(content, shop):
+    """Every product of one shop file. BUY/SELL are the start prices for DYNAMIC
+    products and None where that side is disabled or the shop has it switched off."""
+    buying, selling = shop_flags(content)
+    products = []
+    for key, spans in index_shop_items(content).items():
+        snbt = item_snbt(content, spans)
+        price_type = buy = sell = None
+        if spans.price is not None:
+            price_type, buy, sell = read_price(content[spans.price[0]:spans.price[1]])
+        material, key_of_product, count = parse_item(snbt) if snbt else (None, None, 1)
+        products.append(Product(
+            shop, key, material, key_of_product, count, item_field(content, spans, CURRENCY_PREFIX) or DEFAULT_CURRENCY,
+            price_type, available_price(buy) if buying else None, available_price(sell) if selling else None,
+        ))
+    return products
+
+
+def split_product_prices(prices_dict):
+    """(entries keyed by item, entries keyed by product) of one shop's price table."""
+    items, products = {}, {}
+    for name, price_info in prices_dict.items():
+        (products if is_product_key(name) else items)[name] = price_info
+    return items, products
+
+
+def match_product_keys(content, index, product_keys):
+    """{item key: product key} for every indexed item whose product key is in product_keys."""
+    matches = {}
+    if not product_keys:
+        return matches
+    for item, spans in index.items():
+        snbt = item_snbt(content, spans)
+        key = parse_item(snbt)[1] if snbt else None
+        if key in product_keys:
+            matches[item] = key
+    return matches
+
+
+def load_shop_products(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    return read_shop_products(content, os.path.basename(path)[:-4])
+
+
+# ============================================================================
+# SELL MULTIPLIERS
+# ============================================================================
+def read_sell_multipliers(settings_path=SETTINGS_PATH):
+    """(Default_Value, {rank: multiplier}) from General.Sell_Multipliers.
+    Values that are not numbers (placeholders, empty keys) are reported and left
+    out; a Default_Value that is not a number counts as 1.0."""
+    with open(settings_path, 'r', encoding='utf-8') as f:
+        multipliers = YamlDocument(f.read()).path('General', 'Sell_Multipliers')
+    if multipliers is None:
+        return 1.0, {}
+    name = os.path.basename(settings_path)
+    default = multipliers.get('Default_Value')
+    default_value = 1.0 if default is None else default.number()
+    if default_value is None:
+        print(f"  ⚠️  {name}: Sell_Multipliers.Default_Value {default.raw!r} is not a number, using 1.0")
+        default_value = 1.0
+    values = multipliers.get('Values')
+    ranks = {}
+    for rank, node in (values.items() if values is not None else ()):
+        number = node.number()
+        if number is None:
+            print(f"  ⚠️  {name}: Sell_Multipliers.Values.{rank} {node.raw!r} is not a number, skipped")
+            continue
+        ranks[rank] = number
+    return default_value, ranks
+
+
+def sell_multiplier(rank=None, settings_path=SETTINGS_PATH):
+    """(rank, multiplier) for the named rank, or the highest one when rank is None.
+    Raises KeyError for a rank Sell_Multipliers does not list with a number."""
+    default, ranks = read_sell_multipliers(settings_path)
+    if rank is not None:
+        return rank, ranks[rank]
+    return max([('default', default)] + list(ranks.items()), key=lambda r: r[1])
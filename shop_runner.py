@@ -0,0 +1,133 @@
+"""
+NaturalSMP Economy Overhaul - Phase Runner
+Runs independent per-shop update phases serially or on a process pool,
+capturing each phase's output so the report always prints in phase order.
+"""
+import io
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+
+from shop_db import sync_committed
+from shop_io import commit_writes, print_commit_report
+from shop_snapshots import snapshot_before_commit
+from shop_stats import PhaseStats, collecting, phase_matches, print_summary, write_report
+
+
+def run_captured(func, args, banner=None, profile=False, trace_memory=False):
+    """Run func(*args) with stdout captured and a PhaseStats active.
+    Returns (output, result, error, stats)."""
+    buf = io.StringIO()
+    stats = None
+    try:
+        with redirect_stdout(buf):
+            with collecting(banner, profile, trace_memory) as stats:
+                result = func(*args)
+        return buf.getvalue(), result, None, stats
+    except Exception:
+        return buf.getvalue(), None, traceback.format_exc(), stats
+
+
+def run_phases(phases, jobs=1, profiled=(), traced=()):
+    """Run phases given as (banner, func, args) and yield
+    (banner, output, result, error, stats) in the order the phases were given.
+    A phase that raises only reports its error; the others still run.
+    Banners in `profiled` / `traced` run under cProfile / tracemalloc."""
+    def options(banner):
+        return banner, banner in profiled, banner in traced
+
+    if jobs <= 1:
+        for banner, func, args in phases:
+            yield (banner,) + run_captured(func, args, *options(banner))
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(run_captured, func, args, *options(banner)) for banner, func, args in phases]
+        for (banner, _func, _args), future in zip(phases, futures):
+            try:
+                yield (banner,) + future.result()
+            except Exception:
+                # Worker died or the job could not be pickled
+                yield banner, "", None, traceback.format_exc(), PhaseStats(banner)
+
+
+def print_phase(banner, output, error):
+    print(f"\n{banner}")
+    if output:
+        print(output, end="")
+    if error:
+        print(f"  ❌ Phase failed: {error.strip().splitlines()[-1]}")
+        for line in error.rstrip().splitlines():
+            print(f"     {line}")
+
+
+def add_jobs_argument(parser):
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1, metavar="N",
+        help="update up to N shop files in parallel (default: 1)",
+    )
+
+
+def run_update(engine, phases, tracked, manifest, args, on_commit=None):
+    """Run the phases, commit every staged write in one window, update the manifest
+    and emit the run report. Phase functions return (changes, staged write or None),
+    optionally followed by a dict of extra Manifest.record() keyword arguments;
+    tracked maps banner -> Manifest.record() arguments; on_commit gets the commit results.
+    Returns (changes, failed, phase_stats) where failed counts failed phases and
+    aborted files."""
+    started = time.perf_counter()
+    profiled = {b for b, func, a in phases if phase_matches(args.profile, b, _phase_name(a))}
+    traced = {b for b, func, a in phases if phase_matches(args.trace_memory, b, _phase_name(a))}
+
+    changes = 0
+    failed = 0
+    staged_writes = []
+    succeeded = []
+    extras = {}
+    phase_stats = []
+    for banner, output, result, error, stats in run_phases(phases, args.jobs, profiled, traced):
+        print_phase(banner, output, error)
+        if stats is not None:
+            phase_stats.append(stats)
+        if error is not None:
+            failed += 1
+            continue
+        changes += result[0]
+        succeeded.append(banner)
+        if len(result) > 2:
+            extras[banner] = result[2]
+        if result[1] is not None:
+            staged_writes.append(result[1])
+
+    # Every file is replaced in one short window at the end, never mid-run
+    if not args.dry_run and not args.no_snapshot:
+        snapshot_before_commit(staged_writes, engine, args.snapshot_keep)
+    commit_started = time.perf_counter()
+    results = commit_writes(staged_writes)
+    commit_s = time.perf_counter() - commit_started
+    print_commit_report(results, commit_s)
+    if on_commit is not None:
+        on_commit(results)
+    aborted = {staged.target for staged, error in results if error is not None}
+    failed += len(aborted)
+    if args.sync_db and not args.dry_run:
+        sync_committed(results, args.db, args.sync_db)
+
+    if not args.dry_run:
+        for banner in succeeded:
+            if banner in tracked and tracked[banner][0] not in aborted:
+                manifest.record(*tracked[banner], **extras.get(banner, {}))
+        manifest.save()
+
+    if args.summary:
+        print_summary(phase_stats, commit_s)
+    if args.report:
+        write_report(args.report, engine, phase_stats, commit_s, time.perf_counter() - started)
+    return changes, failed, phase_stats
+
+
+def _phase_name(args):
+    # Shop phases take the file path first; settings-style phases have no file
+    return os.path.basename(args[0]) if args and isinstance(args[0], str) else ""
@@ -0,0 +1,572 @@
+"""
+NaturalSMP Economy Overhaul - Shop Snapshots
+Every write run first snapshots virtual_shop/shops/ (and settings.yml) into a
+local content-addressed store: each shop file is split into its top-level items
+and every chunk is stored once under its sha256, in zlib-compressed packs, so
+items that did not change between runs cost nothing. A snapshot's manifest
+points at one record per file listing its chunks and item -> (type, BUY, SELL),
+which is all `diff` reads.
+
+    python shop_snapshots.py list
+    python shop_snapshots.py snapshot --label "before spring sale"
+    python shop_snapshots.py diff 20261018-101500 latest
+    python shop_snapshots.py rollback 20261018-101500
+"""
+import argparse
+import ctypes
+import ctypes.util
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import zlib
+
+from shop_diff import print_change_table
+from shop_index import read_price
+from shop_stream import index_chunk, iter_item_chunks
+
+SHOP_DIR = os.path.dirname(os.path.abspath(__file__))
+VIRTUAL_SHOP_DIR = os.path.join(SHOP_DIR, "virtual_shop")
+STORE_DIR = os.path.join(VIRTUAL_SHOP_DIR, ".snapshots")
+SHOPS_TREE = "shops"
+EXTRA_FILES = ("settings.yml",)     # restored next to the tree, one rename each
+COMPRESS_LEVEL = 6
+EDITED = "item edited, price unchanged"
+SNAPSHOT_KEEP = 20                  # snapshots an update run leaves in the store
+
+RENAME_EXCHANGE = 1 << 1            # renameat2(2)
+AT_FDCWD = -100
+
+
+# ============================================================================
+# OBJECTS
+# Each snapshot appends one pack holding only the objects the store did not have
+# yet: packs/<name>.pack is zlib(concatenated objects), packs/<name>.idx maps
+# sha -> [offset, length] into the uncompressed pack. A pack is valid once its
+# .idx exists. Compressing a whole pack lets similar items share a dictionary.
+# ============================================================================
+class SnapshotStore:
+    def __init__(self, root=STORE_DIR, base=VIRTUAL_SHOP_DIR):
+        self.root = root
+        self.base = base
+        self.packs = os.path.join(root, "packs")
+        self.snapshots = os.path.join(root, "snapshots")
+        self.index = None       # sha -> (pack name, offset, length), loaded on first use
+        self.pending = {}       # sha -> bytes queued for the next pack
+        self.unpacked = {}      # pack name -> uncompressed bytes
+
+    def _load_index(self):
+        if self.index is not None:
+            return
+        self.index = {}
+        for name in self.pack_names():
+            with open(os.path.join(self.packs, name + '.idx'), 'r', encoding='utf-8') as f:
+                for sha, (offset, length) in json.load(f).items():
+                    self.index[sha] = (name, offset, length)
+
+    def pack_names(self):
+        try:
+            names = os.listdir(self.packs)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-4] for name in names if name.endswith('.idx') and not name.startswith('.'))
+
+    def put(self, data):
+        """Queue bytes for the next pack unless the store has them; returns their sha256."""
+        sha = hashlib.sha256(data).hexdigest()
+        self._load_index()
+        if sha not in self.index:
+            self.pending.setdefault(sha, data)
+        return sha
+
+    def put_json(self, obj):
+        return self.put(json.dumps(obj, sort_keys=True, separators=(',', ':')).encode('utf-8'))
+
+    def get(self, sha):
+        if sha in self.pending:
+            return self.pending[sha]
+        self._load_index()
+        name, offset, length = self.index[sha]
+        if name not in self.unpacked:
+            with open(os.path.join(self.packs, name + '.pack'), 'rb') as f:
+                self.unpacked[name] = zlib.decompress(f.read())
+        return self.unpacked[name][offset:offset + length]
+
+    def get_json(self, sha):
+        return json.loads(self.get(sha))
+
+    def flush(self):
+        """Write queued objects as one pack. Returns how many objects it holds."""
+        count = self._write_pack(self.pending)
+        self.pending = {}
+        return count
+
+    def _write_pack(self, objects):
+        """Write {sha: bytes} as one new pack; returns the number of objects."""
+        if not objects:
+            return 0
+        entries = {}
+        offset = 0
+        for sha, data in objects.items():
+            entries[sha] = (offset, len(data))
+            offset += len(data)
+        data = b''.join(objects.values())
+        os.makedirs(self.packs, exist_ok=True)
+        name = 'pack-' + hashlib.sha256(data).hexdigest()[:16]
+        for suffix, payload in (('.pack', zlib.compress(data, COMPRESS_LEVEL)),
+                                ('.idx', json.dumps({sha: list(e) for sha, e in entries.items()},
+                                                    separators=(',', ':')).encode('utf-8'))):
+            fd, temp = tempfile.mkstemp(prefix=".pack.", dir=self.packs)
+            os.close(fd)
+            _write_synced(temp, payload)
+            os.replace(temp, os.path.join(self.packs, name + suffix))
+        if self.index is not None:
+            for sha, (offset, length) in entries.items():
+                self.index[sha] = (name, offset, length)
+        return len(entries)
+
+    def drop_pack(self, name):
+        # .idx first: a pack without one is just ignored
+        os.unlink(os.path.join(self.packs, name + '.idx'))
+        os.unlink(os.path.join(self.packs, name + '.pack'))
+        self.unpacked.pop(name, None)
+        if self.index is not None:
+            self.index = {sha: e for sha, e in self.index.items() if e[0] != name}
+
+    # ------------------------------------------------------------------------
+    # Snapshot manifests: snapshots/<id>.json
+    # {id, created, label, touched: [path], files: {path: [record sha, mtime_ns, size]}}
+    # record object = {sha256, chunks: [sha], items: {item: [chunk no., type, buy, sell]}}
+    # An unchanged file keeps its record, so it costs one manifest line.
+    # Paths are relative to virtual_shop/.
+    # ------------------------------------------------------------------------
+    def ids(self):
+        """Snapshot ids, oldest first (ids sort by creation time)."""
+        try:
+            names = os.listdir(self.snapshots)
+        except FileNotFoundError:
+            return []
+        return sorted((name[:-5] for name in names if name.endswith('.json') and not name.startswith('.')),
+                      key=_id_order)
+
+    def load(self, snapshot_id):
+        with open(os.path.join(self.snapshots, snapshot_id + '.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def resolve(self, ref):
+        """Snapshot id for an id, a unique id prefix or 'latest'. Raises KeyError."""
+        ids = self.ids()
+        if ref == 'latest' and ids:
+            return ids[-1]
+        if ref in ids:
+            return ref
+        matches = [i for i in ids if i.startswith(ref)]
+        if len(matches) == 1:
+            return matches[0]
+        raise KeyError(f"{'ambiguous' if matches else 'no'} snapshot {ref!r}")
+
+    def _new_id(self):
+        # Numbered after the newest id of the same second, even one prune() dropped
+        # already, so a new snapshot always sorts last
+        base = time.strftime('%Y%m%d-%H%M%S')
+        ids = self.ids()
+        if not ids:
+            return base
+        newest, n = _id_order(ids[-1])
+        return base if newest < base else f"{newest}.{n + 1}"
+
+    def _save(self, manifest):
+        os.makedirs(self.snapshots, exist_ok=True)
+        path = os.path.join(self.snapshots, manifest['id'] + '.json')
+        fd, temp = tempfile.mkstemp(prefix=".snapshot.", dir=self.snapshots)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(temp, path)
+
+    def record(self, manifest, path):
+        return self.get_json(manifest['files'][path][0])
+
+
+def _id_order(snapshot_id):
+    """Sort key for snapshot ids: creation second, then the .N counter."""
+    base, _dot, n = snapshot_id.partition('.')
+    return base, int(n) if n.isdigit() else 1
+
+
+def _write_synced(path, data, mode=None):
+    with open(path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    if mode is not None:
+        os.chmod(path, mode)
+
+
+# ============================================================================
+# SNAPSHOT
+# ============================================================================
+def tracked_files(base=VIRTUAL_SHOP_DIR):
+    """Paths (relative to base) a snapshot covers: every file in shops/ plus EXTRA_FILES.
+    Dot-prefixed names are staged writes or editor temp files and are skipped."""
+    paths = []
+    shops = os.path.join(base, SHOPS_TREE)
+    for name in sorted(os.listdir(shops)):
+        if not name.startswith('.') and os.path.isfile(os.path.join(shops, name)):
+            paths.append(SHOPS_TREE + '/' + name)
+    paths.extend(name for name in EXTRA_FILES if os.path.isfile(os.path.join(base, name)))
+    return paths
+
+
+def _file_record(store, filepath):
+    """Split one file into item chunks, queue them and return its record."""
+    with open(filepath, 'r', encoding='utf-8', newline='') as f:
+        chunks = list(iter_item_chunks(f))
+    whole = hashlib.sha256()
+    shas = []
+    items = {}
+    for key, text in chunks:
+        data = text.encode('utf-8')
+        whole.update(data)
+        if key is not None:
+            content, index = index_chunk(text)
+            spans = index.get(key)
+            price = (None, None, None)
+            if spans is not None and spans.price is not None:
+                price = read_price(content[spans.price[0]:spans.price[1]])
+            items[key] = [len(shas)] + list(price)
+        shas.append(store.put(data))
+    return {'sha256': whole.hexdigest(), 'chunks': shas, 'items': items}
+
+
+def scan(store, previous=None):
+    """{path: [record sha, mtime_ns, size]} for the current tree, objects queued but
+    not flushed. Files whose mtime and size match the previous snapshot keep its
+    record without being read."""
+    previous_files = previous['files'] if previous else {}
+    files = {}
+    for path in tracked_files(store.base):
+        st = os.stat(os.path.join(store.base, path))
+        entry = previous_files.get(path)
+        if entry is not None and entry[1:] == [st.st_mtime_ns, st.st_size]:
+            files[path] = entry
+        else:
+            record = _file_record(store, os.path.join(store.base, path))
+            files[path] = [store.put_json(record), st.st_mtime_ns, st.st_size]
+    return files
+
+
+def take_snapshot(store=None, label="", touched=()):
+    """Snapshot the tree as it is now. touched names the files the caller is about to
+    replace; they are listed in the manifest for `list`. Returns (manifest, new objects)."""
+    store = store or SnapshotStore()
+    ids = store.ids()
+    manifest = {
+        'id': store._new_id(),
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'label': label,
+        'touched': sorted(os.path.relpath(p, store.base).replace(os.sep, '/') for p in touched),
+        'files': scan(store, store.load(ids[-1]) if ids else None),
+    }
+    stored = store.flush()
+    store._save(manifest)
+    return manifest, stored
+
+
+def snapshot_before_commit(staged_writes, label, keep=SNAPSHOT_KEEP):
+    """Hook for shop_runner.run_update: snapshot the tree before staged writes land,
+    then prune the store to the newest `keep` snapshots (0 keeps all of them).
+    Watch mode calls this once per batch, so the store would otherwise grow forever."""
+    if not staged_writes:
+        return
+    started = time.perf_counter()
+    store = SnapshotStore()
+    try:
+        manifest, stored = take_snapshot(store, label, [staged.target for staged in staged_writes])
+    except (OSError, ValueError) as e:
+        print(f"\n⚠️  Snapshot failed, continuing without one: {e}")
+        return
+    print(f"\n📸 Snapshot {manifest['id']}: {len(manifest['files'])} files, {stored} new objects "
+          f"in {(time.perf_counter() - started) * 1000:.1f} ms (rollback with shop_snapshots.py)")
+    if keep <= 0:
+        return
+    try:
+        dropped, _objects = prune(store, keep)
+    except (OSError, ValueError) as e:
+        print(f"  ⚠️  Pruning old snapshots failed: {e}")
+        return
+    if dropped:
+        print(f"  🧹 Pruned {dropped} old snapshot(s), keeping the newest {keep}")
+
+
+# ============================================================================
+# ROLLBACK
+# The tree is rebuilt in a sibling temp directory, then swapped in with one
+# renameat2(RENAME_EXCHANGE) where the kernel supports it, otherwise with two
+# back-to-back renames.
+# ============================================================================
+def _restore_bytes(store, record):
+    data = b''.join(store.get(sha) for sha in record['chunks'])
+    if hashlib.sha256(data).hexdigest() != record['sha256']:
+        raise ValueError("snapshot object store is corrupt")
+    return data
+
+
+def _exchange(a, b):
+    """Atomically swap two paths; returns False if renameat2 is unavailable."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        renameat2 = libc.renameat2
+    except (OSError, AttributeError):
+        return False
+    if renameat2(AT_FDCWD, os.fsencode(a), AT_FDCWD, os.fsencode(b), RENAME_EXCHANGE) == 0:
+        return True
+    errno = ctypes.get_errno()
+    if errno in (22, 38, 95):   # EINVAL / ENOSYS / EOPNOTSUPP: filesystem or kernel says no
+        return False
+    raise OSError(errno, os.strerror(errno), a)
+
+
+def _untracked_entries(base):
+    """Names in shops/ that tracked_files() skips: dot-files and subdirectories."""
+    tree = os.path.join(base, SHOPS_TREE)
+    tracked = {p[len(SHOPS_TREE) + 1:] for p in tracked_files(base) if p.startswith(SHOPS_TREE + '/')}
+    return sorted(name for name in os.listdir(tree) if name not in tracked)
+
+
+def _copy_entry(source, target):
+    if os.path.isdir(source) and not os.path.islink(source):
+        shutil.copytree(source, target, symlinks=True)
+    else:
+        shutil.copy2(source, target, follow_symlinks=False)
+
+
+def rollback(store, manifest):
+    """Restore the shop files and EXTRA_FILES exactly as they were in the snapshot.
+    Entries the snapshot does not cover (dot-files, subdirectories) are carried
+    over into the restored tree unchanged.
+    Returns (files restored, files removed from the tree, untracked entries kept)."""
+    base = store.base
+    tree = os.path.join(base, SHOPS_TREE)
+    mode = os.stat(tree).st_mode & 0o7777
+    staging = tempfile.mkdtemp(prefix=f".{SHOPS_TREE}.rollback.", dir=base)
+    extras = []
+    kept = 0
+    try:
+        for path in manifest['files']:
+            data = _restore_bytes(store, store.record(manifest, path))
+            if path.startswith(SHOPS_TREE + '/'):
+                name = path[len(SHOPS_TREE) + 1:]
+                target = os.path.join(tree, name)
+                file_mode = os.stat(target).st_mode & 0o7777 if os.path.exists(target) else None
+                _write_synced(os.path.join(staging, name), data, file_mode)
+            else:
+                fd, temp = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=base)
+                os.close(fd)
+                extras.append((temp, os.path.join(base, path)))
+                _write_synced(temp, data)
+        # The old tree is deleted after the swap, so anything it holds that the
+        # snapshot does not must be in the new one
+        for name in _untracked_entries(base):
+            if not os.path.lexists(os.path.join(staging, name)):
+                _copy_entry(os.path.join(tree, name), os.path.join(staging, name))
+                kept += 1
+        os.chmod(staging, mode)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        for temp, _target in extras:
+            os.unlink(temp)
+        raise
+
+    removed = len({p for p in tracked_files(base) if p.startswith(SHOPS_TREE + '/')}
+                  - {p for p in manifest['files'] if p.startswith(SHOPS_TREE + '/')})
+    if not _exchange(staging, tree):
+        old = staging + ".old"
+        os.rename(tree, old)
+        os.rename(staging, tree)
+        staging = old
+    for temp, target in extras:
+        os.replace(temp, target)
+    shutil.rmtree(staging, ignore_errors=True)
+    return len(manifest['files']), removed, kept
+
+
+# ============================================================================
+# DIFF
+# Reads only the two manifests and the records of files whose record differs;
+# an item is unchanged when its chunk sha is.
+# ============================================================================
+def diff_snapshots(store, old, new):
+    """{path: (status, rows)} for every file that differs. status is 'added',
+    'removed' or 'changed'; rows are print_change_table() rows, with new/removed
+    items and edits outside the Price block marked in the TYPE column."""
+    changes = {}
+    for path in sorted(old['files'].keys() | new['files'].keys()):
+        if path not in old['files'] or path not in new['files']:
+            changes[path] = ('added' if path not in old['files'] else 'removed', [])
+            continue
+        if old['files'][path][0] == new['files'][path][0]:
+            continue
+        a, b = store.record(old, path), store.record(new, path)
+        rows = []
+        for item in sorted(a['items'].keys() | b['items'].keys()):
+            before, after = a['items'].get(item), b['items'].get(item)
+            if before is None:
+                rows.append((item, None, after[2], None, after[3], "new item"))
+            elif after is None:
+                rows.append((item, before[2], None, before[3], None, "removed"))
+            elif a['chunks'][before[0]] != b['chunks'][after[0]]:
+                if before[1:] == after[1:]:
+                    note = EDITED
+                elif before[1] == after[1]:
+                    note = after[1] or ''
+                else:
+                    note = f"{before[1]} → {after[1]}"
+                rows.append((item, before[2], after[2], before[3], after[3], note))
+        changes[path] = ('changed', rows)
+    return changes
+
+
+def print_diff(changes, show_edited=False):
+    if not changes:
+        print("✅ No differences")
+        return
+    for path, (status, rows) in changes.items():
+        if status != 'changed':
+            print(f"\n{'➕' if status == 'added' else '➖'} {path} {status}")
+            continue
+        shown = rows if show_edited else [row for row in rows if row[5] != EDITED]
+        edited = len(rows) - len(shown)
+        print(f"\n📝 {path}: " + (f"{len(rows)} item(s) differ" if rows else "changed outside items")
+              + (f", {edited} without a price change" if edited else ""))
+        print_change_table(shown)
+
+
+# ============================================================================
+# PRUNE
+# ============================================================================
+def prune(store, keep):
+    """Drop all but the newest `keep` snapshots and every object none of the rest use.
+    Returns (snapshots dropped, objects dropped)."""
+    ids = store.ids()
+    dropped = ids[:-keep] if keep > 0 else ids
+    for snapshot_id in dropped:
+        os.unlink(os.path.join(store.snapshots, snapshot_id + '.json'))
+    live = set()
+    for snapshot_id in store.ids():
+        for record_sha, _mtime, _size in store.load(snapshot_id)['files'].values():
+            if record_sha not in live:
+                live.add(record_sha)
+                live.update(store.get_json(record_sha)['chunks'])
+    objects = 0
+    for name in store.pack_names():
+        with open(os.path.join(store.packs, name + '.idx'), 'r', encoding='utf-8') as f:
+            shas = list(json.load(f))
+        dead = [sha for sha in shas if sha not in live]
+        if not dead:
+            continue
+        # Repack what is still used into a new pack before dropping the old one
+        store._write_pack({sha: store.get(sha) for sha in shas if sha in live})
+        store.drop_pack(name)
+        objects += len(dead)
+    return len(dropped), objects
+
+
+def add_snapshot_arguments(parser):
+    parser.add_argument(
+        "--no-snapshot", action="store_true",
+        help="do not snapshot virtual_shop/shops/ before writing (see shop_snapshots.py)",
+    )
+    parser.add_argument(
+        "--snapshot-keep", type=int, default=SNAPSHOT_KEEP, metavar="N",
+        help=f"prune the snapshot store to the newest N snapshots after each one, "
+             f"0 to keep all (default: {SNAPSHOT_KEEP})",
+    )
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+def _store_size(store):
+    total = 0
+    for directory, _dirs, names in os.walk(store.root):
+        total += sum(os.path.getsize(os.path.join(directory, name)) for name in names)
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Snapshot, compare and roll back virtual_shop/shops/")
+    commands = parser.add_subparsers(dest="command", required=True)
+    take = commands.add_parser("snapshot", help="snapshot the current tree")
+    take.add_argument("--label", default="manual")
+    commands.add_parser("list", help="list snapshots, oldest first")
+    back = commands.add_parser("rollback", help="restore the tree from a snapshot")
+    back.add_argument("snapshot", help="snapshot id, unique prefix or 'latest'")
+    back.add_argument("--no-snapshot", action="store_true",
+                      help="do not snapshot the current tree first")
+    compare = commands.add_parser("diff", help="item-level price changes between two snapshots")
+    compare.add_argument("old", help="snapshot id, unique prefix, 'latest' or 'current'")
+    compare.add_argument("new", nargs="?", default="current",
+                         help="as OLD (default: current, the tree on disk)")
+    compare.add_argument("--all", action="store_true",
+                         help="also list items edited without a price change")
+    trim = commands.add_parser("prune", help="keep only the newest snapshots")
+    trim.add_argument("--keep", type=int, default=SNAPSHOT_KEEP, metavar="N")
+    args = parser.parse_args(argv)
+
+    store = SnapshotStore()
+    started = time.perf_counter()
+
+    if args.command == "snapshot":
+        manifest, stored = take_snapshot(store, args.label)
+        print(f"📸 Snapshot {manifest['id']}: {len(manifest['files'])} files, {stored} new objects "
+              f"in {(time.perf_counter() - started) * 1000:.1f} ms")
+        return 0
+
+    if args.command == "list":
+        ids = store.ids()
+        if not ids:
+            print("📭 No snapshots yet")
+            return 0
+        for snapshot_id in ids:
+            manifest = store.load(snapshot_id)
+            touched = ', '.join(os.path.basename(p) for p in manifest['touched'])
+            print(f"  {snapshot_id:<18} {manifest['created']}  {manifest['label']:<24} {touched}")
+        print(f"🗃️  {len(ids)} snapshot(s), store is {_store_size(store) / 1024:.0f} KiB")
+        return 0
+
+    if args.command == "prune":
+        snapshots, objects = prune(store, args.keep)
+        print(f"🧹 Dropped {snapshots} snapshot(s) and {objects} unused object(s)")
+        return 0
+
+    def lookup(ref):
+        if ref == 'current':
+            ids = store.ids()
+            # Queued objects are never flushed, so this writes nothing
+            return {'id': 'current', 'files': scan(store, store.load(ids[-1]) if ids else None)}
+        try:
+            return store.load(store.resolve(ref))
+        except KeyError as e:
+            parser.error(e.args[0])
+
+    if args.command == "diff":
+        old, new = lookup(args.old), lookup(args.new)
+        print(f"🔍 {old['id']} → {new['id']}")
+        print_diff(diff_snapshots(store, old, new), args.all)
+        return 0
+
+    manifest = lookup(args.snapshot)
+    if not args.no_snapshot:
+        current, _stored = take_snapshot(store, f"before rollback to {manifest['id']}")
+        print(f"📸 Current tree saved as {current['id']}")
+    restored, removed, kept = rollback(store, manifest)
+    print(f"⏪ Rolled back to {manifest['id']} ({manifest['label'] or 'no label'}): {restored} files restored"
+          + (f", {removed} removed" if removed else "")
+          + (f", {kept} untracked entries kept" if kept else "")
+          + f" in {(time.perf_counter() - started) * 1000:.0f} ms")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
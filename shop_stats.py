@@ -0,0 +1,128 @@
+"""
+NaturalSMP Economy Overhaul - Phase Counters and Profiling
+Each phase runs with its own PhaseStats (set by the phase runner, inside the worker
+process when --jobs is used); the engine code records timings and counters on
+whatever `active()` returns, and the runner ships the stats back with the output.
+"""
+import cProfile
+import io
+import json
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+TIMERS = ('read_s', 'scan_s', 'subst_s', 'write_s')
+COUNTERS = ('bytes_read', 'bytes_written', 'items_matched', 'items_skipped',
+            'items_migrated', 'regex_calls', 'regex_matches')
+
+
+class PhaseStats:
+    __slots__ = ('phase', 'total_s') + TIMERS + COUNTERS
+
+    def __init__(self, phase=None):
+        self.phase = phase
+        self.total_s = 0.0
+        for name in TIMERS + COUNTERS:
+            setattr(self, name, 0)
+
+    def add(self, name, value=1):
+        setattr(self, name, getattr(self, name) + value)
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+_current = None
+_discard = PhaseStats()
+
+
+def active():
+    """Stats of the phase being run, or a throwaway instance outside the runner."""
+    return _current if _current is not None else _discard
+
+
+@contextmanager
+def collecting(phase, profile=False, trace_memory=False):
+    """Make a fresh PhaseStats active for one phase, optionally under cProfile and/or
+    tracemalloc; their reports are printed to stdout (captured with the phase output)."""
+    global _current
+    stats = PhaseStats(phase)
+    previous, _current = _current, stats
+    profiler = cProfile.Profile() if profile else None
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        if profiler:
+            profiler.enable()
+        yield stats
+    finally:
+        if profiler:
+            profiler.disable()
+        stats.total_s = time.perf_counter() - start
+        _current = previous
+        if trace_memory:
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"  🧠 tracemalloc peak {peak / 1024:.0f} KB, top allocations:")
+            for stat in snapshot.statistics('lineno')[:10]:
+                print(f"     {stat}")
+        if profiler:
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(15)
+            print("  ⏱️  cProfile (top 15 by cumulative time):")
+            for line in out.getvalue().strip().splitlines():
+                print(f"     {line}")
+
+
+# ============================================================================
+# REPORTS
+# ============================================================================
+def write_report(path, engine, phase_stats, commit_s, total_s):
+    report = {
+        'engine': engine,
+        'total_s': total_s,
+        'commit_s': commit_s,
+        'phases': [stats.to_dict() for stats in phase_stats],
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=1)
+    print(f"📈 Run report written to {path}")
+
+
+def print_summary(phase_stats, commit_s):
+    print(f"\n📈 {'PHASE':<28} {'READ':>8} {'SCAN':>8} {'SUBST':>8} {'WRITE':>8}"
+          f" {'IN KB':>8} {'OUT KB':>8} {'MATCH':>6} {'SKIP':>5} {'RE':>4}")
+    for s in phase_stats:
+        print(f"   {(s.phase or '')[:28]:<28}"
+              f" {s.read_s * 1000:>6.1f}ms {s.scan_s * 1000:>6.1f}ms"
+              f" {s.subst_s * 1000:>6.1f}ms {s.write_s * 1000:>6.1f}ms"
+              f" {s.bytes_read / 1024:>8.1f} {s.bytes_written / 1024:>8.1f}"
+              f" {s.items_matched:>6} {s.items_skipped:>5} {s.regex_calls:>4}")
+    print(f"   commit window {commit_s * 1000:.1f}ms")
+
+
+def add_report_arguments(parser):
+    parser.add_argument("--report", metavar="JSON", help="write per-phase timings and counters to JSON")
+    parser.add_argument("--summary", action="store_true", help="print a per-phase timing/counter table")
+    parser.add_argument("--profile", metavar="PHASE", action="append", default=[],
+                        help="run phases whose banner or shop name contains PHASE under cProfile "
+                             "('all' for every phase; repeatable)")
+    parser.add_argument("--trace-memory", metavar="PHASE", action="append", default=[],
+                        help="like --profile but reports tracemalloc peak and top allocations")
+
+
+def phase_matches(patterns, banner, name):
+    """True if any --profile/--trace-memory pattern selects this phase."""
+    text = f"{banner} {name}".lower()
+    return any(p.lower() == 'all' or p.lower() in text for p in patterns)
@@ -0,0 +1,104 @@
+"""
+NaturalSMP Economy Overhaul - Streaming Shop Rewriter
+Reads a shop file one top-level item at a time and writes every chunk straight
+to the staged temp file, so memory is bounded by the largest item instead of
+the file size (merged mega-shops with hundreds of thousands of lines).
+"""
+import os
+
+from shop_index import index_shop_items
+from shop_io import stage_stream
+from shop_stats import active
+
+# Chunks are indexed as a one-item shop so the offsets match index_shop_items()
+ITEMS_PREFIX = "Items:\n"
+
+
+# ============================================================================
+# CHUNKING
+# An item chunk runs from its 2-space key line under `Items:` up to the next
+# sibling or top-level key, blank lines and comments included - the same
+# boundaries index_shop_items() uses. Everything else is passed through.
+# ============================================================================
+def iter_item_chunks(f):
+    """Yield (item_key, text) for a shop file opened in text mode.
+    item_key is None for text outside an item (Settings, the `Items:` line, ...)."""
+    in_items = False
+    key = None
+    lines = []
+    for line in f:
+        stripped = line.strip()
+        if not stripped or stripped.startswith('#'):
+            lines.append(line)
+            continue
+        indent = len(line) - len(line.lstrip(' '))
+        if indent == 0 or (in_items and indent == 2):
+            new_key = None
+            if indent == 0:
+                in_items = stripped == 'Items:'
+            elif stripped.endswith(':') and line.rstrip() == line[:indent] + stripped:
+                new_key = stripped[:-1]
+            # Consecutive non-item lines stay in one pass-through chunk
+            if (key is not None or new_key is not None) and lines:
+                yield key, ''.join(lines)
+                lines = []
+            key = new_key
+        lines.append(line)
+    if lines:
+        yield key, ''.join(lines)
+
+
+def index_chunk(text):
+    """Return (content, index) for one item chunk; offsets refer to content,
+    which is the chunk behind ITEMS_PREFIX."""
+    content = ITEMS_PREFIX + text
+    return content, index_shop_items(content)
+
+
+# ============================================================================
+# REWRITE
+# ============================================================================
+def stream_shop(filepath, rewrite, dry_run=False):
+    """Run rewrite(item_key, text) -> new text over every chunk of a shop file.
+    Pass-through chunks are written as they are. Returns (changed, staged write or
+    None); nothing is staged for a dry run or when no chunk changed."""
+    stats = active()
+    changed = False
+
+    with open(filepath, 'r', encoding='utf-8') as f:
+        st = os.fstat(f.fileno())
+        stamp = (st.st_mtime_ns, st.st_size)
+        stats.add('bytes_read', st.st_size)
+
+        def chunks():
+            nonlocal changed
+            items = iter_item_chunks(f)
+            while True:
+                with stats.timer('read_s'):
+                    chunk = next(items, None)
+                if chunk is None:
+                    return
+                key, text = chunk
+                new = text if key is None else rewrite(key, text)
+                if new != text:
+                    changed = True
+                yield new
+
+        if dry_run:
+            for _chunk in chunks():
+                pass
+            return changed, None
+        staged = stage_stream(filepath, chunks(), stamp)
+
+    if not changed:
+        staged.discard()
+        return False, None
+    return True, staged
+
+
+def add_stream_argument(parser):
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="rewrite shop files one item at a time with constant memory "
+             "(dry runs print the change table but no diff)",
+    )
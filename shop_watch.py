@@ -0,0 +1,196 @@
+"""
+NaturalSMP Economy Overhaul - Watch Mode
+Waits for edits to the price catalogue and the shop files (inotify on Linux,
+stat polling elsewhere), collapses bursts of events into one batch, and keeps
+every shop file's content and item index in memory between batches so a
+re-run only reads and scans files that actually changed on disk.
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+from shop_index import index_shop_items
+from shop_io import read_shop
+from shop_stats import active
+
+DEFAULT_DEBOUNCE_MS = 200
+DEFAULT_POLL_S = 0.5
+
+# inotify(7) event bits
+IN_MODIFY, IN_CLOSE_WRITE, IN_MOVED_TO, IN_CREATE, IN_DELETE = 0x2, 0x8, 0x80, 0x100, 0x200
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _wanted(name, names):
+    # Staged writes are dot-prefixed temp files next to their target
+    if name.startswith('.'):
+        return False
+    return name in names if names is not None else name.endswith('.yml')
+
+
+# ============================================================================
+# WATCHERS
+# Both take {directory: set of file names, or None for every *.yml} and return
+# the set of changed paths from wait(timeout); timeout None waits for ever.
+# ============================================================================
+class PollingWatcher:
+    def __init__(self, targets, interval=DEFAULT_POLL_S):
+        self.targets = targets
+        self.interval = interval
+        self.seen = self._scan()
+
+    def _scan(self):
+        stamps = {}
+        for directory, names in self.targets.items():
+            try:
+                entries = os.listdir(directory)
+            except OSError:
+                continue
+            for name in entries:
+                if _wanted(name, names):
+                    path = os.path.join(directory, name)
+                    stamps[path] = _stamp(path)
+        return stamps
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            current = self._scan()
+            changed = {p for p in current.keys() | self.seen.keys() if current.get(p) != self.seen.get(p)}
+            self.seen = current
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            time.sleep(self.interval if deadline is None else min(self.interval, max(0.0, deadline - time.monotonic())))
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    def __init__(self, targets):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs = {}
+        for directory, names in targets.items():
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                os.close(self.fd)
+                raise OSError(ctypes.get_errno(), f"cannot watch {directory}")
+            self.dirs[wd] = (directory, names)
+
+    def wait(self, timeout=None):
+        readable, _w, _x = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        data = os.read(self.fd, 64 * 1024)
+        changed = set()
+        pos = 0
+        while pos < len(data):
+            wd, _mask, _cookie, length = EVENT_HEADER.unpack_from(data, pos)
+            pos += EVENT_HEADER.size
+            name = os.fsdecode(data[pos:pos + length].rstrip(b'\0'))
+            pos += length
+            if wd in self.dirs:
+                directory, names = self.dirs[wd]
+                if _wanted(name, names):
+                    changed.add(os.path.join(directory, name))
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+def open_watcher(targets, polling=False):
+    """inotify where available, otherwise stat polling. Returns (watcher, kind)."""
+    if not polling and hasattr(os, 'O_CLOEXEC'):
+        try:
+            return InotifyWatcher(targets), "inotify"
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(targets), "polling"
+
+
+def batches(watcher, debounce_s=DEFAULT_DEBOUNCE_MS / 1000):
+    """Yield sets of changed paths, one per burst: a batch closes once nothing
+    has changed for debounce_s."""
+    while True:
+        changed = watcher.wait(None)
+        while True:
+            more = watcher.wait(debounce_s)
+            if not more:
+                break
+            changed |= more
+        yield changed
+
+
+# ============================================================================
+# IN-MEMORY SHOP CACHE
+# ============================================================================
+class ShopCache:
+    """{filepath: (stamp, content, index)} kept between watch batches. A file is
+    only read again when its stamp moved; content written by the engine itself
+    is adopted after commit, and only re-scanned when it is next needed."""
+
+    def __init__(self):
+        self.files = {}
+        self.pending = {}
+
+    def read(self, filepath):
+        """(content, stamp, index) like read_shop() + index_shop_items(), cached."""
+        cached = self.files.get(filepath)
+        if cached is not None and cached[0] == _stamp(filepath):
+            stamp, content, index = cached
+            if index is None:
+                with active().timer('scan_s'):
+                    index = index_shop_items(content)
+                self.files[filepath] = (stamp, content, index)
+            return content, stamp, index
+        content, stamp = read_shop(filepath)
+        with active().timer('scan_s'):
+            index = index_shop_items(content)
+        self.files[filepath] = (stamp, content, index)
+        return content, stamp, index
+
+    def stage(self, staged, content):
+        self.pending[staged.temp] = content
+
+    def commit(self, results):
+        """Adopt the content of every committed staged write."""
+        for staged, error in results:
+            content = self.pending.pop(staged.temp, None)
+            if error is None and content is not None:
+                self.files[staged.target] = (_stamp(staged.target), content, None)
+        self.pending.clear()
+
+    def current(self, filepath):
+        """True if filepath is exactly what the cache last read or wrote."""
+        cached = self.files.get(filepath)
+        return cached is not None and cached[0] == _stamp(filepath)
+
+
+def add_watch_arguments(parser):
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="after the run, keep watching the price catalogue and shop files and "
+             "re-apply whatever changed",
+    )
+    parser.add_argument("--debounce", type=int, default=DEFAULT_DEBOUNCE_MS, metavar="MS",
+                        help=f"quiet time that ends a burst of edits (default: {DEFAULT_DEBOUNCE_MS})")
+    parser.add_argument("--poll", action="store_true",
+                        help="poll file stats instead of using inotify")
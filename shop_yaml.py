@@ -0,0 +1,284 @@
+"""
+NaturalSMP Economy Overhaul - Lazy Round-Trip YAML
+A read/edit layer for the plugin's block-style YAML (shop files, settings.yml,
+config.yml) that never re-serializes what it did not touch. One scan records
+where every line starts and how far it is indented; a node's children are
+only split out when they are first accessed, and edits are splices on the
+original text (EditBuffer), so comments, key order, quoting and blank lines
+survive byte for byte.
+
+    doc = YamlDocument(content)
+    price = doc.path('Items', 'potion_1', 'Price')
+    doc.set_value(price['BUY']['StartValue'], '250.0')
+    content = doc.serialize()
+
+Flow collections, anchors and multi-document files are not understood; flow
+values such as `Aliases: []` are plain scalars here.
+"""
+import array
+
+from shop_index import EditBuffer
+
+COMMENT = -1    # indent recorded for blank and comment-only lines
+
+
+def unquote(value):
+    """Scalar text without its YAML quotes ('it''s' -> it's)."""
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] == "'":
+        return value[1:-1].replace("''", "'")
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1].replace('\\"', '"').replace('\\\\', '\\')
+    return value
+
+
+def _split_key(text):
+    """(key, offset of the value in text) for a `key: value` line with its indent
+    stripped, or None for sequence entries and lines that are not a mapping key."""
+    if text[0] == '-' and (len(text) == 1 or text[1] == ' '):
+        return None
+    if text[0] in '\'"':
+        end = text.find(text[0], 1)
+        while end != -1 and text[0] == "'" and text[end + 1:end + 2] == "'":
+            end = text.find("'", end + 2)
+        if end == -1 or text[end + 1:end + 2] != ':':
+            return None
+        colon = end + 1
+        key = unquote(text[:end + 1])
+    else:
+        colon = text.find(':')
+        while colon != -1 and colon + 1 < len(text) and text[colon + 1] != ' ':
+            colon = text.find(':', colon + 1)
+        if colon <= 0:
+            return None
+        key = text[:colon].rstrip()
+    value = colon + 1
+    while value < len(text) and text[value] == ' ':
+        value += 1
+    return key, value
+
+
+# ============================================================================
+# NODES
+# A node is one `key:` line plus every deeper-indented line below it. Line
+# numbers index the document's line tables; spans are character offsets into
+# the original content.
+# ============================================================================
+class YamlNode:
+    __slots__ = ('doc', 'key', 'line', 'end_line', 'indent', 'value_start', '_children')
+
+    def __init__(self, doc, key, line, end_line, indent, value_start):
+        self.doc = doc
+        self.key = key
+        self.line = line                # key line, -1 for the document root
+        self.end_line = end_line        # first line after the block (blank lines included)
+        self.indent = indent
+        self.value_start = value_start  # offset of the inline value, None for the root
+        self._children = None
+
+    def __repr__(self):
+        return f"YamlNode({self.key!r}, line={self.line + 1}, lines={self.end_line - self.line})"
+
+    # ------------------------------------------------------------------------
+    # Scalars
+    # ------------------------------------------------------------------------
+    @property
+    def raw(self):
+        """Inline value exactly as written ('' for a block node)."""
+        if self.line < 0:
+            return ''
+        return self.doc.content[self.value_start:self.doc.line_end(self.line)].rstrip()
+
+    @property
+    def value(self):
+        """Inline value unquoted, or None for a block node."""
+        raw = self.raw
+        return unquote(raw) if raw else None
+
+    def number(self):
+        try:
+            return float(self.value)
+        except (TypeError, ValueError):
+            return None
+
+    # ------------------------------------------------------------------------
+    # Spans
+    # ------------------------------------------------------------------------
+    def last_line(self):
+        """Last non-blank, non-comment line of the block."""
+        indents = self.doc.indents
+        last = self.end_line - 1
+        while last > self.line and indents[last] == COMMENT:
+            last -= 1
+        return last
+
+    @property
+    def span(self):
+        """(start, end) of the key line through the last content line of the block,
+        its newline excluded. Trailing blank lines and comments stay outside."""
+        start = self.doc.starts[self.line] if self.line >= 0 else 0
+        return start, self.doc.line_end(self.last_line())
+
+    @property
+    def value_span(self):
+        return self.value_start, self.value_start + len(self.raw)
+
+    @property
+    def text(self):
+        start, end = self.span
+        return self.doc.content[start:end]
+
+    # ------------------------------------------------------------------------
+    # Children, split out on first access
+    # ------------------------------------------------------------------------
+    @property
+    def children(self):
+        if self._children is None:
+            self._children = self.doc._children(self) if not self.raw else {}
+        return self._children
+
+    def __getitem__(self, key):
+        return self.children[key]
+
+    def get(self, key, default=None):
+        return self.children.get(key, default)
+
+    def __contains__(self, key):
+        return key in self.children
+
+    def __iter__(self):
+        return iter(self.children)
+
+    def __len__(self):
+        return len(self.children)
+
+    def keys(self):
+        return self.children.keys()
+
+    def items(self):
+        return self.children.items()
+
+    def entries(self):
+        """Sequence entries ('- value' lines) directly under this node, unquoted."""
+        doc = self.doc
+        entries = []
+        depth = None
+        for line in range(self.line + 1, self.end_line):
+            indent = doc.indents[line]
+            if indent == COMMENT or (depth is not None and indent != depth):
+                continue
+            depth = indent
+            text = doc.content[doc.starts[line] + indent:doc.line_end(line)].rstrip()
+            if text.startswith('- ') or text == '-':
+                entries.append(unquote(text[1:]))
+        return entries
+
+
+# ============================================================================
+# DOCUMENT
+# ============================================================================
+class YamlDocument:
+    __slots__ = ('content', 'starts', 'indents', 'root', 'edits', 'materialized')
+
+    def __init__(self, content):
+        self.content = content
+        self.starts = array.array('I')
+        self.indents = array.array('h')
+        add_start, add_indent = self.starts.append, self.indents.append
+        pos = 0
+        for line in content.split('\n'):
+            body = line.lstrip(' ')
+            add_start(pos)
+            add_indent(COMMENT if not body or body[0] in '#\r' else len(line) - len(body))
+            pos += len(line) + 1
+        self.root = YamlNode(self, None, -1, len(self.starts), -1, None)
+        self.edits = EditBuffer(content)
+        self.materialized = 0   # child tables split out so far
+
+    def line_end(self, line):
+        end = self.starts[line + 1] - 1 if line + 1 < len(self.starts) else len(self.content)
+        if end > self.starts[line] and self.content[end - 1] == '\r':
+            end -= 1
+        return end
+
+    def _children(self, node):
+        """{key: YamlNode} for the mapping directly under node. Lines indented less
+        than the first child end the mapping, as do sibling sequence entries."""
+        indents, starts, content = self.indents, self.starts, self.content
+        children = {}
+        child_indent = None
+        current = None
+        for line in range(node.line + 1, node.end_line):
+            indent = indents[line]
+            if indent == COMMENT:
+                continue
+            if child_indent is None:
+                child_indent = indent
+            if indent > child_indent:
+                continue
+            text = content[starts[line] + indent:self.line_end(line)]
+            if indent == child_indent and current is not None and text[0] == '-' and text[1:2] in ('', ' '):
+                continue    # `key:` followed by `- entry` lines at the key's own indent
+            if current is not None:
+                current.end_line = line
+                current = None
+            if indent < child_indent:
+                break
+            found = _split_key(text)
+            if found is None:
+                continue
+            key, value = found
+            current = YamlNode(self, key, line, node.end_line, indent, starts[line] + indent + value)
+            # First occurrence wins, same as index_shop_items()
+            children.setdefault(key, current)
+        self.materialized += 1
+        return children
+
+    # ------------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------------
+    def __getitem__(self, key):
+        return self.root[key]
+
+    def get(self, key, default=None):
+        return self.root.get(key, default)
+
+    def path(self, *keys):
+        """Node at keys ('Items', 'potion_1', 'Price'), or None if any is missing."""
+        node = self.root
+        for key in keys:
+            node = node.get(key)
+            if node is None:
+                return None
+        return node
+
+    # ------------------------------------------------------------------------
+    # Edits: splices against the original text, applied once by serialize().
+    # Nodes keep describing the original, so a node that was replaced must not
+    # be edited again.
+    # ------------------------------------------------------------------------
+    def set_value(self, node, text):
+        """Replace a scalar node's inline value with text, written as given."""
+        if not node.raw:
+            raise ValueError(f"{node.key!r} is a block node, use replace_body()")
+        start, end = node.value_span
+        self.edits.replace(start, end, text, node.key)
+
+    def replace(self, node, text):
+        """Replace the whole node (key line included) with text."""
+        start, end = node.span
+        self.edits.replace(start, end, text, node.key)
+
+    def replace_body(self, node, lines):
+        """Replace everything under a block node's key line with lines, each
+        indented two spaces deeper than the key."""
+        if node.raw:
+            raise ValueError(f"{node.key!r} has an inline value, use replace()")
+        key_end = self.line_end(node.line)
+        end = node.span[1]
+        pad = ' ' * (node.indent + 2)
+        text = ''.join('\n' + pad + line for line in lines)
+        self.edits.replace(key_end, max(end, key_end), text, node.key)
+
+    def serialize(self):
+        return self.edits.apply()
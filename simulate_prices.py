@@ -0,0 +1,376 @@
+"""
+NaturalSMP Economy Overhaul - DYNAMIC Price Simulator
+Loads every DYNAMIC product from virtual_shop/shops/*.yml (either Price layout)
+and steps all of them together through simulated trading, one tick per
+Shop_Update_Interval from config.yml, to show how prices drift and when they
+pin at MinOffset/MaxOffset before a change ships.
+
+    python simulate_prices.py --days 30 --volumes volumes.toml --csv trajectories.csv
+
+Model, per tick and per product: purchases and sales are drawn from the
+product's volume distribution; each side's offset moves by
+purchases * BuyOffset + sales * SellOffset, is clamped to [MinOffset, MaxOffset],
+and every Stabilization Interval seconds moves Amount back towards 0.
+Price = StartValue + offset.
+
+NumPy is optional: with it every tick is a handful of array operations over the
+whole catalogue; without it a pure-Python stepper gives the same model, slowly.
+"""
+import argparse
+import csv
+import glob
+import json
+import math
+import os
+import random
+import time
+
+try:
+    import numpy as np
+except ImportError:     # pure-Python stepper below
+    np = None
+
+from price_layout import PriceLayoutError, parse_price_block
+from shop_index import index_shop_items
+from shop_yaml import YamlDocument
+
+SHOP_DIR = os.path.dirname(os.path.abspath(__file__))
+SHOPS_DIR = os.path.join(SHOP_DIR, "virtual_shop", "shops")
+CONFIG_PATH = os.path.join(SHOP_DIR, "config.yml")
+
+SIDES = ('BUY', 'SELL')
+# dynamic_block() defaults, used for keys a block leaves out
+SIDE_DEFAULTS = {'BuyOffset': 1.0, 'SellOffset': -1.0, 'MinOffset': -10.0, 'MaxOffset': 15.0}
+STABILIZATION_DEFAULTS = {'Interval': 300.0, 'Amount': 0.5}
+DISTRIBUTIONS = ('poisson', 'fixed')
+DEFAULT_VOLUME = {'buy': 2.0, 'sell': 6.0, 'distribution': 'poisson'}     # trades per hour
+
+
+# ============================================================================
+# LOADING
+# ============================================================================
+def read_update_interval(config_path=CONFIG_PATH, default=60):
+    """General.Shop_Update_Interval (seconds) from the plugin's config.yml."""
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            node = YamlDocument(f.read()).path('General', 'Shop_Update_Interval')
+    except OSError:
+        return default
+    interval = node.number() if node is not None else None
+    return int(interval) if interval else default
+
+
+def _float(section, key, default):
+    try:
+        return float(section.get(key, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def load_dynamic_products(shops_dir=SHOPS_DIR):
+    """Every DYNAMIC product as a dict of floats: shop, item, and per side
+    start/buy_off/sell_off/min_off/max_off, plus interval and amount."""
+    products = []
+    for path in sorted(glob.glob(os.path.join(shops_dir, "*.yml"))):
+        shop = os.path.basename(path)[:-4]
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        for key, spans in index_shop_items(content).items():
+            if spans.price is None:
+                continue
+            try:
+                price = parse_price_block(content[spans.price[0]:spans.price[1]])
+            except PriceLayoutError:
+                continue
+            if price['Type'] != 'DYNAMIC':
+                continue
+            product = {'shop': shop, 'item': key}
+            for side in SIDES:
+                section = price.get(side) if isinstance(price.get(side), dict) else {}
+                product[side] = {
+                    'start': _float(section, 'StartValue', 0.0),
+                    'buy_off': _float(section, 'BuyOffset', SIDE_DEFAULTS['BuyOffset']),
+                    'sell_off': _float(section, 'SellOffset', SIDE_DEFAULTS['SellOffset']),
+                    'min_off': _float(section, 'MinOffset', SIDE_DEFAULTS['MinOffset']),
+                    'max_off': _float(section, 'MaxOffset', SIDE_DEFAULTS['MaxOffset']),
+                }
+            stabilization = price.get('Stabilization') if isinstance(price.get('Stabilization'), dict) else {}
+            product['interval'] = _float(stabilization, 'Interval', STABILIZATION_DEFAULTS['Interval'])
+            product['amount'] = _float(stabilization, 'Amount', STABILIZATION_DEFAULTS['Amount'])
+            products.append(product)
+    return products
+
+
+def load_volumes(path):
+    """Volume table from TOML: [default], [<shop>] and ["<shop>.<item>"] tables with
+    buy/sell (mean trades per hour) and distribution ('poisson' or 'fixed')."""
+    if path is None:
+        return {}
+    try:
+        import tomllib
+    except ImportError:     # Python < 3.11
+        import tomli as tomllib
+    with open(path, 'rb') as f:
+        volumes = tomllib.load(f)
+    for name, table in volumes.items():
+        distribution = table.get('distribution', 'poisson')
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f"{path}: [{name}] distribution must be one of {', '.join(DISTRIBUTIONS)}")
+    return volumes
+
+
+def resolve_volume(volumes, shop, item):
+    """Most specific settings win: "shop.item", then shop, then default."""
+    volume = dict(DEFAULT_VOLUME)
+    for name in ('default', shop, f"{shop}.{item}"):
+        volume.update(volumes.get(name, {}))
+    return float(volume['buy']), float(volume['sell']), volume['distribution']
+
+
+# ============================================================================
+# SIMULATION
+# Offsets and bounds are (product, side) arrays; hit times are seconds or None.
+# ============================================================================
+def simulate(products, volumes, days, tick_s, seed=0, sample_every=60):
+    """Step every product through days of trading. Returns a result dict with
+    sample times, sampled prices per side, final prices, offset range and
+    the first time each side reached MinOffset / MaxOffset."""
+    rates = [resolve_volume(volumes, p['shop'], p['item']) for p in products]
+    ticks = int(days * 86400 // tick_s)
+    if np is not None:
+        return _simulate_numpy(products, rates, ticks, tick_s, seed, sample_every)
+    return _simulate_python(products, rates, ticks, tick_s, seed, sample_every)
+
+
+def _param(products, name):
+    return [[p[side][name] for side in SIDES] for p in products]
+
+
+def _stabilize_ticks(interval, tick_s):
+    """Predicate: does a Stabilization step fall inside tick t (None if disabled)."""
+    if interval <= 0:
+        return None
+    return lambda t: int((t + 1) * tick_s // interval) > int(t * tick_s // interval)
+
+
+def _simulate_numpy(products, rates, ticks, tick_s, seed, sample_every):
+    rng = np.random.default_rng(seed)
+    n = len(products)
+    start = np.array(_param(products, 'start')).reshape(n, 2)
+    buy_off = np.array(_param(products, 'buy_off')).reshape(n, 2)
+    sell_off = np.array(_param(products, 'sell_off')).reshape(n, 2)
+    lo_bound = np.array(_param(products, 'min_off')).reshape(n, 2)
+    hi_bound = np.array(_param(products, 'max_off')).reshape(n, 2)
+    interval = np.array([p['interval'] for p in products])
+    amount = np.array([p['amount'] for p in products])[:, None]
+    buy_rate = np.array([r[0] for r in rates]) * tick_s / 3600
+    sell_rate = np.array([r[1] for r in rates]) * tick_s / 3600
+    poisson = np.array([r[2] == 'poisson' for r in rates])
+
+    offset = np.zeros((n, 2))
+    low = np.zeros((n, 2))
+    high = np.zeros((n, 2))
+    hit_min = np.full((n, 2), np.nan)
+    hit_max = np.full((n, 2), np.nan)
+    samples, times = [], []
+    # Stabilization steps per tick, per product: compare interval counts of both tick edges
+    safe_interval = np.where(interval > 0, interval, np.inf)
+
+    for t in range(ticks):
+        purchases = np.where(poisson, rng.poisson(buy_rate), buy_rate)
+        sales = np.where(poisson, rng.poisson(sell_rate), sell_rate)
+        offset += purchases[:, None] * buy_off + sales[:, None] * sell_off
+        np.clip(offset, lo_bound, hi_bound, out=offset)
+
+        stab = np.floor((t + 1) * tick_s / safe_interval) > np.floor(t * tick_s / safe_interval)
+        if stab.any():
+            moved = np.sign(offset) * np.maximum(np.abs(offset) - amount, 0.0)
+            offset = np.where(stab[:, None], moved, offset)
+
+        now = (t + 1) * tick_s
+        np.minimum(low, offset, out=low)
+        np.maximum(high, offset, out=high)
+        hit_min[np.isnan(hit_min) & (offset <= lo_bound) & (lo_bound < 0)] = now
+        hit_max[np.isnan(hit_max) & (offset >= hi_bound) & (hi_bound > 0)] = now
+        if (t + 1) % sample_every == 0:
+            times.append(now)
+            samples.append(start + offset)
+
+    def none_for_nan(array):
+        return [[None if math.isnan(v) else float(v) for v in row] for row in array.tolist()]
+
+    return {
+        'times': times,
+        'prices': [s.tolist() for s in samples],
+        'final': (start + offset).tolist(),
+        'low': low.tolist(),
+        'high': high.tolist(),
+        'hit_min': none_for_nan(hit_min),
+        'hit_max': none_for_nan(hit_max),
+        'backend': f"numpy {np.__version__}",
+    }
+
+
+def _poisson(rng, lam):
+    # Knuth; per-tick rates are small
+    if lam <= 0:
+        return 0
+    limit = math.exp(-lam)
+    k, p = 0, rng.random()
+    while p > limit:
+        k += 1
+        p *= rng.random()
+    return k
+
+
+def _simulate_python(products, rates, ticks, tick_s, seed, sample_every):
+    rng = random.Random(seed)
+    n = len(products)
+    offset = [[0.0, 0.0] for _ in range(n)]
+    low = [[0.0, 0.0] for _ in range(n)]
+    high = [[0.0, 0.0] for _ in range(n)]
+    hit_min = [[None, None] for _ in range(n)]
+    hit_max = [[None, None] for _ in range(n)]
+    stabilizes = [_stabilize_ticks(p['interval'], tick_s) for p in products]
+    per_tick = [(r[0] * tick_s / 3600, r[1] * tick_s / 3600, r[2] == 'poisson') for r in rates]
+    samples, times = [], []
+
+    for t in range(ticks):
+        now = (t + 1) * tick_s
+        for i, product in enumerate(products):
+            buy_rate, sell_rate, poisson = per_tick[i]
+            purchases = _poisson(rng, buy_rate) if poisson else buy_rate
+            sales = _poisson(rng, sell_rate) if poisson else sell_rate
+            stab = stabilizes[i] is not None and stabilizes[i](t)
+            for s, side in enumerate(SIDES):
+                params = product[side]
+                value = offset[i][s] + purchases * params['buy_off'] + sales * params['sell_off']
+                value = min(max(value, params['min_off']), params['max_off'])
+                if stab:
+                    value = math.copysign(max(abs(value) - product['amount'], 0.0), value)
+                offset[i][s] = value
+                low[i][s] = min(low[i][s], value)
+                high[i][s] = max(high[i][s], value)
+                if hit_min[i][s] is None and params['min_off'] < 0 and value <= params['min_off']:
+                    hit_min[i][s] = now
+                if hit_max[i][s] is None and params['max_off'] > 0 and value >= params['max_off']:
+                    hit_max[i][s] = now
+        if (t + 1) % sample_every == 0:
+            times.append(now)
+            samples.append([[p[side]['start'] + offset[i][s] for s, side in enumerate(SIDES)]
+                            for i, p in enumerate(products)])
+
+    return {
+        'times': times,
+        'prices': samples,
+        'final': [[p[side]['start'] + offset[i][s] for s, side in enumerate(SIDES)]
+                  for i, p in enumerate(products)],
+        'low': low,
+        'high': high,
+        'hit_min': hit_min,
+        'hit_max': hit_max,
+        'backend': "pure Python (install numpy for the vectorized stepper)",
+    }
+
+
+# ============================================================================
+# OUTPUT
+# ============================================================================
+def write_trajectories(path, products, result):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(('hours', 'shop', 'item', 'buy', 'sell'))
+        for now, prices in zip(result['times'], result['prices']):
+            for product, (buy, sell) in zip(products, prices):
+                writer.writerow((f"{now / 3600:g}", product['shop'], product['item'],
+                                 f"{buy:.4f}", f"{sell:.4f}"))
+    print(f"💾 Trajectories written to {path}")
+
+
+def write_summary(path, products, result, meta):
+    rows = []
+    for i, product in enumerate(products):
+        row = {'shop': product['shop'], 'item': product['item']}
+        for s, side in enumerate(SIDES):
+            row[side] = {
+                'start': product[side]['start'],
+                'final': result['final'][i][s],
+                'min_offset_seen': result['low'][i][s],
+                'max_offset_seen': result['high'][i][s],
+                'hit_min_s': result['hit_min'][i][s],
+                'hit_max_s': result['hit_max'][i][s],
+            }
+        rows.append(row)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(dict(meta, products=rows), f, indent=1)
+    print(f"💾 Summary written to {path}")
+
+
+def _hours(seconds):
+    return '-' if seconds is None else f"{seconds / 3600:.1f}h"
+
+
+def print_summary(products, result, top):
+    """Products that pin at a bound first, earliest first."""
+    def first_hit(i):
+        hits = [h for h in result['hit_min'][i] + result['hit_max'][i] if h is not None]
+        return min(hits) if hits else math.inf
+
+    order = sorted(range(len(products)), key=first_hit)[:top]
+    print(f"\n  {'PRODUCT':<32} {'BUY':>9} {'→':>9} {'MIN':>7} {'MAX':>7}"
+          f" {'SELL':>9} {'→':>9} {'MIN':>7} {'MAX':>7}")
+    for i in order:
+        cells = []
+        for s, side in enumerate(SIDES):
+            cells.append(f"{products[i][side]['start']:>9g} {result['final'][i][s]:>9.2f}"
+                         f" {_hours(result['hit_min'][i][s]):>7} {_hours(result['hit_max'][i][s]):>7}")
+        name = f"{products[i]['shop']}/{products[i]['item']}"
+        print(f"  {name[:32]:<32} {' '.join(cells)}")
+
+    for label, key in (('MinOffset', 'hit_min'), ('MaxOffset', 'hit_max')):
+        counts = [sum(1 for row in result[key] if row[s] is not None) for s in range(2)]
+        print(f"  Reached {label}: {counts[0]} BUY / {counts[1]} SELL sides")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate DYNAMIC shop prices under trading load")
+    parser.add_argument("--days", type=float, default=30, help="simulated days (default: 30)")
+    parser.add_argument("--tick", type=int, default=None,
+                        help="seconds per tick (default: Shop_Update_Interval from config.yml)")
+    parser.add_argument("--volumes", metavar="TOML",
+                        help="per-shop / per-product trade volumes ([default], [shop], [\"shop.item\"] "
+                             "with buy, sell per hour and distribution poisson|fixed)")
+    parser.add_argument("--shop", action="append", default=[], help="only simulate this shop (repeatable)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sample-every", type=int, default=60, metavar="TICKS",
+                        help="record prices every N ticks for --csv (default: 60)")
+    parser.add_argument("--csv", metavar="PATH", help="write sampled price trajectories (long format)")
+    parser.add_argument("--json", metavar="PATH", help="write final prices and hitting times per product")
+    parser.add_argument("--top", type=int, default=20, help="rows in the printed table (default: 20)")
+    args = parser.parse_args(argv)
+
+    tick_s = args.tick or read_update_interval()
+    products = load_dynamic_products()
+    if args.shop:
+        products = [p for p in products if p['shop'] in args.shop]
+    if not products:
+        print("⚠️  No DYNAMIC products found")
+        return 1
+    volumes = load_volumes(args.volumes)
+
+    started = time.perf_counter()
+    result = simulate(products, volumes, args.days, tick_s, args.seed, max(1, args.sample_every))
+    seconds = time.perf_counter() - started
+    print(f"📈 {len(products)} DYNAMIC products, {args.days:g} days at {tick_s} s per tick "
+          f"in {seconds:.2f} s ({result['backend']})")
+    print_summary(products, result, args.top)
+
+    meta = {'days': args.days, 'tick_s': tick_s, 'seed': args.seed, 'backend': result['backend']}
+    if args.csv:
+        write_trajectories(args.csv, products, result)
+    if args.json:
+        write_summary(args.json, products, result, meta)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
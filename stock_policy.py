@@ -0,0 +1,217 @@
+"""
+NaturalSMP Economy Overhaul - Stock Policy
+Stock limits declared in stock_policy.toml. Every [[stock]] entry selects
+products the way price rules do (shop, item key, material, product key globs,
+optionally match = { type = "DYNAMIC" }) and sets any of the six limits of
+their Stock block:
+
+    global = { buy = 1000, sell = 5000, restock = "1h" }
+    player = { sell = 256, restock = "30m" }
+
+buy/sell are amounts per restock window, -1 for unlimited; restock is the
+window in seconds or as a duration ("90s", "15m", "1h30m", "1d"). For each
+limit the matching entry with the highest priority wins, ties going to the
+entry written first; limits no entry sets keep the value in the shop file.
+"""
+import hashlib
+import os
+import re
+
+from price_rules import RuleError, Selector
+from shop_index import STOCK_FIELDS, STOCK_SCOPES, read_stock
+from shop_materials import item_snbt, parse_item
+
+POLICY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stock_policy.toml")
+
+SELECTORS = ('shop', 'item', 'material', 'product')
+SCOPES = {'global': 'GLOBAL', 'player': 'PLAYER'}
+LIMITS = {'buy': 'BuyAmount', 'sell': 'SellAmount', 'restock': 'RestockTime'}
+POLICY_KEYS = {'name', 'priority', 'match'} | set(SELECTORS) | set(SCOPES)
+# What the plugin assumes for a limit the Stock block leaves out
+DEFAULTS = {'BuyAmount': -1, 'SellAmount': -1, 'RestockTime': 0}
+
+DURATION = re.compile(r'(?:(\d+)d)?(?:(\d+)h)?(?:(\d+)m)?(?:(\d+)s)?\Z')
+DURATION_UNITS = (86400, 3600, 60, 1)
+
+
+class PolicyError(RuleError):
+    pass
+
+
+def parse_duration(where, value):
+    """Seconds from an int or a duration string such as '1h30m'."""
+    if isinstance(value, bool):
+        raise PolicyError(f"{where}: expected seconds or a duration like \"1h\"")
+    if isinstance(value, int):
+        if value < 0:
+            raise PolicyError(f"{where}: restock time cannot be negative")
+        return value
+    found = DURATION.match(value.strip()) if isinstance(value, str) and value.strip() else None
+    if not found:
+        raise PolicyError(f"{where}: expected seconds or a duration like \"1h\", got {value!r}")
+    return sum(int(n) * unit for n, unit in zip(found.groups(), DURATION_UNITS) if n)
+
+
+def _amount(where, value):
+    if isinstance(value, bool) or not isinstance(value, int) or value < -1:
+        raise PolicyError(f"{where}: expected a whole amount, or -1 for unlimited")
+    return value
+
+
+# ============================================================================
+# POLICIES
+# ============================================================================
+class StockPolicy:
+    __slots__ = ('name', 'order', 'priority', 'types', 'limits', 'source',
+                 'shop', 'item', 'material', 'product')
+
+    def __init__(self, order, raw):
+        self.order = order
+        self.name = raw.get('name') or f"stock #{order + 1}"
+        where = self.name
+        unknown = set(raw) - POLICY_KEYS
+        if unknown:
+            raise PolicyError(f"{where}: unknown keys {', '.join(sorted(unknown))}")
+        self.priority = int(raw.get('priority', 0))
+        for selector in SELECTORS:
+            setattr(self, selector, Selector(f"{where}.{selector}", raw[selector]) if selector in raw else None)
+        match = raw.get('match', {})
+        if not isinstance(match, dict) or set(match) - {'type'}:
+            raise PolicyError(f"{where}.match: only type is supported")
+        types = match.get('type')
+        self.types = None if types is None else frozenset([types] if isinstance(types, str) else types)
+        # {(scope, field): value}
+        self.limits = {}
+        for key, scope in SCOPES.items():
+            table = raw.get(key)
+            if table is None:
+                continue
+            if not isinstance(table, dict) or not table or set(table) - set(LIMITS):
+                raise PolicyError(f"{where}.{key}: expected a table with buy, sell and/or restock")
+            for name, value in table.items():
+                check = parse_duration if name == 'restock' else _amount
+                self.limits[(scope, LIMITS[name])] = check(f"{where}.{key}.{name}", value)
+        if not self.limits:
+            raise PolicyError(f"{where}: sets no limits (add a global or player table)")
+        self.source = raw
+
+    @property
+    def needs_item(self):
+        return self.material is not None or self.product is not None
+
+    def matches(self, key, material, product_key, price_type):
+        if self.item is not None and self.item.match(key) is None:
+            return False
+        if self.material is not None and self.material.match(material) is None:
+            return False
+        if self.product is not None and self.product.match(product_key) is None:
+            return False
+        return self.types is None or price_type in self.types
+
+
+def load_policies(path=POLICY_PATH):
+    """[StockPolicy] from a policy file, in file order; [] if there is no file."""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return []
+    try:
+        import tomllib
+    except ImportError:     # Python < 3.11
+        import tomli as tomllib
+    try:
+        raw = tomllib.loads(data.decode('utf-8'))
+    except tomllib.TOMLDecodeError as e:
+        raise PolicyError(f"{os.path.basename(path)} is not valid TOML: {e}") from None
+    entries = raw.get('stock', [])
+    if not isinstance(entries, list) or set(raw) - {'stock'}:
+        raise PolicyError(f"{os.path.basename(path)}: expected only [[stock]] tables")
+    return [StockPolicy(order, entry) for order, entry in enumerate(entries)]
+
+
+# ============================================================================
+# STOCK BLOCKS
+# A stock is {scope: {field: int}}, the shape read_stock() returns.
+# ============================================================================
+def full_stock(stock):
+    """Every scope and field, filling the ones a block leaves out with DEFAULTS."""
+    return {scope: {field: stock.get(scope, {}).get(field, DEFAULTS[field]) for field in STOCK_FIELDS}
+            for scope in STOCK_SCOPES}
+
+
+def stock_block(stock):
+    """Stock block text, '    Stock:' line included, no trailing newline."""
+    lines = ["    Stock:"]
+    for scope in STOCK_SCOPES:
+        lines.append(f"      {scope}:")
+        lines.extend(f"        {field}: {stock[scope][field]}" for field in STOCK_FIELDS)
+    return '\n'.join(lines)
+
+
+def _price_type(content, spans):
+    if spans.price is None:
+        return None
+    start = content.find('Type:', spans.price[0], spans.price[1])
+    if start == -1:
+        return None
+    end = content.find('\n', start, spans.price[1])
+    return content[start + 5:end if end != -1 else spans.price[1]].strip()
+
+
+class ShopStock:
+    """The policies that can touch one shop, highest priority first. Also the
+    shop's manifest handler: fingerprint() changes with its policies."""
+
+    def __init__(self, shop, policies):
+        self.shop = shop
+        self.policies = sorted(policies, key=lambda p: (-p.priority, p.order))
+        self.needs_item = any(p.needs_item for p in policies)
+
+    def fingerprint(self):
+        return hashlib.sha1(repr([p.source for p in self.policies]).encode('utf-8')).hexdigest()[:16]
+
+    def evaluate(self, content, index):
+        """{item: (old stock, new stock, [policy names])} for every item whose limits
+        change. Both stocks are complete (full_stock); old is None for an item
+        that has no Stock block yet."""
+        results = {}
+        for key, spans in index.items():
+            material = product_key = None
+            if self.needs_item:
+                snbt = item_snbt(content, spans)
+                material, product_key, _count = parse_item(snbt) if snbt else (None, None, 1)
+            price_type = _price_type(content, spans)
+            limits = {}
+            applied = []
+            for policy in self.policies:
+                if not policy.matches(key, material, product_key, price_type):
+                    continue
+                used = False
+                for limit, value in policy.limits.items():
+                    if limit not in limits:
+                        limits[limit] = value
+                        used = True
+                if used:
+                    applied.append(policy.name)
+            if not limits:
+                continue
+            old = full_stock(read_stock(content[spans.stock[0]:spans.stock[1]])) if spans.stock else None
+            new = full_stock(old or {})
+            for (scope, field), value in limits.items():
+                new[scope][field] = value
+            if new != old:
+                results[key] = (old, new, applied)
+        return results
+
+
+_policies = None
+
+
+def shop_stock(shop):
+    """ShopStock for shop from the default policy file, or None if no entry selects it."""
+    global _policies
+    if _policies is None:
+        _policies = load_policies()
+    selected = [p for p in _policies if p.shop is None or p.shop.match(shop) is not None]
+    return ShopStock(shop, selected) if selected else None
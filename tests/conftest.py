@@ -0,0 +1,56 @@
+"""
+Shared helpers for the updater tests: small shop files in the plugin's layout,
+written to a temp dir so nothing under virtual_shop/ is touched.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shop_io import commit_writes  # noqa: E402
+
+SETTINGS = """Settings:
+  Name: Test
+  Buying: true
+  Selling: true
+"""
+
+
+def flat_price(buy, sell):
+    return f"    Price:\n      Type: FLAT\n      SELL: {sell}\n      BUY: {buy}\n"
+
+
+def item_yaml(key, price, material=None, stock=True, shop_view=True):
+    """One item in the plugin's layout; price is the full Price block text."""
+    text = (
+        f"  {key}:\n"
+        f"    Type: ITEM\n"
+        f"    Item:\n"
+        f"      Provider: vanilla\n"
+        f"      Data:\n"
+        f"        Value: '{{count:1,id:\"minecraft:{material or key}\"}}'\n"
+        f"    Currency: vault\n"
+        + price
+    )
+    if stock:
+        text += ("    Stock:\n      GLOBAL:\n        BuyAmount: -1\n        SellAmount: -1\n"
+                 "        RestockTime: 0\n      PLAYER:\n        BuyAmount: -1\n"
+                 "        SellAmount: -1\n        RestockTime: 0\n")
+    if shop_view:
+        text += "    Shop_View:\n      Slot: 1\n      Page: 1\n"
+    return text
+
+
+def write_shop(path, items):
+    """Write a shop file from item_yaml() texts and return its path as a str."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(SETTINGS + "Items:\n" + ''.join(items))
+    return str(path)
+
+
+def commit(result):
+    """Commit the staged write of an engine's (changes, staged) result, if any."""
+    _changes, staged = result
+    if staged is not None:
+        [(_staged, error)] = commit_writes([staged])
+        assert error is None, error
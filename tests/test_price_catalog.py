@@ -0,0 +1,26 @@
+from price_catalog import PriceCatalog, cache_path_for
+
+CATALOG = """
+[minerals]
+diamond_ore = ["DYNAMIC", 2500.0, 500.0]
+coal_ore = ["FLAT", 300.0, 60.0]
+
+[food]
+bread = ["FLAT", 20.0, 4.0]
+"""
+
+
+def test_truncated_cache_is_rebuilt(tmp_path):
+    path = tmp_path / "price_catalog.toml"
+    path.write_text(CATALOG)
+    expected = PriceCatalog(str(path)).prices("food")
+    assert expected == {'bread': ('FLAT', 20.0, 4.0)}
+
+    cache = cache_path_for(str(path))
+    with open(cache, 'rb') as f:
+        data = f.read()
+    # Cut right after the digest, inside the offset table, and inside the last shop blob
+    for cut in (40, 44, 50, len(data) - 3):
+        with open(cache, 'wb') as f:
+            f.write(data[:cut])
+        assert PriceCatalog(str(path)).prices("food") == expected
@@ -0,0 +1,35 @@
+import json
+
+from conftest import SETTINGS, flat_price, item_yaml
+from product_table import CACHE_MAGIC, HEADER_LENGTH, ProductTable
+
+
+def saved_cache(tmp_path):
+    table = ProductTable()
+    table.load_shop(SETTINGS + "Items:\n" + item_yaml("stone", flat_price(100.0, 10.0))
+                    + item_yaml("dirt", flat_price(5.0, 1.0)), "blocks")
+    path = str(tmp_path / "product_table.bin")
+    table.save(path)
+    with open(path, 'rb') as f:
+        return path, f.read()
+
+
+def test_damaged_cache_loads_as_none(tmp_path):
+    path, data = saved_cache(tmp_path)
+    assert len(ProductTable.load(path)) == 2
+
+    header_end = 4 + HEADER_LENGTH.size + HEADER_LENGTH.unpack_from(data, 4)[0]
+    header = json.loads(data[4 + HEADER_LENGTH.size:header_end])
+    del header['pools']
+    no_pools = json.dumps(header).encode('utf-8')
+    damaged = [
+        data[:6],                       # cut inside the header length
+        data[:header_end + 3],          # cut inside the columns
+        data[:-1],                      # one key byte short
+        data + b'\0',                   # trailing garbage
+        CACHE_MAGIC + HEADER_LENGTH.pack(len(no_pools)) + no_pools + data[header_end:],
+    ]
+    for broken in damaged:
+        with open(path, 'wb') as f:
+            f.write(broken)
+        assert ProductTable.load(path) is None
@@ -0,0 +1,39 @@
+import update_prices
+from conftest import commit
+from shop_materials import read_sell_multipliers, sell_multiplier
+
+SETTINGS = """General:
+  Sell_Multipliers:
+    Mode: RANK
+    Default_Value: '%default%'
+    Values:
+      midi: 1.05
+      vip: TODO
+      mvp: 1.2
+      nature:
+"""
+
+
+def write_settings(tmp_path):
+    (tmp_path / "virtual_shop").mkdir()
+    path = tmp_path / "virtual_shop" / "settings.yml"
+    path.write_text(SETTINGS, encoding='utf-8')
+    return str(path)
+
+
+def test_non_numeric_multipliers_are_skipped(tmp_path, capsys):
+    path = write_settings(tmp_path)
+    assert read_sell_multipliers(path) == (1.0, {'midi': 1.05, 'mvp': 1.2})
+    assert sell_multiplier(settings_path=path) == ('mvp', 1.2)
+    output = capsys.readouterr().out
+    assert "Default_Value" in output and "Values.vip" in output and "Values.nature" in output
+
+
+def test_update_settings_replaces_placeholders(tmp_path, monkeypatch, capsys):
+    path = write_settings(tmp_path)
+    monkeypatch.setattr(update_prices, 'SHOP_DIR', str(tmp_path))
+    assert update_prices.update_settings(dry_run=True) == (0, None)
+    assert "vip: 'TODO'" in capsys.readouterr().out
+
+    commit(update_prices.update_settings())
+    assert read_sell_multipliers(path) == (1.0, update_prices.SELL_MULTIPLIERS)
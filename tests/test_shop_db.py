@@ -0,0 +1,30 @@
+import sqlite3
+
+from shop_db import PRICE_TABLE, sync_price_data
+
+
+def test_rescale_resets_sides_that_are_or_become_disabled(tmp_path):
+    db_path = str(tmp_path / "data.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"CREATE TABLE {PRICE_TABLE} (shopId TEXT, productId TEXT, buyOffset REAL, "
+                 f"sellOffset REAL, purchases INTEGER, sales INTEGER)")
+    conn.executemany(f"INSERT INTO {PRICE_TABLE} VALUES (?, ?, ?, ?, 0, 0)", [
+        ("food", "bread", 10.0, 4.0),
+        ("food", "apple", 10.0, 4.0),
+        ("food", "stew", 10.0, 4.0),
+    ])
+    conn.commit()
+    conn.close()
+
+    rows, products, _seconds = sync_price_data(db_path, {"food": {
+        "bread": (100.0, 40.0, 200.0, 20.0),     # both sides scale
+        "apple": (100.0, -1.0, 200.0, 300.0),    # selling switched on
+        "stew": (500.0, 40.0, -1.0, 40.0),       # buying switched off
+    }}, mode='rescale')
+    assert (rows, products) == (3, 3)
+
+    conn = sqlite3.connect(db_path)
+    offsets = {product: (buy, sell) for product, buy, sell in
+               conn.execute(f"SELECT productId, buyOffset, sellOffset FROM {PRICE_TABLE}")}
+    conn.close()
+    assert offsets == {"bread": (20.0, 2.0), "apple": (20.0, 0.0), "stew": (0.0, 4.0)}
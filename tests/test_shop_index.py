@@ -0,0 +1,10 @@
+import pytest
+
+from shop_index import read_shop_view, read_stock
+
+
+@pytest.mark.parametrize("value", ["inf", "-inf", ".inf", "nan", "1e999"])
+def test_non_finite_integers_read_as_missing(value):
+    stock = read_stock(f"    Stock:\n      GLOBAL:\n        BuyAmount: {value}\n        SellAmount: 64.0\n")
+    assert stock == {'GLOBAL': {'BuyAmount': None, 'SellAmount': 64}}
+    assert read_shop_view(f"    Shop_View:\n      Slot: {value}\n      Page: 2\n") == (None, 2)
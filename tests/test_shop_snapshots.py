@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+import shop_snapshots
+from conftest import flat_price, item_yaml, write_shop
+from shop_snapshots import SnapshotStore, rollback, snapshot_before_commit, take_snapshot
+
+
+def test_rollback_keeps_entries_the_snapshot_does_not_cover(tmp_path):
+    shops = tmp_path / "shops"
+    shops.mkdir()
+    path = write_shop(shops / "blocks.yml", [item_yaml("stone", flat_price(100.0, 10.0))])
+    store = SnapshotStore(str(tmp_path / ".snapshots"), str(tmp_path))
+    manifest, _stored = take_snapshot(store, "test")
+
+    write_shop(path, [item_yaml("stone", flat_price(999.0, 10.0))])
+    write_shop(shops / "added.yml", [item_yaml("dirt", flat_price(5.0, 1.0))])
+    (shops / ".editorconfig").write_text("root = true\n")
+    (shops / "archive").mkdir()
+    (shops / "archive" / "old.yml").write_text("Items: {}\n")
+
+    restored, removed, kept = rollback(store, manifest)
+    assert (restored, removed, kept) == (1, 1, 2)
+    assert sorted(p.name for p in shops.iterdir()) == [".editorconfig", "archive", "blocks.yml"]
+    assert (shops / ".editorconfig").read_text() == "root = true\n"
+    assert (shops / "archive" / "old.yml").read_text() == "Items: {}\n"
+    assert "BUY: 100.0" in (shops / "blocks.yml").read_text()
+
+
+def test_snapshot_before_commit_prunes_to_keep(tmp_path, monkeypatch):
+    shops = tmp_path / "shops"
+    shops.mkdir()
+    path = write_shop(shops / "blocks.yml", [item_yaml("stone", flat_price(100.0, 10.0))])
+    store = SnapshotStore(str(tmp_path / ".snapshots"), str(tmp_path))
+    monkeypatch.setattr(shop_snapshots, 'SnapshotStore', lambda: store)
+
+    # One snapshot per watch batch; sizes differ so scan() never reuses a record by mtime
+    for buy in (2000.0, 30000.0, 400000.0, 5000000.0):
+        snapshot_before_commit([SimpleNamespace(target=path)], "watch", keep=2)
+        write_shop(path, [item_yaml("stone", flat_price(buy, 10.0))])
+    ids = store.ids()
+    assert len(ids) == 2
+    # The newest snapshot survives and still restores
+    assert store.record(store.load(ids[-1]), "shops/blocks.yml")['items']['stone'][2] == 400000.0
+    rollback(store, store.load(ids[0]))
+    assert "BUY: 30000.0" in (shops / "blocks.yml").read_text()
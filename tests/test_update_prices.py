@@ -0,0 +1,71 @@
+import re
+import types
+
+import update_prices
+from conftest import commit, flat_price, item_yaml, write_shop
+from shop_index import index_shop_items, read_price
+from shop_manifest import Manifest, handler_fingerprint
+
+
+def prices_in(path):
+    with open(path, encoding='utf-8') as f:
+        content = f.read()
+    return {key: read_price(content[s.price[0]:s.price[1]])[1:]
+            for key, s in index_shop_items(content).items()}
+
+
+def test_tier_change_leaves_catalogue_items_alone(tmp_path, monkeypatch):
+    # stone is priced by the catalogue at a pair that is also a tier key
+    path = write_shop(tmp_path / "building_blocks.yml", [
+        item_yaml("stone", flat_price(1000.0, 50.0)),
+        item_yaml("dirt", flat_price(1000.0, 50.0)),
+        item_yaml("sand", flat_price(400.0, 40.0)),
+    ])
+    catalogue = {'stone': ('FLAT', 1000.0, 50.0), 'sand': ('FLAT', 400.0, 40.0)}
+    handler = update_prices.apply_default_building_prices
+    manifest = Manifest(str(tmp_path / "manifest.json"), "update_prices")
+
+    commit(update_prices.update_file_prices(path, catalogue, handler))
+    manifest.record(path, catalogue, handler)
+    assert prices_in(path) == {'stone': (1000.0, 50.0), 'dirt': (200.0, 30.0), 'sand': (400.0, 40.0)}
+
+    # Editing a tier table changes the handler fingerprint while the file is unchanged,
+    # so the plan holds no catalogue entries but runs the handler
+    tiers = dict(update_prices.BUILDING_DEFAULT_TIERS)
+    tiers[(30.0, 200.0)] = (35.0, 250.0)
+    monkeypatch.setattr(update_prices, 'BUILDING_DEFAULT_TIERS', tiers)
+    subset, run_handler, _reason = manifest.plan(path, catalogue, handler)
+    assert subset == {} and run_handler is handler
+
+    commit(update_prices.update_file_prices(path, subset, run_handler, known_items=catalogue))
+    assert prices_in(path) == {'stone': (1000.0, 50.0), 'dirt': (250.0, 35.0), 'sand': (400.0, 40.0)}
+
+
+def test_stream_uses_known_items_too(tmp_path):
+    path = write_shop(tmp_path / "building_blocks.yml", [
+        item_yaml("stone", flat_price(1000.0, 50.0)),
+        item_yaml("dirt", flat_price(1000.0, 50.0)),
+    ])
+    catalogue = {'stone': ('FLAT', 1000.0, 50.0)}
+    commit(update_prices.stream_file_prices(
+        path, {}, update_prices.apply_default_building_prices, known_items=catalogue))
+    assert prices_in(path) == {'stone': (1000.0, 50.0), 'dirt': (200.0, 30.0)}
+
+
+def test_fingerprint_follows_helpers_and_patterns(monkeypatch):
+    handler = update_prices.apply_default_building_prices
+    before = handler_fingerprint(handler)
+
+    # The shared scan pattern, edited in the module
+    monkeypatch.setattr(update_prices, 'FLAT_PRICE_RE', re.compile(
+        update_prices.FLAT_PRICE_RE.pattern.replace(r'(?![\d.])', '')))
+    assert handler_fingerprint(handler) != before
+    monkeypatch.undo()
+    assert handler_fingerprint(handler) == before
+
+    # tier_edits itself, edited in the module: same name, different code
+    def edited(edits, index, tiers, known_items):
+        return update_prices.tier_edits(edits, index, tiers, {})
+    monkeypatch.setattr(update_prices, 'tier_edits', types.FunctionType(
+        edited.__code__, update_prices.__dict__, 'tier_edits'))
+    assert handler_fingerprint(handler) != before
@@ -0,0 +1,149 @@
+import argparse
+import json
+
+import pytest
+
+import price_rules
+import update_prices_unified
+from conftest import flat_price, item_yaml, write_shop
+from shop_index import index_shop_items, read_price
+from shop_manifest import Manifest
+from shop_watch import ShopCache
+
+POTION_RULES = """
+[[rule]]
+name = "potions: double the original tiers"
+shop = "potions"
+match = { type = "FLAT", sell = -1.0, buy = [150.0, 200.0, 300.0, 600.0] }
+scale = { buy = 2.0 }
+"""
+
+
+@pytest.fixture
+def potions(tmp_path, monkeypatch):
+    """A potions shop in tmp_path wired up as the unified engine's only phase."""
+    shops = tmp_path / "shops"
+    shops.mkdir()
+    path = write_shop(shops / "potions.yml", [
+        item_yaml("swiftness", flat_price(150.0, -1.0), material="potion"),
+        item_yaml("healing", flat_price(200.0, -1.0), material="potion"),
+        item_yaml("luck", flat_price(175.0, -1.0), material="potion"),
+    ])
+    rules_path = str(tmp_path / "price_rules.toml")
+    with open(rules_path, 'w', encoding='utf-8') as f:
+        f.write(POTION_RULES)
+    monkeypatch.setattr(price_rules, 'RULES_PATH', rules_path)
+    monkeypatch.setattr(update_prices_unified, 'RULES_PATH', rules_path)
+    monkeypatch.setattr(price_rules, '_rules', price_rules.load_rules(rules_path))
+    monkeypatch.setattr(update_prices_unified, 'SHOPS_DIR', str(shops))
+    monkeypatch.setattr(update_prices_unified, 'MANIFEST_PATH', str(tmp_path / "manifest.json"))
+    monkeypatch.setattr(update_prices_unified, 'PHASES', [("🧪 Potions", "potions")])
+    monkeypatch.setattr(update_prices_unified, 'load_prices', lambda shop: {})
+    monkeypatch.setattr(update_prices_unified, 'update_settings', lambda dry_run=False: (0, None))
+    return path
+
+
+def buy_prices(path):
+    with open(path, encoding='utf-8') as f:
+        content = f.read()
+    return {key: read_price(content[s.price[0]:s.price[1]])[1]
+            for key, s in index_shop_items(content).items()}
+
+
+def touch(path, line):
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(f"# {line}\n")
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_rules_do_not_compound_when_the_file_is_touched(potions, stream):
+    argv = ['--no-snapshot'] + (['--stream'] if stream else [])
+    assert update_prices_unified.main(argv) == 0
+    first = buy_prices(potions)
+    assert first == {'swiftness': 300.0, 'healing': 400.0, 'luck': 175.0}
+
+    for n in range(3):
+        touch(potions, f"touched {n}")      # a plugin save or hand edit elsewhere in the file
+        assert update_prices_unified.main(argv) == 0
+        assert buy_prices(potions) == first
+
+
+def test_hand_edited_price_becomes_the_new_base(potions):
+    assert update_prices_unified.main(['--no-snapshot']) == 0
+    with open(potions, encoding='utf-8') as f:
+        content = f.read()
+    # luck was not ruled; hand-price it at a tier, then edit swiftness off-tier
+    content = content.replace("BUY: 175.0", "BUY: 600.0").replace("BUY: 300.0", "BUY: 250.0")
+    with open(potions, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+    for _run in range(2):
+        assert update_prices_unified.main(['--no-snapshot']) == 0
+        assert buy_prices(potions) == {'swiftness': 250.0, 'healing': 400.0, 'luck': 1200.0}
+    with open(update_prices_unified.MANIFEST_PATH, encoding='utf-8') as f:
+        record = json.load(f)['engines']['update_prices_unified']['potions.yml']
+    assert record['rules']['luck'] == [600.0, -1.0, 1200.0, -1.0]
+    assert 'swiftness' not in record['rules']
+
+
+# ============================================================================
+# WATCH MODE
+# ============================================================================
+def watch_args():
+    return argparse.Namespace(
+        stream=False, full=False, dry_run=False, diff_dir=None, jobs=1, profile=[],
+        trace_memory=[], no_snapshot=True, snapshot_keep=0, sync_db=None, summary=False, report=None,
+    )
+
+
+def edit(path, old, new):
+    with open(path, encoding='utf-8') as f:
+        content = f.read()
+    assert old in content
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content.replace(old, new))
+
+
+def test_watch_batch_does_not_rerun_rules_for_disk_edits(potions):
+    assert update_prices_unified.main(['--no-snapshot']) == 0
+    # A hand edit puts luck on a tier the rule would double, and moves the
+    # catalogue-priced healing away from its entry
+    edit(potions, "BUY: 175.0", "BUY: 600.0")
+    edit(potions, "BUY: 400.0", "BUY: 999.0")
+    catalogue = {'healing': ('FLAT', 450.0, -1.0)}
+
+    manifest = Manifest.load(update_prices_unified.MANIFEST_PATH, "update_prices_unified")
+    for _save in range(3):
+        _files, _changes, failed = update_prices_unified.run_batch(
+            manifest, watch_args(), ShopCache(), lambda shop: catalogue)
+        assert failed == 0
+        assert buy_prices(potions) == {'swiftness': 300.0, 'healing': 450.0, 'luck': 600.0}
+        touch(potions, "plugin save")
+
+
+def test_watch_reloads_rules(potions, monkeypatch):
+    assert update_prices_unified.main(['--no-snapshot']) == 0
+
+    class Watcher:
+        def close(self):
+            pass
+
+    class Catalog:
+        def prices(self, shop):
+            return {}
+
+    def batches(_watcher, _debounce_s):
+        with open(price_rules.RULES_PATH, 'w', encoding='utf-8') as f:
+            f.write(POTION_RULES.replace("buy = 2.0", "buy = 3.0"))
+        yield {price_rules.RULES_PATH}
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(update_prices_unified, 'open_watcher', lambda targets, poll: (Watcher(), "test"))
+    monkeypatch.setattr(update_prices_unified, 'batches', batches)
+    monkeypatch.setattr(update_prices_unified, 'PriceCatalog', Catalog)
+    args = watch_args()
+    args.poll, args.debounce = True, 0
+    manifest = Manifest.load(update_prices_unified.MANIFEST_PATH, "update_prices_unified")
+    assert update_prices_unified.watch(manifest, args, ShopCache()) == 0
+    # Rules apply to the recorded base prices, not the doubled ones in the file
+    assert buy_prices(potions) == {'swiftness': 450.0, 'healing': 600.0, 'luck': 175.0}
@@ -0,0 +1,44 @@
+import shutil
+
+import update_prices_v2
+from conftest import commit, flat_price, item_yaml, write_shop
+
+LORE = "    Lore:\n" + "".join(f"    - line {n}\n" for n in range(30))
+
+
+def run_both(tmp_path, items, prices):
+    """Output of update_file and stream_file on two copies of one shop file."""
+    path = write_shop(tmp_path / "minerals.yml", items)
+    streamed = str(tmp_path / "streamed.yml")
+    shutil.copyfile(path, streamed)
+    commit(update_prices_v2.update_file(path, prices))
+    commit(update_prices_v2.stream_file(streamed, prices))
+    with open(path, encoding='utf-8') as a, open(streamed, encoding='utf-8') as b:
+        return a.read(), b.read()
+
+
+def test_stream_matches_in_memory_when_price_is_the_last_block(tmp_path):
+    items = [
+        item_yaml("coal", flat_price(10.0, 2.0)),
+        item_yaml("iron", flat_price(40.0, 8.0), stock=False, shop_view=False) + "\n",
+        item_yaml("gold", flat_price(80.0, 16.0)),
+        item_yaml("diamond", flat_price(500.0, 100.0), stock=False, shop_view=False),
+    ]
+    prices = {
+        'iron': ('FLAT', 45.0, 9.0),
+        'gold': ('DYNAMIC', 90.0, 18.0),
+        'diamond': ('FLAT', 550.0, 110.0),
+    }
+    in_memory, streamed = run_both(tmp_path, items, prices)
+    assert in_memory == streamed
+    assert in_memory.count("BUY: 45.0") == 1 and in_memory.endswith("SELL: 110.0\n")
+    assert "  gold:" in in_memory and in_memory.count("Type: DYNAMIC") == 1
+
+
+def test_stream_matches_in_memory_past_the_old_search_window(tmp_path):
+    lored = item_yaml("emerald", flat_price(300.0, 60.0)).replace("    Currency:", LORE + "    Currency:")
+    items = [lored, item_yaml("coal", flat_price(10.0, 2.0), stock=False, shop_view=False)]
+    prices = {'emerald': ('FLAT', 320.0, 64.0), 'coal': ('FLAT', 12.0, 3.0)}
+    in_memory, streamed = run_both(tmp_path, items, prices)
+    assert in_memory == streamed
+    assert "BUY: 320.0" in in_memory and "BUY: 12.0" in in_memory
@@ -0,0 +1,393 @@
+"""
+NaturalSMP Economy Overhaul v3 - Unified Format
+One pass per shop file: every Price block is read in whatever layout it has
+(v1 Buy:/Sell:/Start:, v2 BUY:/SELL:/StartValue:, FLAT keys in either order),
+gets its new price or the default from price_rules.toml, and is written back in
+the in-game editor layout. Replaces running update_prices.py and then
+update_prices_v2.py.
+"""
+import argparse
+import os
+import time
+
+from price_catalog import CATALOG_PATH, PriceCatalog, load_prices
+from price_layout import PriceLayoutError, parse_price_block, render_price_block, set_start_values
+from price_rules import RULES_PATH, RuleContext, RuleError, reload_rules, rule_bases, shop_rules
+from shop_diff import add_dry_run_arguments, price_change_rows, print_change_table, report_dry_run
+from shop_index import EditBuffer, index_shop_items
+from shop_db import add_db_arguments, start_changes
+from shop_io import read_shop, stage_write
+from shop_manifest import Manifest, add_manifest_arguments, report_unchanged
+from shop_materials import match_product_keys, split_product_prices
+from shop_runner import add_jobs_argument, run_update
+from shop_snapshots import add_snapshot_arguments
+from shop_stats import active, add_report_arguments
+from shop_stream import ITEMS_PREFIX, add_stream_argument, index_chunk, stream_shop
+from shop_watch import ShopCache, add_watch_arguments, batches, open_watcher
+from update_prices import update_settings
+from update_prices_v2 import price_text
+
+SHOP_DIR = os.path.dirname(os.path.abspath(__file__))
+SHOPS_DIR = os.path.join(SHOP_DIR, "virtual_shop", "shops")
+MANIFEST_PATH = os.path.join(SHOP_DIR, "virtual_shop", "price_manifest.json")
+
+
+# ============================================================================
+# UNIFIED ENGINE
+# ============================================================================
+def new_counts():
+    return {'priced': 0, 'ruled': 0, 'migrated': 0, 'unparsed': 0}
+
+
+def rewrite_price(key, old, price_info, ruled, counts):
+    """New text for one Price block (its span from the index), or None to leave it.
+    The block is rewritten if it is priced, gets (buy, sell) from a pricing rule or
+    is not in the editor layout."""
+    try:
+        price = parse_price_block(old)
+    except PriceLayoutError as e:
+        price = None
+        if price_info is None:
+            print(f"  ⚠️  {key}: Price block left as is ({e})")
+            counts['unparsed'] += 1
+            return None
+
+    migrated = price is not None and render_price_block(price) != old.rstrip()
+    if price_info is not None:
+        options = price_info[3] if len(price_info) > 3 else None
+        new = price_text(price_info[0], price_info[1], price_info[2], options)
+        counts['priced'] += 1
+    else:
+        if ruled is None and not migrated:
+            return None
+        if ruled is not None:
+            set_start_values(price, *ruled)
+        new = render_price_block(price)
+        if ruled is not None and new != render_price_block(parse_price_block(old)):
+            counts['ruled'] += 1
+
+    if migrated:
+        counts['migrated'] += 1
+        active().add('items_migrated')
+    return new if new != old else None
+
+
+def queue_unified_edits(content, index, edits, prices_dict, rules, counts):
+    """Queue the rewrite of every indexed Price block that needs one. Rule results
+    for catalogue-priced items replace BUY/SELL of their entry.
+    Returns the rule bases for the manifest, or None if the rules did not look at
+    every item."""
+    ruled = {}
+    if rules is not None:
+        ruled = rules.evaluate(content, index, prices_dict if rules.priced_only else None)
+    for key, spans in index.items():
+        if spans.price is None:
+            continue
+        start, end = spans.price
+        price_info = prices_dict.get(key)
+        result = ruled.get(key)
+        if result is not None and result[2] is not None:
+            entry = result[2]
+            price_info = (entry[0], result[0], result[1]) + tuple(entry[3:])
+            result = None
+        new = rewrite_price(key, content[start:end], price_info, result and result[:2], counts)
+        if new is not None:
+            edits.replace(start, end, new, key)
+    return rule_bases(ruled) if rules is not None and not rules.priced_only else None
+
+
+def manifest_extras(bases):
+    """Third element of a phase result: what Manifest.record() should also store."""
+    return {'rule_bases': bases} if bases is not None else {}
+
+
+def item_prices(content, index, prices_dict):
+    """prices_dict keyed by item: product-key entries (potion:long_regeneration) apply
+    to every indexed item with that product key unless the item has its own entry.
+    Returns (prices, product keys that matched no item)."""
+    prices, by_product = split_product_prices(prices_dict)
+    matches = match_product_keys(content, index, by_product)
+    for item, key in matches.items():
+        prices.setdefault(item, by_product[key])
+    return prices, set(by_product) - set(matches.values())
+
+
+def report_file(name, counts, changed, delta, dry_run, blocks=0, note=""):
+    summary = f"{counts['priced']} priced, {counts['ruled']} by rules, {counts['migrated']} migrated"
+    if dry_run:
+        print(f"  🔍 Dry run {name}: {blocks} blocks would change ({summary}){note}")
+    elif changed:
+        print(f"  ✅ Updated {name}: {summary} ({delta:+d} bytes)")
+    else:
+        print(f"  ⏭️  No changes needed for {name}")
+
+
+def update_shop(filepath, prices_dict, rules=None, dry_run=False, diff_dir=None, cache=None):
+    """Price, tier and migrate one shop file in a single read-modify-write.
+    Returns (changes, staged write or None, manifest extras); the caller commits
+    staged writes. With a ShopCache (watch mode) the file is only read and indexed
+    if it changed."""
+    stats = active()
+    name = os.path.basename(filepath)
+    if cache is None:
+        content, stamp = read_shop(filepath)
+        with stats.timer('scan_s'):
+            index = index_shop_items(content)
+    else:
+        content, stamp, index = cache.read(filepath)
+
+    with stats.timer('scan_s'):
+        prices, unmatched = item_prices(content, index, prices_dict)
+
+    counts = new_counts()
+    edits = EditBuffer(content)
+    with stats.timer('subst_s'):
+        bases = queue_unified_edits(content, index, edits, prices, rules, counts)
+    for item_name, price_info in prices.items():
+        if price_info is not None and (item_name not in index or index[item_name].price is None):
+            print(f"  [SKIP] {item_name} not found in {name}")
+            stats.add('items_skipped')
+    for product in sorted(unmatched):
+        if prices_dict[product] is not None:
+            print(f"  [SKIP] no {product} product in {name}")
+            stats.add('items_skipped')
+    stats.add('items_matched', counts['priced'])
+
+    if dry_run:
+        line_edits = edits.line_edits()
+        report_dry_run(filepath, content.split('\n'), line_edits, diff_dir)
+        report_file(name, counts, len(edits), 0, True, len(line_edits))
+        return len(edits), None, manifest_extras(bases)
+
+    with stats.timer('subst_s'):
+        new_content = edits.apply()
+    staged = None
+    if new_content != content:
+        staged = stage_write(filepath, new_content, stamp)
+        staged.price_changes = start_changes(edits.changes())
+        if cache is not None:
+            cache.stage(staged, new_content)
+    report_file(name, counts, staged is not None, sum(edits.deltas().values()), False)
+    return len(edits), staged, manifest_extras(bases)
+
+
+def stream_shop_file(filepath, prices_dict, rules=None, dry_run=False, diff_dir=None):
+    """update_shop() one item at a time with constant memory. Only the first item with
+    a priced item key gets the price, while product-key entries apply to every match;
+    a dry run prints the change table but no diff."""
+    stats = active()
+    name = os.path.basename(filepath)
+    pending, by_product = split_product_prices(
+        {item: info for item, info in prices_dict.items() if info is not None}
+    )
+    unmatched = set(by_product)
+    counts = new_counts()
+    changes = 0
+    delta = 0
+    rows = []
+    price_changes = {}
+    bases = {} if rules is not None and not rules.priced_only else None
+
+    def rewrite(key, text):
+        nonlocal changes, delta
+        with stats.timer('scan_s'):
+            content, index = index_chunk(text)
+        if key in pending and key in index:
+            priced = {key: pending.pop(key)}
+        else:
+            matches = match_product_keys(content, index, by_product)
+            priced = {item: by_product[product] for item, product in matches.items()}
+            unmatched.difference_update(matches.values())
+        edits = EditBuffer(content)
+        with stats.timer('subst_s'):
+            chunk_bases = queue_unified_edits(content, index, edits, priced, rules, counts)
+        if bases is not None:
+            bases.update(chunk_bases)
+        if not edits:
+            return text
+        changes += len(edits)
+        if dry_run:
+            rows.extend(price_change_rows(content.split('\n'), edits.line_edits()))
+            return text
+        delta += sum(edits.deltas().values())
+        price_changes.update(start_changes(edits.changes()))
+        with stats.timer('subst_s'):
+            return edits.apply()[len(ITEMS_PREFIX):]
+
+    changed, staged = stream_shop(filepath, rewrite, dry_run)
+    if staged is not None:
+        staged.price_changes = price_changes
+    for item_name in pending:
+        print(f"  [SKIP] {item_name} not found in {name}")
+        stats.add('items_skipped')
+    for product in sorted(unmatched):
+        print(f"  [SKIP] no {product} product in {name}")
+        stats.add('items_skipped')
+    stats.add('items_matched', counts['priced'])
+
+    if dry_run:
+        print_change_table(rows)
+    report_file(name, counts, changed, delta, dry_run, len(rows), ", streamed, no diff")
+    return changes, staged, manifest_extras(bases)
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+# (banner, shop id in price_catalog.toml, price_rules.toml and virtual_shop/shops/<shop>.yml)
+# Shop files not listed here are still migrated, under a generic banner.
+PHASES = [
+    ("⛏️ Minerals",         "minerals"),
+    ("🌾 Farming",          "farming"),
+    ("🍖 Food",             "food"),
+    ("💀 Mob Drops",        "mob_drops"),
+    ("⚔️ Combat & Tools",   "combat_tools"),
+    ("🔴 Redstone",         "redstone"),
+    ("🧩 Miscellaneous",    "miscellaneous"),
+    ("🧱 Building Blocks",  "building_blocks"),
+    ("🎨 Colored Blocks",   "colored_blocks"),
+    ("🌸 Decoration",       "decoration"),
+    ("🧪 Potions",          "potions"),
+]
+
+
+def shop_phases():
+    """PHASES plus every other shop file on disk."""
+    listed = {shop for _banner, shop in PHASES}
+    others = sorted(
+        name[:-4] for name in os.listdir(SHOPS_DIR)
+        if name.endswith('.yml') and name[:-4] not in listed
+    )
+    return PHASES + [(f"🛒 {shop.replace('_', ' ').title()}", shop) for shop in others]
+
+
+def plan_phases(manifest, args, prices_for, cache=None, batch=False):
+    """(phases, tracked) for every shop file. Outside a watch batch, unchanged files
+    get a report_unchanged phase; in one (batch=True) they are left out and the
+    manifest decides even under --full. The shop's pricing rules are its manifest
+    handler; when they are unchanged only override rules on changed entries run.
+    In a watch batch a file that only changed on disk (plugin save, hand edit) gets
+    its catalogue entries re-applied, but the rules only run if they changed."""
+    phases = []
+    tracked = {}
+    update = stream_shop_file if args.stream else update_shop
+    context = RuleContext(prices_for)
+    for banner, shop in shop_phases():
+        filepath = os.path.join(SHOPS_DIR, shop + ".yml")
+        if batch and not os.path.exists(filepath):
+            continue
+        prices = prices_for(shop)
+        rules = shop_rules(shop, prices, context, manifest.rule_bases(filepath))
+        plan = (prices, rules, None) if args.full and not batch else manifest.plan(filepath, prices, rules)
+        if plan is None:
+            if not batch:
+                phases.append((banner, report_unchanged, (filepath,)))
+            continue
+        tracked[banner] = (filepath, prices, rules)
+        handler = plan[1] if plan[1] is not None or rules is None else rules.priced()
+        if batch and handler is rules and not manifest.handler_changed(filepath, rules):
+            handler = rules.priced()
+        options = (cache,) if cache is not None else ()
+        phases.append((banner, update, (filepath, plan[0], handler, args.dry_run, args.diff_dir) + options))
+    return phases, tracked
+
+
+def run_batch(manifest, args, cache, prices_for):
+    """Re-apply whatever the manifest says changed. Returns (files, changes, failed)."""
+    phases, tracked = plan_phases(manifest, args, prices_for, cache, batch=True)
+    if not phases:
+        return 0, 0, 0
+    total, failed, _stats = run_update(
+        "update_prices_unified", phases, tracked, manifest, args, on_commit=cache.commit,
+    )
+    return len(phases), total, failed
+
+
+def watch(manifest, args, cache):
+    """Re-apply changed catalogue entries, pricing rules and edited shop files until
+    interrupted."""
+    targets = {SHOPS_DIR: None}
+    for path in (CATALOG_PATH, RULES_PATH):
+        targets.setdefault(os.path.dirname(path), set()).add(os.path.basename(path))
+    watcher, kind = open_watcher(targets, args.poll)
+    catalog = PriceCatalog()
+    print(f"\n👀 Watching {os.path.basename(CATALOG_PATH)}, {os.path.basename(RULES_PATH)} and "
+          f"{os.path.relpath(SHOPS_DIR, SHOP_DIR)}/ ({kind}, {args.debounce} ms debounce); Ctrl+C to stop")
+    try:
+        for changed in batches(watcher, args.debounce / 1000):
+            started = time.perf_counter()
+            # Files the engine itself just wrote are still what the cache holds
+            edited = sorted(os.path.basename(p) for p in changed
+                            if p not in (CATALOG_PATH, RULES_PATH) and not cache.current(p))
+            if RULES_PATH in changed:
+                try:
+                    reload_rules()
+                except RuleError as e:
+                    print(f"\n⚠️  {os.path.basename(RULES_PATH)} not reloaded, keeping the previous rules: {e}")
+                else:
+                    edited.insert(0, os.path.basename(RULES_PATH))
+            if CATALOG_PATH in changed:
+                catalog = PriceCatalog()
+                edited.insert(0, os.path.basename(CATALOG_PATH))
+            if not edited:
+                continue
+            print(f"\n{'=' * 60}\n🔁 Changed: {', '.join(edited)}")
+            files, total, failed = run_batch(manifest, args, cache, catalog.prices)
+            if not files:
+                print("  ⏭️  No price entries, rules or shop files to re-apply")
+                continue
+            took = (time.perf_counter() - started) * 1000
+            print(f"⚡ {total} Price blocks re-applied in {files} file(s) in {took:.0f} ms"
+                  + (f", {failed} failed" if failed else ""))
+    except KeyboardInterrupt:
+        print("\n👋 Stopped watching")
+    finally:
+        watcher.close()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="NaturalSMP Economy Overhaul v3 - Unified Format")
+    add_jobs_argument(parser)
+    add_manifest_arguments(parser)
+    add_dry_run_arguments(parser)
+    add_report_arguments(parser)
+    add_stream_argument(parser)
+    add_db_arguments(parser)
+    add_snapshot_arguments(parser)
+    add_watch_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.watch and (args.stream or args.jobs > 1):
+        parser.error("--watch keeps shop files in memory and cannot be combined with --stream or --jobs")
+
+    print("=" * 60)
+    print("NaturalSMP Economy Overhaul v3 - Unified Format")
+    print("Reads v1 and v2 Price blocks, writes the in-game editor layout")
+    print("=" * 60)
+
+    manifest = Manifest.load(MANIFEST_PATH, "update_prices_unified")
+    cache = ShopCache() if args.watch else None
+    shop_list, tracked = plan_phases(manifest, args, load_prices, cache)
+    phases = [("📋 Settings", update_settings, (args.dry_run,))] + shop_list
+
+    total, failed, phase_stats = run_update(
+        "update_prices_unified", phases, tracked, manifest, args,
+        on_commit=cache.commit if cache is not None else None,
+    )
+    migrated = sum(stats.items_migrated for stats in phase_stats)
+
+    print(f"\n{'=' * 60}")
+    if args.dry_run:
+        print(f"🔍 Dry run: {total} Price blocks would change, {migrated} of them migrated; "
+              f"no files were written")
+    else:
+        print(f"✅ Total: {total} Price blocks rewritten, {migrated} migrated to the editor layout")
+    if failed:
+        print(f"⚠️  {failed} phase(s) or file(s) failed, see errors above")
+    print("=" * 60)
+    if args.watch:
+        return watch(manifest, args, cache)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
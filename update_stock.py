@@ -0,0 +1,186 @@
+"""
+NaturalSMP Economy Overhaul - Bulk Stock Update Script
+Rewrites the Stock: block of every product selected by stock_policy.toml
+(GLOBAL/PLAYER BuyAmount, SellAmount, RestockTime) across all shop files,
+with the same single-scan index, batched splices, manifest, dry run and
+snapshot as the price updaters. --sync-stock then clears or clamps the
+matching excellentshop_stocks rows in data.db in one transaction.
+"""
+import argparse
+import os
+
+from shop_db import DB_PATH, STOCK_SYNC_MODES, sync_stock_committed
+from shop_diff import add_dry_run_arguments, write_diff
+from shop_index import STOCK_FIELDS, STOCK_SCOPES, EditBuffer, index_shop_items
+from shop_io import read_shop, stage_write
+from shop_manifest import Manifest, add_manifest_arguments, report_unchanged
+from shop_runner import add_jobs_argument, run_update
+from shop_snapshots import add_snapshot_arguments
+from shop_stats import active, add_report_arguments
+from stock_policy import POLICY_PATH, load_policies, shop_stock, stock_block
+
+SHOP_DIR = os.path.dirname(os.path.abspath(__file__))
+SHOPS_DIR = os.path.join(SHOP_DIR, "virtual_shop", "shops")
+MANIFEST_PATH = os.path.join(SHOP_DIR, "virtual_shop", "price_manifest.json")
+
+
+# ============================================================================
+# STOCK UPDATE ENGINE
+# ============================================================================
+def stock_edit_span(content, spans):
+    """(start, end, prefix) to splice a Stock block into one item: the existing
+    block through its last content line, or an insertion point before Shop_View
+    or after the item's last line."""
+    if spans.stock is not None:
+        start, end = spans.stock
+        return start, start + len(content[start:end].rstrip()), ''
+    if spans.shop_view is not None:
+        return spans.shop_view[0], spans.shop_view[0], None
+    start = spans.header[0]
+    end = start + len(content[start:spans.end].rstrip())
+    return end, end, '\n'
+
+
+def queue_stock_edits(content, index, edits, policy):
+    """Queue a new Stock block for every item whose limits change.
+    Returns {item: (old stock or None, new stock, [policy names])}."""
+    results = policy.evaluate(content, index)
+    for item, (_old, new, _names) in results.items():
+        start, end, prefix = stock_edit_span(content, index[item])
+        block = stock_block(new)
+        # Inserted before Shop_View: the block brings its own line break
+        text = block + '\n' if prefix is None else prefix + block
+        edits.replace(start, end, text, item)
+    active().add('items_matched', len(results))
+    return results
+
+
+def _limit_changes(old, new):
+    old = old or {}
+    return ', '.join(
+        f"{scope}.{field} {old.get(scope, {}).get(field, '-')} → {new[scope][field]}"
+        for scope in STOCK_SCOPES for field in STOCK_FIELDS
+        if old.get(scope, {}).get(field) != new[scope][field]
+    )
+
+
+def print_stock_table(results):
+    if not results:
+        return
+    width = max(len(item) for item in results)
+    for item, (old, new, names) in results.items():
+        added = '' if old is not None else '  (new Stock block)'
+        print(f"  {item.ljust(width)}  {_limit_changes(old, new)}{added}  [{', '.join(names)}]")
+
+
+def update_file_stock(filepath, policy, dry_run=False, diff_dir=None):
+    """Apply the stock policy to one shop file.
+    Returns (changes, staged write or None); the caller commits staged writes."""
+    stats = active()
+    content, stamp = read_shop(filepath)
+    name = os.path.basename(filepath)
+
+    with stats.timer('scan_s'):
+        index = index_shop_items(content)
+
+    edits = EditBuffer(content)
+    with stats.timer('subst_s'):
+        results = queue_stock_edits(content, index, edits, policy)
+
+    if dry_run:
+        print_stock_table(results)
+        write_diff(filepath, content.split('\n'), edits.line_edits(), diff_dir)
+        print(f"  🔍 Dry run {name}: {len(results)} Stock blocks would change")
+        return len(results), None
+
+    if not results:
+        print(f"  ⏭️  No changes needed for {name}")
+        return 0, None
+
+    with stats.timer('subst_s'):
+        new_content = edits.apply()
+    staged = stage_write(filepath, new_content, stamp)
+    staged.stock_changes = {item: (old, new) for item, (old, new, _names) in results.items()}
+    delta = sum(edits.deltas().values())
+    print(f"  ✅ Updated {name}: {len(results)} Stock blocks changed ({delta:+d} bytes)")
+    return len(results), staged
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+def plan_phases(manifest, args):
+    """One phase per shop file that some stock entry selects.
+    Returns (phases, tracked) for run_update()."""
+    phases = []
+    tracked = {}
+    for filename in sorted(os.listdir(SHOPS_DIR)):
+        if not filename.endswith('.yml'):
+            continue
+        shop = filename[:-4]
+        policy = shop_stock(shop)
+        if policy is None:
+            continue
+        banner = f"📦 {shop}"
+        filepath = os.path.join(SHOPS_DIR, filename)
+        # The policy is the manifest handler; there are no per-item entries
+        if not args.full and manifest.plan(filepath, {}, policy) is None:
+            phases.append((banner, report_unchanged, (filepath,)))
+            continue
+        tracked[banner] = (filepath, {}, policy)
+        phases.append((banner, update_file_stock, (filepath, policy, args.dry_run, args.diff_dir)))
+    return phases, tracked
+
+
+def add_stock_db_arguments(parser):
+    parser.add_argument(
+        "--sync-stock", choices=STOCK_SYNC_MODES,
+        help="after writing, clear or clamp the plugin's stock rows for every "
+             "product whose stock limits changed",
+    )
+    parser.add_argument("--db", default=DB_PATH, metavar="PATH",
+                        help="plugin database for --sync-stock (default: data.db)")
+    # run_update() syncs price data on --sync-db, which this engine never changes
+    parser.set_defaults(sync_db=None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="NaturalSMP Economy Overhaul - Stock Updater")
+    add_jobs_argument(parser)
+    add_manifest_arguments(parser)
+    add_dry_run_arguments(parser)
+    add_report_arguments(parser)
+    add_stock_db_arguments(parser)
+    add_snapshot_arguments(parser)
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("NaturalSMP Economy Overhaul - Stock Updater")
+    print("=" * 60)
+
+    policies = load_policies()
+    if not policies:
+        print(f"⚠️  No [[stock]] entries in {os.path.basename(POLICY_PATH)}, nothing to do")
+        return 0
+
+    manifest = Manifest.load(MANIFEST_PATH, "update_stock")
+    phases, tracked = plan_phases(manifest, args)
+    on_commit = None
+    if args.sync_stock and not args.dry_run:
+        def on_commit(results):
+            sync_stock_committed(results, args.db, args.sync_stock)
+
+    total, failed, _stats = run_update("update_stock", phases, tracked, manifest, args, on_commit)
+
+    print("\n" + "=" * 60)
+    if args.dry_run:
+        print(f"🔍 Dry run: {total} Stock blocks would change; no files were written")
+    else:
+        print(f"✅ Total: {total} Stock blocks rewritten")
+    if failed:
+        print(f"⚠️  {failed} phase(s) or file(s) failed, see errors above")
+    print("=" * 60)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())